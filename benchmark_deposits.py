@@ -0,0 +1,288 @@
+"""
+Deposit pipeline benchmark against the in-process fake Solana node.
+
+Seeds a throwaway SQLite database with N users and wallets, runs the deposit
+monitor against fake_solana.FakeSolana while users deposit at a fixed rate
+(having opened the deposit screen, as in the bot), then sweeps all funded
+wallets. Reports credit latency, RPC calls per credited deposit and sweep time.
+
+    python benchmark_deposits.py --wallets 100000 --rate 5 --duration 120
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import socket
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from fake_solana import FakeSolana
+
+# Websocket requests are not RPC round trips
+WS_METHODS = {'accountSubscribe', 'accountUnsubscribe'}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark deposit crediting and sweeping")
+    parser.add_argument('--wallets', type=int, default=100_000, help="Registered users (deposit wallets)")
+    parser.add_argument('--rate', type=float, default=5.0, help="Deposits per second")
+    parser.add_argument('--duration', type=float, default=120.0, help="Seconds of deposit traffic")
+    parser.add_argument('--drain', type=float, default=60.0, help="Max seconds to wait for outstanding credits")
+    parser.add_argument('--mode', choices=('poll', 'websocket'), default='poll', help="Deposit monitor mode")
+    parser.add_argument('--latency', type=float, default=0.02, help="Simulated RPC round trip (seconds)")
+    parser.add_argument('--slot-ms', type=float, default=400, help="Slot duration in milliseconds")
+    parser.add_argument('--rpc-rate', type=float, default=100.0, help="Client RPC rate limit (requests/second)")
+    parser.add_argument('--no-sweep', action='store_true', help="Skip the sweep phase")
+    parser.add_argument('--verbose', action='store_true', help="Show monitor logs")
+    return parser.parse_args()
+
+
+def configure(args, workdir: str) -> int:
+    """Point settings at the fake node and a fresh database (before the app is imported)."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    
+    os.chdir(workdir)  # Wallet encryption key is created in the working directory
+    os.environ.update({
+        'SOLANA_RPC_URL': f"http://127.0.0.1:{port}",
+        'SOLANA_RPC_URLS': '',
+        'SOLANA_WS_URL': f"ws://127.0.0.1:{port}",
+        'SOLANA_RPC_RATE_LIMIT': str(args.rpc_rate),
+        'DATABASE_URL': f"sqlite+aiosqlite:///{os.path.join(workdir, 'benchmark.db')}",
+        'DEPOSIT_MONITOR_MODE': args.mode,
+        'MONITOR_SHARDS': '1',
+        'RATE_SOURCES': 'fixture:150',  # Crediting never waits for a price API
+    })
+    os.environ.setdefault('BOT_TOKEN', '0:benchmark')
+    os.environ.setdefault('ADMIN_IDS', '0')
+    if 'MASTER_WALLET_PRIVATE_KEY' not in os.environ:
+        from solders.keypair import Keypair
+        master = Keypair()
+        os.environ['MASTER_WALLET_PRIVATE_KEY'] = str(master)
+        os.environ['MASTER_WALLET_PUBLIC_KEY'] = str(master.pubkey())
+    return port
+
+
+def percentile(values: list[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+def http_calls(calls) -> int:
+    return sum(count for method, count in calls.items() if method not in WS_METHODS)
+
+
+async def seed_users(count: int) -> dict[int, str]:
+    """Insert `count` users with fresh wallets. Returns user id -> wallet address."""
+    from sqlalchemy import insert
+    from database.database import db
+    from database.models import User
+    from services.wallet_service import wallet_service
+    
+    await db.create_tables()
+    loop = asyncio.get_running_loop()
+    
+    def generate(first_id: int, size: int) -> list[dict]:
+        rows = []
+        for user_id in range(first_id, first_id + size):
+            public_key, encrypted_private_key = wallet_service.create_wallet()
+            rows.append({
+                'id': user_id,
+                'username': f"user{user_id}",
+                'wallet_address': public_key,
+                'wallet_private_key': encrypted_private_key
+            })
+        return rows
+    
+    wallets = {}
+    chunk = 10_000
+    async for session in db.get_session():
+        for first_id in range(1, count + 1, chunk):
+            rows = await loop.run_in_executor(None, generate, first_id, min(chunk, count + 1 - first_id))
+            await session.execute(insert(User), rows)
+            await session.commit()
+            wallets.update({row['id']: row['wallet_address'] for row in rows})
+            print(f"  seeded {len(wallets)}/{count} users", end='\r')
+    print()
+    return wallets
+
+
+async def open_deposit_screens(user_ids: set[int]):
+    """
+    Mark the depositors' deposit screens as opened now (they stay hot for
+    DEPOSIT_SCREEN_WINDOW). Done before the monitor starts: on SQLite a
+    concurrent writer would make the monitor's writes fail with
+    "database is locked".
+    """
+    from sqlalchemy import update
+    from database.database import db
+    from database.models import User
+    
+    ids = sorted(user_ids)
+    async for session in db.get_session():
+        for i in range(0, len(ids), 500):
+            await session.execute(
+                update(User)
+                .where(User.id.in_(ids[i:i + 500]))
+                .values(deposit_screen_at=datetime.now(timezone.utc))
+            )
+        await session.commit()
+
+
+async def make_deposits(node: FakeSolana, wallets: dict[int, str], depositors: list[int], rate: float, landed: dict[str, float]):
+    """Land one deposit per entry of `depositors` at `rate` per second."""
+    payers = [FakeSolana.random_address() for _ in range(100)]
+    started = time.monotonic()
+    for sent, user_id in enumerate(depositors, 1):
+        lamports = random.randint(10_000_000, 1_000_000_000)  # 0.01 - 1 SOL
+        signature = node.transfer(random.choice(payers), wallets[user_id], lamports)
+        landed[signature] = time.monotonic()
+        await asyncio.sleep(max(started + sent / rate - time.monotonic(), 0))
+
+
+async def collect_credits(landed: dict[str, float], latencies: list[float]):
+    """Record landing -> credit latency of every deposit written by the monitor."""
+    from sqlalchemy import select
+    from database.database import db
+    from database.models import Transaction
+    
+    last_id = 0
+    while True:
+        async for session in db.get_session():
+            result = await session.execute(
+                select(Transaction.id, Transaction.tx_hash)
+                .where(Transaction.tx_type == 'deposit', Transaction.id > last_id)
+                .order_by(Transaction.id)
+            )
+            now = time.monotonic()
+            for tx_id, signature in result.all():
+                last_id = tx_id
+                if signature in landed:
+                    latencies.append(now - landed[signature])
+        await asyncio.sleep(0.1)
+
+
+async def run_sweeps(node: FakeSolana) -> dict:
+    """Sweep every funded wallet and wait until the sweeps are final."""
+    from sqlalchemy import select, func
+    from database.database import db
+    from database.models import WalletSweep
+    from services.sweep_service import sweep_service
+    
+    calls_before = node.calls.copy()
+    report = {'wallets': 0, 'lamports': 0, 'sweep_seconds': 0.0, 'final_seconds': 0.0}
+    started = time.monotonic()
+    async for session in db.get_session():
+        while True:
+            stats = await sweep_service.sweep(session)
+            report['wallets'] += stats['sent']
+            report['lamports'] += stats['lamports']
+            if not stats['sent']:
+                break
+        report['sweep_seconds'] = time.monotonic() - started
+        
+        while True:
+            await sweep_service.track(session)
+            result = await session.execute(
+                select(func.count(WalletSweep.id)).where(WalletSweep.status == 'submitted')
+            )
+            if not result.scalar():
+                break
+            await asyncio.sleep(node.slot_seconds * 4)
+        report['final_seconds'] = time.monotonic() - started
+    
+    report['rpc_calls'] = http_calls(node.calls - calls_before)
+    return report
+
+
+async def run(args):
+    node = FakeSolana(latency=args.latency, slot_seconds=args.slot_ms / 1000)
+    await node.start(port=args.port)
+    
+    import monitor_transactions
+    from database.database import db
+    from services.price_service import price_service
+    from services.wallet_service import wallet_service
+    from services.wallet_stream_service import wallet_stream_service
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    
+    print(f"Seeding {args.wallets} users...")
+    started = time.monotonic()
+    wallets = await seed_users(args.wallets)
+    print(f"Seeded in {time.monotonic() - started:.1f}s")
+    
+    depositors = [random.choice(list(wallets)) for _ in range(int(args.rate * args.duration))]
+    await open_deposit_screens(set(depositors))
+    
+    wallet_service.blockhash_cache.start()
+    monitor = asyncio.ensure_future(monitor_transactions.process_deposits())
+    landed: dict[str, float] = {}
+    latencies: list[float] = []
+    collector = asyncio.ensure_future(collect_credits(landed, latencies))
+    
+    print(f"Depositing at {args.rate}/s for {args.duration:.0f}s ({args.mode} mode)...")
+    calls_before = node.calls.copy()
+    started = time.monotonic()
+    await make_deposits(node, wallets, depositors, args.rate, landed)
+    deadline = time.monotonic() + args.drain
+    while len(latencies) < len(landed) and time.monotonic() < deadline:
+        await asyncio.sleep(0.5)
+    deposit_seconds = time.monotonic() - started
+    calls = node.calls - calls_before
+    
+    monitor.cancel()
+    collector.cancel()
+    await asyncio.gather(monitor, collector, return_exceptions=True)
+    await wallet_stream_service.stop()
+    
+    sweeps = None if args.no_sweep else await run_sweeps(node)
+    
+    await wallet_service.blockhash_cache.stop()
+    await wallet_service.close()
+    await price_service.stop()
+    await db.engine.dispose()
+    await node.stop()
+    
+    credited = len(latencies)
+    print()
+    print(f"Wallets:                {args.wallets}")
+    print(f"Deposits landed:        {len(landed)}")
+    print(f"Deposits credited:      {credited}")
+    if latencies:
+        print(
+            f"Credit latency:         p50 {percentile(latencies, 0.5):.2f}s, "
+            f"p95 {percentile(latencies, 0.95):.2f}s, max {max(latencies):.2f}s, "
+            f"mean {statistics.mean(latencies):.2f}s"
+        )
+    rpc_calls = http_calls(calls)
+    print(f"RPC calls:              {rpc_calls} in {deposit_seconds:.0f}s ({rpc_calls / deposit_seconds:.1f}/s)")
+    for method, count in calls.most_common():
+        print(f"  {method:<26}{count}")
+    if credited:
+        print(f"RPC calls per deposit:  {rpc_calls / credited:.1f}")
+    if sweeps is not None:
+        print(
+            f"Sweep:                  {sweeps['wallets']} wallets, "
+            f"{sweeps['lamports'] / 1_000_000_000:.4f} SOL sent in {sweeps['sweep_seconds']:.2f}s, "
+            f"final after {sweeps['final_seconds']:.2f}s, {sweeps['rpc_calls']} RPC calls"
+        )
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix='deposit-benchmark-') as workdir:
+        cwd = os.getcwd()
+        args.port = configure(args, workdir)
+        try:
+            asyncio.run(run(args))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""
+Leaderboard benchmark.
+
+Seeds a throwaway SQLite database with N users with random stats, builds
+the leaderboard snapshots and compares top and "your rank" lookups against
+the equivalent SQL queries. Then changes the stats of a share of users and
+measures how fast the top lists catch up through the change feed.
+
+    python benchmark_leaderboards.py --users 1000000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark leaderboard snapshots and rank lookups")
+    parser.add_argument('--users', type=int, default=1_000_000, help="Registered users")
+    parser.add_argument('--lookups', type=int, default=100_000, help="In-memory rank lookups")
+    parser.add_argument('--sql-lookups', type=int, default=50, help="SQL rank lookups to compare against")
+    parser.add_argument('--changes', type=int, default=10_000, help="Users whose stats change after the snapshot")
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args()
+
+
+def configure(workdir: str):
+    """Point settings at a fresh database (before the app is imported)."""
+    os.chdir(workdir)
+    os.environ.update({
+        'DATABASE_URL': f"sqlite+aiosqlite:///{os.path.join(workdir, 'benchmark.db')}",
+        'RATE_SOURCES': 'fixture:150',
+    })
+    os.environ.setdefault('BOT_TOKEN', '0:benchmark')
+    os.environ.setdefault('ADMIN_IDS', '0')
+    if 'MASTER_WALLET_PRIVATE_KEY' not in os.environ:
+        from solders.keypair import Keypair
+        master = Keypair()
+        os.environ['MASTER_WALLET_PRIVATE_KEY'] = str(master)
+        os.environ['MASTER_WALLET_PUBLIC_KEY'] = str(master.pubkey())
+
+
+def random_stats() -> dict:
+    """Skewed stats: most users have little or nothing, a few a lot."""
+    buyer = random.random() < 0.3
+    return {
+        'rating': round(random.uniform(-10, 100), 1) if buyer else 0.0,
+        'total_purchases': random.randint(1, 50) if buyer else 0,
+        'total_spent_cents': int(random.paretovariate(1.2) * 1000) if buyer else 0,
+        'total_referrals': int(random.paretovariate(2)) - 1 if random.random() < 0.1 else 0,
+        'achievement_points': random.randint(0, 40) * 5,
+        'daily_streak': random.randint(0, 60) if random.random() < 0.4 else 0,
+    }
+
+
+async def seed_users(count: int):
+    """Insert `count` users with random stats."""
+    from sqlalchemy import insert
+    from database.database import db
+    from database.models import User
+    
+    await db.create_tables()
+    chunk = 20_000
+    async for session in db.get_session():
+        for first_id in range(1, count + 1, chunk):
+            rows = [
+                {
+                    'id': user_id,
+                    'first_name': f"user{user_id}",
+                    'wallet_address': f"wallet{user_id}",
+                    'wallet_private_key': '',
+                    **random_stats()
+                }
+                for user_id in range(first_id, min(first_id + chunk, count + 1))
+            ]
+            await session.execute(insert(User), rows)
+            await session.commit()
+            print(f"  seeded {rows[-1]['id']}/{count} users", end='\r')
+    print()
+
+
+def timed(fn, repeat: int) -> float:
+    """Mean seconds per call."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+async def sql_lookups(args, boards: dict) -> dict:
+    """Mean seconds of top-10 and rank queries per board, done the naive way."""
+    from sqlalchemy import select, func
+    from database.database import db
+    from database.models import User
+    
+    report = {}
+    async for session in db.get_session():
+        for name, column in boards.items():
+            started = time.perf_counter()
+            await session.execute(select(User.id, column).order_by(column.desc(), User.id).limit(10))
+            top_seconds = time.perf_counter() - started
+            
+            scores = [random.choice(args.scores[name]) for _ in range(args.sql_lookups)]
+            started = time.perf_counter()
+            for score in scores:
+                await session.execute(select(func.count(User.id)).where(column > score))
+            report[name] = (top_seconds, (time.perf_counter() - started) / args.sql_lookups)
+    return report
+
+
+async def change_stats(count: int, user_ids: list[int]) -> float:
+    """Give `count` random users new stats; returns seconds spent writing."""
+    from sqlalchemy import update
+    from database.database import db
+    from database.models import User
+    
+    started = time.perf_counter()
+    async for session in db.get_session():
+        for user_id in random.sample(user_ids, count):
+            await session.execute(update(User).where(User.id == user_id).values(**random_stats()))
+        await session.commit()
+    return time.perf_counter() - started
+
+
+async def run(args):
+    from database.database import db
+    from services.leaderboard_service import leaderboard_service
+    from services.price_service import price_service
+    logging.getLogger().setLevel(logging.WARNING)
+    random.seed(args.seed)
+    
+    print(f"Seeding {args.users} users...")
+    started = time.monotonic()
+    await seed_users(args.users)
+    print(f"Seeded in {time.monotonic() - started:.1f}s")
+    
+    started = time.perf_counter()
+    await leaderboard_service.ensure_loaded()
+    snapshot_seconds = time.perf_counter() - started
+    boards = leaderboard_service.boards
+    args.scores = {name: list(board.scores) or [0.0] for name, board in boards.items()}
+    
+    print()
+    print(f"Users:                  {args.users}")
+    print(f"Snapshot build:         {snapshot_seconds:.2f}s for {len(boards)} boards")
+    print()
+    print(f"{'Board':<12}{'ranked':>10}{'top-10 mem':>14}{'rank mem':>12}{'top-10 SQL':>14}{'rank SQL':>12}")
+    sql = await sql_lookups(args, leaderboard_service.BOARDS)
+    for name, board in boards.items():
+        scores = args.scores[name]
+        probes = [random.choice(scores) for _ in range(args.lookups)]
+        probe = iter(probes * 2)
+        rank_seconds = timed(lambda: board.rank(next(probe)), args.lookups)
+        top_seconds = timed(lambda: board.leaders(10), 1000)
+        sql_top, sql_rank = sql[name]
+        print(
+            f"{name:<12}{board.size:>10}{top_seconds * 1e6:>12.1f}us{rank_seconds * 1e6:>10.2f}us"
+            f"{sql_top * 1e3:>12.1f}ms{sql_rank * 1e3:>10.1f}ms"
+        )
+    
+    print()
+    print(f"Changing stats of {args.changes} users...")
+    write_seconds = await change_stats(args.changes, range(1, args.users + 1))
+    async for session in db.get_session():
+        started = time.perf_counter()
+        changed = await leaderboard_service.poll_changes(session)
+        poll_seconds = time.perf_counter() - started
+    print(f"Writes:                 {write_seconds:.2f}s")
+    print(f"Change feed poll:       {changed} users applied in {poll_seconds * 1e3:.1f}ms")
+    
+    # The incrementally kept top must equal a fresh top from the database
+    from sqlalchemy import select
+    from database.models import User
+    mismatches = []
+    async for session in db.get_session():
+        for name, column in leaderboard_service.BOARDS.items():
+            result = await session.execute(
+                select(column).where(column > 0).order_by(column.desc(), User.id).limit(10)
+            )
+            expected = [float(score) for score in result.scalars().all()]
+            actual = [score for _, _, score in boards[name].leaders(10)]
+            if expected != actual:
+                mismatches.append(name)
+    print(f"Top-10 after changes:   {'matches SQL' if not mismatches else 'MISMATCH in ' + ', '.join(mismatches)}")
+    
+    update_seconds = []
+    board = boards['points']
+    for _ in range(10):
+        user_ids = [random.randint(1, args.users) for _ in range(10_000)]
+        started = time.perf_counter()
+        for user_id in user_ids:
+            board.update(user_id, random.randint(0, 400) * 5)
+        update_seconds.append((time.perf_counter() - started) / len(user_ids))
+    print(f"Top-K update:           {statistics.mean(update_seconds) * 1e6:.2f}us per score change")
+    
+    await price_service.stop()
+    await db.engine.dispose()
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix='leaderboard-benchmark-') as workdir:
+        cwd = os.getcwd()
+        configure(workdir)
+        try:
+            asyncio.run(run(args))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 """Configuration settings for the bot."""
 import os
-from typing import List
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -17,6 +17,9 @@ class Settings(BaseSettings):
     
     # Solana
     solana_rpc_url: str = Field(default='https://api.devnet.solana.com', alias='SOLANA_RPC_URL')
+    solana_rpc_urls: str = Field(default='', alias='SOLANA_RPC_URLS')  # Extra endpoints, comma-separated
+    solana_rpc_rate_limit: float = Field(default=10.0, alias='SOLANA_RPC_RATE_LIMIT')  # Requests/second per endpoint
+    solana_ws_url: Optional[str] = Field(default=None, alias='SOLANA_WS_URL')  # Defaults to RPC URL with ws(s)://
     master_wallet_private_key: str = Field(..., alias='MASTER_WALLET_PRIVATE_KEY')
     master_wallet_public_key: str = Field(..., alias='MASTER_WALLET_PUBLIC_KEY')
     
@@ -24,6 +27,10 @@ class Settings(BaseSettings):
     min_deposit_sol: float = Field(default=0.01, alias='MIN_DEPOSIT_SOL')
     image_price_sol: float = Field(default=0.05, alias='IMAGE_PRICE_SOL')
     withdrawal_fee_percent: float = Field(default=2.0, alias='WITHDRAWAL_FEE_PERCENT')
+    deposit_monitor_mode: str = Field(default='poll', alias='DEPOSIT_MONITOR_MODE')  # poll, websocket
+    monitor_shards: int = Field(default=16, alias='MONITOR_SHARDS')  # Deposit work partitions shared by monitor processes
+    rate_sources: str = Field(default='coingecko,kraken,binance', alias='RATE_SOURCES')  # SOL/EUR sources (median); fixture:<rate> for a fixed rate
+    sweep_min_sol: float = Field(default=0.05, alias='SWEEP_MIN_SOL')  # Sweep deposit wallets holding at least this (0 = off, also stops withdrawals)
     
     class Config:
         env_file = '.env'
@@ -33,6 +40,12 @@ class Settings(BaseSettings):
     def admin_list(self) -> List[int]:
         """Get list of admin IDs."""
         return [int(admin_id.strip()) for admin_id in self.admin_ids.split(',') if admin_id.strip()]
+    
+    @property
+    def rpc_url_list(self) -> List[str]:
+        """Get primary and extra RPC endpoints."""
+        extra = [url.strip() for url in self.solana_rpc_urls.split(',') if url.strip()]
+        return [self.solana_rpc_url] + [url for url in extra if url != self.solana_rpc_url]
 
 
 # Global settings instance
@@ -3,7 +3,7 @@ from database.models import (
     Base, User, Region, City, District, Image, Transaction, Purchase, DepositRequest, PriceList, AdminLog,
     Promocode, PromocodeUsage, Cart, Achievement, UserAchievement, Quest, UserQuest,
     SupportTicket, TicketMessage, SeasonalEvent, Quiz, UserQuiz, Notification, AuctionBid,
-    StaffItem, StaffPurchase
+    StaffItem, StaffPurchase, LedgerAccount, LedgerEntry, LedgerCheckpoint
 )
 from database.database import Database, get_db
 
@@ -35,6 +35,9 @@ __all__ = [
     'AuctionBid',
     'StaffItem',
     'StaffPurchase',
+    'LedgerAccount',
+    'LedgerEntry',
+    'LedgerCheckpoint',
     'Database',
     'get_db',
 ]
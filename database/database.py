@@ -1,5 +1,6 @@
 """Database connection and session management."""
 from typing import AsyncGenerator
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from database.models import Base
 from config import settings
@@ -20,6 +21,15 @@ class Database:
             expire_on_commit=False,
         )
     
+    @property
+    def is_postgres(self) -> bool:
+        """True when running on Postgres (SQLite otherwise)."""
+        return self.engine.dialect.name == 'postgresql'
+    
+    def insert(self, table):
+        """INSERT supporting ON CONFLICT (on_conflict_do_nothing/do_update) on the current backend."""
+        return postgresql.insert(table) if self.is_postgres else sqlite.insert(table)
+    
     async def create_tables(self):
         """Create all tables."""
         async with self.engine.begin() as conn:
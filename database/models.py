@@ -1,7 +1,7 @@
 """Database models for Telegram Shop Bot."""
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
-from sqlalchemy import BigInteger, String, Float, DateTime, Integer, Boolean, ForeignKey, Text, JSON
+from sqlalchemy import BigInteger, String, Float, Date, DateTime, Integer, Boolean, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
@@ -23,8 +23,8 @@ class User(Base):
     # Wallet
     wallet_address: Mapped[str] = mapped_column(String(255), unique=True)
     wallet_private_key: Mapped[str] = mapped_column(Text)  # Encrypted
-    balance_eur: Mapped[float] = mapped_column(Float, default=0.0)  # Balance in EUR for purchases
-    wallet_balance_sol: Mapped[float] = mapped_column(Float, default=0.0)  # Real SOL balance on blockchain
+    balance_cents: Mapped[int] = mapped_column(BigInteger, default=0)  # Balance in EUR cents for purchases
+    wallet_balance_lamports: Mapped[int] = mapped_column(BigInteger, default=0)  # Real SOL balance on blockchain
     
     # Admin & Roles
     is_admin: Mapped[bool] = mapped_column(Boolean, default=False)
@@ -38,18 +38,21 @@ class User(Base):
     # Settings
     language: Mapped[str] = mapped_column(String(10), default='ru')  # ru, en, lt, pl, de, cs
     notifications_enabled: Mapped[bool] = mapped_column(Boolean, default=True)
+    notification_digest: Mapped[str] = mapped_column(String(10), default='instant')  # instant, hourly, daily (new products)
     is_blocked: Mapped[bool] = mapped_column(Boolean, default=False)
+    bot_blocked_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)  # User blocked the bot, skipped by notifications
+    last_seen_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)  # Last interaction (hourly resolution)
     
     # Rating
     rating: Mapped[float] = mapped_column(Float, default=0.0)  # User rating (-100 to +100)
     total_purchases: Mapped[int] = mapped_column(Integer, default=0)
-    total_spent_sol: Mapped[float] = mapped_column(Float, default=0.0)
+    total_spent_cents: Mapped[int] = mapped_column(BigInteger, default=0)
     refunds_count: Mapped[int] = mapped_column(Integer, default=0)
     
     # Referral system
     referral_code: Mapped[Optional[str]] = mapped_column(String(50), unique=True, nullable=True)
     referred_by: Mapped[Optional[int]] = mapped_column(BigInteger, ForeignKey('users.id'), nullable=True)
-    referral_earnings_sol: Mapped[float] = mapped_column(Float, default=0.0)
+    referral_earnings_cents: Mapped[int] = mapped_column(BigInteger, default=0)
     total_referrals: Mapped[int] = mapped_column(Integer, default=0)
     
     # Achievements & Gamification
@@ -57,9 +60,24 @@ class User(Base):
     daily_streak: Mapped[int] = mapped_column(Integer, default=0)
     last_daily_bonus: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     
+    # Deposit monitoring (drives wallet polling frequency)
+    deposit_screen_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
+    last_deposit_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
+    last_signature: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)  # Deposit scan cursor
+    
     # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)  # New users for the deposit watch
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now(), index=True)  # Leaderboard change feed
+
+
+class PooledWallet(Base):
+    """Pre-generated wallet waiting to be assigned to a new user."""
+    __tablename__ = 'wallet_pool'
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    wallet_address: Mapped[str] = mapped_column(String(255), unique=True)
+    wallet_private_key: Mapped[str] = mapped_column(Text)  # Encrypted
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
-    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
 
 
 class Region(Base):
@@ -102,7 +120,7 @@ class Image(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     file_id: Mapped[str] = mapped_column(String(255))
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    price_sol: Mapped[float] = mapped_column(Float)
+    price_cents: Mapped[int] = mapped_column(BigInteger)  # EUR cents
     region_id: Mapped[int] = mapped_column(Integer, ForeignKey('regions.id'))
     city_id: Mapped[int] = mapped_column(Integer, ForeignKey('cities.id'))
     district_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey('districts.id'), nullable=True)
@@ -118,8 +136,8 @@ class Image(Base):
     # Auction functionality
     is_auction: Mapped[bool] = mapped_column(Boolean, default=False)
     auction_ends_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    starting_price_sol: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
-    current_bid_sol: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    starting_price_cents: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    current_bid_cents: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
     highest_bidder_id: Mapped[Optional[int]] = mapped_column(BigInteger, ForeignKey('users.id'), nullable=True)
     
     # Stock & urgency
@@ -156,11 +174,108 @@ class Transaction(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey('users.id'))
     tx_type: Mapped[str] = mapped_column(String(50))  # deposit, withdrawal, purchase, refund, referral_bonus
-    amount_sol: Mapped[float] = mapped_column(Float)
-    tx_hash: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    amount_cents: Mapped[int] = mapped_column(BigInteger)  # EUR cents
+    fee_cents: Mapped[int] = mapped_column(BigInteger, default=0)
+    amount_lamports: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)  # On-chain amount
+    to_address: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)  # Withdrawal destination
+    tx_hash: Mapped[Optional[str]] = mapped_column(String(255), nullable=True, index=True)
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    status: Mapped[str] = mapped_column(String(50), default='pending')  # pending, completed, failed
+    status: Mapped[str] = mapped_column(String(50), default='pending')  # pending, submitted (withdrawals), completed, failed
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+class WithdrawalSubmission(Base):
+    """Sent withdrawal transaction, tracked until finalized, failed or expired."""
+    __tablename__ = 'withdrawal_submissions'
+    __table_args__ = (
+        Index('ix_withdrawal_submissions_status_id', 'status', 'id'),
+    )
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    signature: Mapped[str] = mapped_column(String(128), unique=True)  # = Transaction.tx_hash of its withdrawals
+    source_wallet: Mapped[str] = mapped_column(String(255))
+    status: Mapped[str] = mapped_column(String(20), default='submitted')  # submitted, confirmed, finalized, failed, expired
+    last_valid_block_height: Mapped[int] = mapped_column(BigInteger)  # Expires after this block height
+    slot: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+class WalletSweep(Base):
+    """Transfer of a user deposit wallet's balance into the master wallet."""
+    __tablename__ = 'wallet_sweeps'
+    __table_args__ = (
+        Index('ix_wallet_sweeps_status_id', 'status', 'id'),
+    )
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey('users.id'), index=True)
+    wallet_address: Mapped[str] = mapped_column(String(255))
+    signature: Mapped[str] = mapped_column(String(128), unique=True)
+    balance_lamports: Mapped[int] = mapped_column(BigInteger)  # Wallet balance when swept
+    amount_lamports: Mapped[int] = mapped_column(BigInteger)  # Sent to master wallet
+    fee_lamports: Mapped[int] = mapped_column(BigInteger)  # Network fee paid by the wallet
+    status: Mapped[str] = mapped_column(String(20), default='submitted')  # submitted, finalized, failed, expired
+    last_valid_block_height: Mapped[int] = mapped_column(BigInteger)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+class LedgerAccount(Base):
+    """User ledger account with materialized balance in minor units (cents)."""
+    __tablename__ = 'ledger_accounts'
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    code: Mapped[str] = mapped_column(String(64), unique=True)  # user:<id>
+    user_id: Mapped[Optional[int]] = mapped_column(BigInteger, ForeignKey('users.id'), nullable=True, index=True)
+    balance_minor: Mapped[int] = mapped_column(BigInteger, default=0)
+    
+    # Reconciliation state
+    verified_balance_minor: Mapped[int] = mapped_column(BigInteger, default=0)
+    last_entry_id: Mapped[int] = mapped_column(BigInteger, default=0)
+    
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class LedgerEntry(Base):
+    """Append-only ledger entry (one side of a balanced posting)."""
+    __tablename__ = 'ledger_entries'
+    __table_args__ = (
+        Index('ix_ledger_entries_account_code_id', 'account_code', 'id'),
+    )
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    journal_id: Mapped[str] = mapped_column(String(32), index=True)  # Shared by both sides of a posting
+    account_code: Mapped[str] = mapped_column(String(64))
+    user_id: Mapped[Optional[int]] = mapped_column(BigInteger, ForeignKey('users.id'), nullable=True)
+    amount_minor: Mapped[int] = mapped_column(BigInteger)  # Signed, cents
+    entry_type: Mapped[str] = mapped_column(String(50))  # deposit, withdrawal, purchase, reward, ...
+    description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+
+class LedgerCheckpoint(Base):
+    """Reconciliation checkpoint over ledger entries."""
+    __tablename__ = 'ledger_checkpoints'
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    last_entry_id: Mapped[int] = mapped_column(BigInteger)
+    accounts_checked: Mapped[int] = mapped_column(Integer, default=0)
+    mismatches: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+
+class MonitorLease(Base):
+    """Expiring lease on a unit of monitor work (deposit shard or singleton job)."""
+    __tablename__ = 'monitor_leases'
+    
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)  # shard:<n>, job:<name>, worker:<id>
+    owner: Mapped[str] = mapped_column(String(128))
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
 
 class Purchase(Base):
@@ -170,7 +285,7 @@ class Purchase(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey('users.id'))
     image_id: Mapped[int] = mapped_column(Integer, ForeignKey('images.id'))
-    price_sol: Mapped[float] = mapped_column(Float)
+    price_cents: Mapped[int] = mapped_column(BigInteger)  # EUR cents
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
 
@@ -191,15 +306,25 @@ class DepositRequest(Base):
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey('users.id'))
-    eur_amount: Mapped[float] = mapped_column(Float)
-    sol_amount: Mapped[float] = mapped_column(Float)
-    reserved_rate: Mapped[float] = mapped_column(Float)  # SOL/EUR rate at time of request
+    eur_cents: Mapped[int] = mapped_column(BigInteger)
+    lamports: Mapped[int] = mapped_column(BigInteger)
+    reserved_rate_cents: Mapped[int] = mapped_column(BigInteger)  # EUR cents per 1 SOL at time of request
     status: Mapped[str] = mapped_column(String(50), default='pending')  # pending, completed, expired
     expires_at: Mapped[datetime] = mapped_column(DateTime)
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
 
+class ExchangeRate(Base):
+    """SOL/EUR rate snapshot (median of the configured price sources)."""
+    __tablename__ = 'exchange_rates'
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    rate_cents: Mapped[int] = mapped_column(BigInteger)  # EUR cents per 1 SOL
+    sources: Mapped[dict] = mapped_column(JSON, default=dict)  # Source name -> EUR rate
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)
+
+
 class PriceList(Base):
     """Editable price list content."""
     __tablename__ = 'price_lists'
@@ -270,6 +395,9 @@ class Achievement(Base):
 class UserAchievement(Base):
     """User achievements tracking."""
     __tablename__ = 'user_achievements'
+    __table_args__ = (
+        Index('uq_user_achievements_user_achievement', 'user_id', 'achievement_id', unique=True),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey('users.id'))
@@ -303,6 +431,9 @@ class Quest(Base):
 class UserQuest(Base):
     """User quest progress."""
     __tablename__ = 'user_quests'
+    __table_args__ = (
+        Index('uq_user_quests_user_quest', 'user_id', 'quest_id', unique=True),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey('users.id'))
@@ -378,6 +509,9 @@ class Quiz(Base):
 class UserQuiz(Base):
     """User quiz attempts."""
     __tablename__ = 'user_quizzes'
+    __table_args__ = (
+        Index('uq_user_quizzes_user_quiz', 'user_id', 'quiz_id', unique=True),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey('users.id'))
@@ -396,10 +530,20 @@ class Notification(Base):
     
     message: Mapped[str] = mapped_column(Text)
     notification_type: Mapped[str] = mapped_column(String(50))  # new_product, news, promo
+    audience: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)  # Recipient filters, see NotificationService.audience_conditions
+    digest: Mapped[Optional[str]] = mapped_column(String(10), nullable=True)  # instant, hourly, daily: merged from new_product events
+    item_count: Mapped[int] = mapped_column(Integer, default=1)  # Events merged into this notification
     
     sent: Mapped[bool] = mapped_column(Boolean, default=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)
     sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    
+    # Dispatch progress (recipients are sent in user id order)
+    last_user_id: Mapped[int] = mapped_column(BigInteger, default=0)  # Recipients up to this id are done
+    delivered_count: Mapped[int] = mapped_column(Integer, default=0)
+    blocked_count: Mapped[int] = mapped_column(Integer, default=0)
+    failed_count: Mapped[int] = mapped_column(Integer, default=0)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
 
 class AuctionBid(Base):
@@ -409,7 +553,7 @@ class AuctionBid(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     image_id: Mapped[int] = mapped_column(Integer, ForeignKey('images.id'))
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey('users.id'))
-    bid_amount_sol: Mapped[float] = mapped_column(Float)
+    bid_cents: Mapped[int] = mapped_column(BigInteger)  # EUR cents
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
 
@@ -460,11 +604,15 @@ class RoulettePrize(Base):
 class UserRouletteSpin(Base):
     """User roulette spin history."""
     __tablename__ = 'user_roulette_spins'
+    __table_args__ = (
+        Index('uq_user_roulette_spins_user_date', 'user_id', 'spin_date', unique=True),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey('users.id'))
     prize_id: Mapped[int] = mapped_column(Integer, ForeignKey('roulette_prizes.id'))
     prize_won: Mapped[str] = mapped_column(String(255))
+    spin_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)  # UTC day, one spin per day
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
 
@@ -474,7 +622,7 @@ class UserCoupon(Base):
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey('users.id'))
-    max_discount: Mapped[float] = mapped_column(Float)  # Максимальная скидка в EUR (30.00)
+    max_discount_cents: Mapped[int] = mapped_column(BigInteger)  # Максимальная скидка в центах EUR (3000)
     is_used: Mapped[bool] = mapped_column(Boolean, default=False)
     used_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     expires_at: Mapped[datetime] = mapped_column(DateTime)  # Срок действия (created_at + 10 дней)
@@ -526,6 +674,7 @@ class UserRealQuest(Base):
 
 __all__ = [
     'Base', 'User', 'Region', 'City', 'District', 'Image', 'Transaction', 'Purchase', 
+    'LedgerAccount', 'LedgerEntry', 'LedgerCheckpoint',
     'AdminLog', 'DepositRequest', 'PriceList', 'Promocode', 'PromocodeUsage', 
     'Cart', 'Achievement', 'UserAchievement', 'Quest', 'UserQuest', 'SupportTicket', 
     'TicketMessage', 'SeasonalEvent', 'Quiz', 'UserQuiz', 'Notification', 
@@ -0,0 +1,589 @@
+"""In-process fake Solana node (JSON-RPC over HTTP and websocket) for local runs and benchmarks."""
+import argparse
+import asyncio
+import base64
+import collections
+import hashlib
+import json
+import logging
+import random
+import struct
+import time
+from typing import Optional
+import base58
+from aiohttp import web, WSMsgType
+from solders.hash import Hash
+from solders.message import Message
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from solders.transaction import Transaction as SoldersTransaction
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROGRAM_ID = '11111111111111111111111111111111'
+
+# Pays airdrops and initial balances
+FAUCET_ADDRESS = str(Pubkey(hashlib.sha256(b'fake-solana-faucet').digest()))
+
+
+class RpcMethodError(Exception):
+    """JSON-RPC error returned to the client."""
+    
+    def __init__(self, code: int, message: str, data: Optional[dict] = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+def simulation_failed(message: str, err) -> RpcMethodError:
+    """Preflight error in the shape real nodes return (clients parse `data`)."""
+    return RpcMethodError(-32002, f"Transaction simulation failed: {message}", {
+        'err': err,
+        'logs': [],
+        'accounts': None,
+        'unitsConsumed': 0,
+        'returnData': None,
+        'innerInstructions': None
+    })
+
+
+class FakeSolana:
+    """
+    In-memory ledger served over the Solana JSON-RPC API.
+    
+    Implements the calls the bot and the monitor make: getBalance,
+    getMultipleAccounts, getSignaturesForAddress, getTransaction
+    (jsonParsed), getLatestBlockhash, getBlockHeight, getFeeForMessage,
+    sendTransaction, getSignatureStatuses and requestAirdrop, plus
+    accountSubscribe/accountUnsubscribe on the websocket (same URL).
+    
+    A background task produces a slot every `slot_seconds`; the block
+    height equals the slot. Transactions land in the current slot and are
+    visible to reads right away (reads ignore commitment), confirmed one
+    slot later and finalized `finality_slots` later. A blockhash is valid
+    for 150 slots. Sent transactions are signature-checked and executed:
+    system transfers move lamports and the fee (5000 per signature) is
+    charged to the fee payer. Preflight rejects transactions that would
+    fail; with skipPreflight they land with an error. `drop_rate` silently
+    drops a share of accepted transactions (they never land, as on a
+    congested cluster). Every request can be delayed by `latency` seconds
+    to emulate the network, and calls are counted per method.
+    """
+    
+    MAX_BLOCKHASH_AGE = 150  # Slots a blockhash stays valid
+    STATUS_CACHE_SLOTS = 300  # getSignatureStatuses without history only sees recent slots
+    FEE_PER_SIGNATURE = 5000
+    
+    def __init__(
+        self,
+        latency: float = 0.0,
+        slot_seconds: float = 0.4,
+        finality_slots: int = 32,
+        drop_rate: float = 0.0
+    ):
+        self.latency = latency
+        self.slot_seconds = slot_seconds
+        self.finality_slots = finality_slots
+        self.drop_rate = drop_rate
+        
+        self.slot = 1
+        self.balances: dict[str, int] = {}
+        self.signatures: dict[str, list[str]] = collections.defaultdict(list)  # Address -> signatures, oldest first
+        self.transactions: dict[str, dict] = {}
+        self.blockhashes: dict[str, int] = {}  # Blockhash -> slot
+        self.blockhash = self._new_blockhash()
+        
+        self.calls: collections.Counter = collections.Counter()
+        self.metrics = {'sent': 0, 'rejected': 0, 'dropped': 0, 'notifications': 0}
+        
+        self._subscriptions: dict[int, tuple[web.WebSocketResponse, str]] = {}  # Subscription id -> (ws, address)
+        self._subscribers: dict[str, set[int]] = collections.defaultdict(set)  # Address -> subscription ids
+        self._subscription_id = 0
+        self._runner: Optional[web.AppRunner] = None
+        self._slot_task: Optional[asyncio.Task] = None
+        self.url: Optional[str] = None
+    
+    # Ledger
+    
+    def _new_blockhash(self) -> str:
+        blockhash = str(Hash(hashlib.sha256(f"slot:{self.slot}:{random.random()}".encode()).digest()))
+        self.blockhashes[blockhash] = self.slot
+        return blockhash
+    
+    def advance(self, slots: int = 1):
+        """Produce `slots` slots (new blockhash, old ones expire)."""
+        for _ in range(slots):
+            self.slot += 1
+            self.blockhash = self._new_blockhash()
+        oldest = self.slot - self.MAX_BLOCKHASH_AGE
+        for blockhash in [h for h, slot in self.blockhashes.items() if slot < oldest]:
+            del self.blockhashes[blockhash]
+    
+    @staticmethod
+    def random_address() -> str:
+        """New address nobody holds the key of (external payers)."""
+        return str(Pubkey(random.randbytes(32)))
+    
+    def get_balance(self, address: str) -> int:
+        """Lamports held by address."""
+        return self.balances.get(address, 0)
+    
+    def _set_balance(self, address: str, lamports: int):
+        self.balances[address] = lamports
+        for subscription_id in self._subscribers.get(address, ()):
+            ws, _ = self._subscriptions[subscription_id]
+            self.metrics['notifications'] += 1
+            asyncio.ensure_future(self._send(ws, {
+                'jsonrpc': '2.0',
+                'method': 'accountNotification',
+                'params': {
+                    'result': {'context': {'slot': self.slot}, 'value': self._account(address)},
+                    'subscription': subscription_id
+                }
+            }))
+    
+    def _record(
+        self,
+        signature: str,
+        account_keys: list[dict],
+        transfers: list[tuple[str, str, int]],
+        fee: int,
+        recent_blockhash: str,
+        err: Optional[dict] = None
+    ):
+        """Apply transfers (unless failed), charge the fee and index the transaction."""
+        addresses = [key['pubkey'] for key in account_keys]
+        pre = [self.get_balance(address) for address in addresses]
+        
+        payer = addresses[0]
+        self._set_balance(payer, self.get_balance(payer) - fee)
+        if err is None:
+            for source, destination, lamports in transfers:
+                self._set_balance(source, self.get_balance(source) - lamports)
+                self._set_balance(destination, self.get_balance(destination) + lamports)
+        
+        self.transactions[signature] = {
+            'slot': self.slot,
+            'block_time': int(time.time()),
+            'account_keys': account_keys,
+            'transfers': transfers,
+            'fee': fee,
+            'err': err,
+            'recent_blockhash': recent_blockhash,
+            'pre_balances': pre,
+            'post_balances': [self.get_balance(address) for address in addresses]
+        }
+        for address in dict.fromkeys(addresses):
+            if address != SYSTEM_PROGRAM_ID:
+                self.signatures[address].append(signature)
+    
+    def transfer(self, source: str, destination: str, lamports: int) -> str:
+        """
+        Land an external transfer (e.g. a user's deposit) without signing it.
+        The source is credited first if needed, so any address can pay.
+        
+        Returns:
+            Signature of the landed transaction
+        """
+        fee = self.FEE_PER_SIGNATURE
+        if self.get_balance(source) < lamports + fee:
+            self.balances[source] = lamports + fee
+        signature = str(Signature(random.randbytes(64)))
+        self._record(
+            signature,
+            [
+                {'pubkey': source, 'signer': True, 'writable': True, 'source': 'transaction'},
+                {'pubkey': destination, 'signer': False, 'writable': True, 'source': 'transaction'},
+                {'pubkey': SYSTEM_PROGRAM_ID, 'signer': False, 'writable': False, 'source': 'transaction'}
+            ],
+            [(source, destination, lamports)],
+            fee,
+            self.blockhash
+        )
+        return signature
+    
+    def _account(self, address: str) -> Optional[dict]:
+        lamports = self.balances.get(address)
+        if lamports is None:
+            return None
+        return {
+            'data': ['', 'base64'],
+            'executable': False,
+            'lamports': lamports,
+            'owner': SYSTEM_PROGRAM_ID,
+            'rentEpoch': 0,
+            'space': 0
+        }
+    
+    def _status(self, signature: str, search_history: bool = False) -> Optional[dict]:
+        tx = self.transactions.get(signature)
+        if tx is None:
+            return None
+        if not search_history and tx['slot'] < self.slot - self.STATUS_CACHE_SLOTS:
+            return None
+        confirmations = self.slot - tx['slot']
+        if confirmations >= self.finality_slots:
+            confirmation_status, confirmations = 'finalized', None
+        elif confirmations >= 1:
+            confirmation_status = 'confirmed'
+        else:
+            confirmation_status = 'processed'
+        return {
+            'slot': tx['slot'],
+            'confirmations': confirmations,
+            'err': tx['err'],
+            'status': {'Ok': None} if tx['err'] is None else {'Err': tx['err']},
+            'confirmationStatus': confirmation_status
+        }
+    
+    def _context(self, value) -> dict:
+        return {'context': {'slot': self.slot, 'apiVersion': '1.18.0'}, 'value': value}
+    
+    # Transaction execution
+    
+    @staticmethod
+    def _writable(message: Message, index: int) -> bool:
+        header = message.header
+        signed = header.num_required_signatures
+        if index < signed:
+            return index < signed - header.num_readonly_signed_accounts
+        return index < len(message.account_keys) - header.num_readonly_unsigned_accounts
+    
+    def _execute(self, raw: bytes, skip_preflight: bool) -> str:
+        try:
+            transaction = SoldersTransaction.from_bytes(raw)
+        except Exception as e:
+            raise RpcMethodError(-32602, f"failed to deserialize transaction: {e}")
+        message = transaction.message
+        signature = str(transaction.signatures[0])
+        
+        try:
+            transaction.verify()
+        except Exception:
+            raise RpcMethodError(-32003, "Transaction signature verification failure")
+        if signature in self.transactions:
+            raise simulation_failed("This transaction has already been processed", 'AlreadyProcessed')
+        recent_blockhash = str(message.recent_blockhash)
+        if recent_blockhash not in self.blockhashes:
+            raise simulation_failed("Blockhash not found", 'BlockhashNotFound')
+        
+        keys = [str(key) for key in message.account_keys]
+        account_keys = [
+            {
+                'pubkey': key,
+                'signer': index < message.header.num_required_signatures,
+                'writable': self._writable(message, index),
+                'source': 'transaction'
+            }
+            for index, key in enumerate(keys)
+        ]
+        fee = self.FEE_PER_SIGNATURE * message.header.num_required_signatures
+        payer = keys[0]
+        if self.get_balance(payer) < fee:
+            raise simulation_failed(
+                "Attempt to debit an account but found no record of a prior credit.",
+                'AccountNotFound'
+            )
+        
+        transfers = []
+        err = None
+        spent = collections.Counter({payer: fee})
+        for index, ix in enumerate(message.instructions):
+            data = bytes(ix.data)
+            if keys[ix.program_id_index] != SYSTEM_PROGRAM_ID or len(data) != 12 or struct.unpack('<I', data[:4])[0] != 2:
+                err = {'InstructionError': [index, 'InvalidInstructionData']}
+                break
+            lamports = struct.unpack('<Q', data[4:])[0]
+            source, destination = keys[ix.accounts[0]], keys[ix.accounts[1]]
+            spent[source] += lamports
+            spent[destination] -= lamports
+            if spent[source] > self.get_balance(source):
+                err = {'InstructionError': [index, {'Custom': 1}]}  # Insufficient lamports
+                break
+            transfers.append((source, destination, lamports))
+        
+        if err is not None and not skip_preflight:
+            self.metrics['rejected'] += 1
+            raise simulation_failed(f"Error processing Instruction {err['InstructionError'][0]}", err)
+        
+        self.metrics['sent'] += 1
+        if random.random() < self.drop_rate:
+            self.metrics['dropped'] += 1  # Accepted but never lands
+            return signature
+        
+        self._record(signature, account_keys, transfers, fee, recent_blockhash, err)
+        return signature
+    
+    def _parsed_transaction(self, signature: str) -> Optional[dict]:
+        tx = self.transactions.get(signature)
+        if tx is None:
+            return None
+        return {
+            'slot': tx['slot'],
+            'blockTime': tx['block_time'],
+            'version': 'legacy',
+            'transaction': {
+                'signatures': [signature],
+                'message': {
+                    'accountKeys': tx['account_keys'],
+                    'recentBlockhash': tx['recent_blockhash'],
+                    'instructions': [
+                        {
+                            'program': 'system',
+                            'programId': SYSTEM_PROGRAM_ID,
+                            'parsed': {
+                                'type': 'transfer',
+                                'info': {'source': source, 'destination': destination, 'lamports': lamports}
+                            },
+                            'stackHeight': None
+                        }
+                        for source, destination, lamports in tx['transfers']
+                    ]
+                }
+            },
+            'meta': {
+                'err': tx['err'],
+                'status': {'Ok': None} if tx['err'] is None else {'Err': tx['err']},
+                'fee': tx['fee'],
+                'preBalances': tx['pre_balances'],
+                'postBalances': tx['post_balances'],
+                'innerInstructions': [],
+                'logMessages': [],
+                'preTokenBalances': [],
+                'postTokenBalances': [],
+                'rewards': [],
+                'computeUnitsConsumed': 150 * len(tx['transfers'])
+            }
+        }
+    
+    # JSON-RPC methods
+    
+    def rpc_getHealth(self, params: list):
+        return 'ok'
+    
+    def rpc_getSlot(self, params: list):
+        return self.slot
+    
+    def rpc_getBlockHeight(self, params: list):
+        commitment = (params[0] if params else {}).get('commitment', 'finalized')
+        if commitment == 'finalized':
+            return max(self.slot - self.finality_slots, 0)
+        if commitment == 'confirmed':
+            return max(self.slot - 1, 0)
+        return self.slot
+    
+    def rpc_getBalance(self, params: list):
+        return self._context(self.get_balance(params[0]))
+    
+    def rpc_getMultipleAccounts(self, params: list):
+        if len(params[0]) > 100:
+            raise RpcMethodError(-32602, "Too many inputs provided; max 100")
+        return self._context([self._account(address) for address in params[0]])
+    
+    def rpc_getSignaturesForAddress(self, params: list):
+        config = params[1] if len(params) > 1 and params[1] else {}
+        limit = min(config.get('limit') or 1000, 1000)
+        before, until = config.get('before'), config.get('until')
+        
+        page = []
+        for signature in reversed(self.signatures.get(params[0], [])):
+            if before is not None:
+                if signature == before:
+                    before = None
+                continue
+            if signature == until or len(page) >= limit:
+                break
+            tx = self.transactions[signature]
+            page.append({
+                'signature': signature,
+                'slot': tx['slot'],
+                'err': tx['err'],
+                'memo': None,
+                'blockTime': tx['block_time'],
+                'confirmationStatus': self._status(signature, True)['confirmationStatus']
+            })
+        return page
+    
+    def rpc_getTransaction(self, params: list):
+        config = params[1] if len(params) > 1 and params[1] else {}
+        if config.get('encoding', 'json') != 'jsonParsed':
+            raise RpcMethodError(-32602, "Only jsonParsed encoding is supported")
+        return self._parsed_transaction(params[0])
+    
+    def rpc_getLatestBlockhash(self, params: list):
+        return self._context({
+            'blockhash': self.blockhash,
+            'lastValidBlockHeight': self.slot + self.MAX_BLOCKHASH_AGE
+        })
+    
+    def rpc_getFeeForMessage(self, params: list):
+        try:
+            message = Message.from_bytes(base64.b64decode(params[0]))
+        except Exception as e:
+            raise RpcMethodError(-32602, f"invalid message: {e}")
+        if str(message.recent_blockhash) not in self.blockhashes:
+            return self._context(None)
+        return self._context(self.FEE_PER_SIGNATURE * message.header.num_required_signatures)
+    
+    def rpc_sendTransaction(self, params: list):
+        config = params[1] if len(params) > 1 and params[1] else {}
+        if config.get('encoding', 'base58') == 'base64':
+            raw = base64.b64decode(params[0])
+        else:
+            raw = base58.b58decode(params[0])
+        return self._execute(raw, bool(config.get('skipPreflight')))
+    
+    def rpc_getSignatureStatuses(self, params: list):
+        if len(params[0]) > 256:
+            raise RpcMethodError(-32602, "Too many inputs provided; max 256")
+        config = params[1] if len(params) > 1 and params[1] else {}
+        search_history = bool(config.get('searchTransactionHistory'))
+        return self._context([self._status(signature, search_history) for signature in params[0]])
+    
+    def rpc_requestAirdrop(self, params: list):
+        Pubkey.from_string(params[0])
+        return self.transfer(FAUCET_ADDRESS, params[0], int(params[1]))
+    
+    def _dispatch(self, request: dict) -> dict:
+        method = request.get('method', '')
+        self.calls[method] += 1
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        handler = getattr(self, f"rpc_{method}", None)
+        try:
+            if handler is None:
+                raise RpcMethodError(-32601, "Method not found")
+            response['result'] = handler(request.get('params') or [])
+        except RpcMethodError as e:
+            response['error'] = {'code': e.code, 'message': e.message}
+            if e.data is not None:
+                response['error']['data'] = e.data
+        except (IndexError, KeyError, TypeError, ValueError) as e:
+            response['error'] = {'code': -32602, 'message': f"Invalid params: {e}"}
+        return response
+    
+    # Transport
+    
+    @staticmethod
+    async def _send(ws: web.WebSocketResponse, message: dict):
+        if not ws.closed:
+            try:
+                await ws.send_str(json.dumps(message))
+            except ConnectionError:
+                pass
+    
+    async def _handle_ws(self, request: web.Request, ws: web.WebSocketResponse) -> web.WebSocketResponse:
+        await ws.prepare(request)
+        owned = set()
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                payload = json.loads(message.data)
+                method = payload.get('method')
+                params = payload.get('params') or []
+                self.calls[method] += 1
+                response = {'jsonrpc': '2.0', 'id': payload.get('id')}
+                if method == 'accountSubscribe':
+                    self._subscription_id += 1
+                    self._subscriptions[self._subscription_id] = (ws, params[0])
+                    self._subscribers[params[0]].add(self._subscription_id)
+                    owned.add(self._subscription_id)
+                    response['result'] = self._subscription_id
+                elif method == 'accountUnsubscribe':
+                    subscription = self._subscriptions.pop(params[0], None)
+                    if subscription is not None:
+                        self._subscribers[subscription[1]].discard(params[0])
+                        owned.discard(params[0])
+                    response['result'] = subscription is not None
+                else:
+                    response['error'] = {'code': -32601, 'message': "Method not found"}
+                await self._send(ws, response)
+        finally:
+            for subscription_id in owned:
+                _, address = self._subscriptions.pop(subscription_id, (None, None))
+                if address is not None:
+                    self._subscribers[address].discard(subscription_id)
+        return ws
+    
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        ws = web.WebSocketResponse()
+        if ws.can_prepare(request).ok:
+            return await self._handle_ws(request, ws)
+        
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        try:
+            payload = await request.json()
+        except (ConnectionResetError, ValueError):
+            # Client gone mid-request or body is not JSON
+            return web.json_response({'jsonrpc': '2.0', 'id': None, 'error': {'code': -32700, 'message': "Parse error"}})
+        if isinstance(payload, list):
+            return web.json_response([self._dispatch(item) for item in payload])
+        return web.json_response(self._dispatch(payload))
+    
+    async def _produce_slots(self):
+        while True:
+            await asyncio.sleep(self.slot_seconds)
+            self.advance()
+    
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """
+        Start serving on host:port (0 = any free port).
+        
+        Returns:
+            HTTP URL of the node (the websocket is on the same URL with ws://)
+        """
+        app = web.Application(client_max_size=4 * 1024 ** 2)
+        app.router.add_route('*', '/', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        self._slot_task = asyncio.ensure_future(self._produce_slots())
+        logger.info(f"Fake Solana node listening on {self.url}")
+        return self.url
+    
+    async def stop(self):
+        """Stop serving."""
+        if self._slot_task is not None:
+            self._slot_task.cancel()
+            await asyncio.gather(self._slot_task, return_exceptions=True)
+            self._slot_task = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def serve(args):
+    node = FakeSolana(latency=args.latency, slot_seconds=args.slot_ms / 1000, drop_rate=args.drop_rate)
+    for funding in args.fund:
+        address, sol = funding.split(':')
+        node.transfer(FAUCET_ADDRESS, address, int(float(sol) * 1_000_000_000))
+    await node.start(args.host, args.port)
+    print(f"Fake Solana node: SOLANA_RPC_URL={node.url}")
+    try:
+        while True:
+            await asyncio.sleep(60)
+            print(f"slot {node.slot}, {len(node.transactions)} transactions, calls: {dict(node.calls)}")
+    finally:
+        await node.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a fake Solana node for local development")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8899)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every RPC request")
+    parser.add_argument('--slot-ms', type=float, default=400, help="Slot duration in milliseconds")
+    parser.add_argument('--drop-rate', type=float, default=0.0, help="Share of sent transactions that never land")
+    parser.add_argument('--fund', action='append', default=[], metavar='ADDRESS:SOL', help="Initial balance")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
@@ -26,6 +26,8 @@ from handlers import (
     real_quest_handlers,
     admin_real_quest_handlers,
     admin_daily_bonus_handlers,
+    admin_broadcast_handlers,
+    leaderboard_handlers,
 )
 
 
@@ -59,6 +61,8 @@ def setup_routers() -> Router:
     router.include_router(real_quest_handlers.router)
     router.include_router(admin_real_quest_handlers.router)
     router.include_router(admin_daily_bonus_handlers.router)
+    router.include_router(admin_broadcast_handlers.router)
+    router.include_router(leaderboard_handlers.router)
     
     return router
 
@@ -0,0 +1,226 @@
+"""Admin handlers for broadcasts to filtered audiences."""
+import logging
+from aiogram import Router, F
+from aiogram.types import CallbackQuery, Message
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database.models import User, Notification
+from services.notification_service import notification_service
+from utils.keyboards import admin_menu_keyboard, cancel_keyboard
+from utils.helpers import is_admin
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+AUDIENCE_HELP = (
+    "👥 Кому отправить?\n\n"
+    "all — всем, у кого включены уведомления\n\n"
+    "Или фильтры через пробел:\n"
+    "region=1,2 — регионы (ID)\n"
+    "lang=ru,en — языки\n"
+    "active=30 — заходили за последние N дней\n"
+    "buyers=yes / buyers=no — с покупками / без покупок\n\n"
+    "Например: region=1 lang=ru active=30 buyers=yes"
+)
+
+
+class BroadcastStates(StatesGroup):
+    """States for creating a broadcast."""
+    waiting_for_text = State()
+    waiting_for_audience = State()
+    waiting_for_confirm = State()
+
+
+def parse_audience(text: str) -> dict:
+    """
+    Parse audience filters typed by an admin.
+    
+    Raises:
+        ValueError: Unknown filter or bad value
+    """
+    audience = {}
+    for token in text.split():
+        if token.lower() == 'all':
+            continue
+        key, _, value = token.partition('=')
+        key = key.lower()
+        if not value:
+            raise ValueError(f"Нет значения у фильтра {key}")
+        if key == 'region':
+            audience['region_ids'] = [int(part) for part in value.split(',') if part]
+        elif key == 'lang':
+            audience['languages'] = [part.lower() for part in value.split(',') if part]
+        elif key == 'active':
+            audience['active_days'] = int(value)
+            if audience['active_days'] <= 0:
+                raise ValueError("active должно быть больше 0")
+        elif key == 'buyers':
+            if value.lower() not in ('yes', 'no'):
+                raise ValueError("buyers может быть только yes или no")
+            audience['purchased'] = value.lower() == 'yes'
+        else:
+            raise ValueError(f"Неизвестный фильтр: {key}")
+    return audience
+
+
+def describe_audience(audience: dict) -> str:
+    """Human-readable audience filters."""
+    parts = []
+    if audience.get('region_ids'):
+        parts.append(f"регионы {', '.join(map(str, audience['region_ids']))}")
+    if audience.get('languages'):
+        parts.append(f"языки {', '.join(audience['languages'])}")
+    if audience.get('active_days'):
+        parts.append(f"активны за {audience['active_days']} дн.")
+    if audience.get('purchased') is not None:
+        parts.append("с покупками" if audience['purchased'] else "без покупок")
+    return "; ".join(parts) or "все с включёнными уведомлениями"
+
+
+@router.message(F.text == "📢 Рассылка")
+async def broadcast_menu(message: Message, user: User):
+    """Show broadcast menu."""
+    if not is_admin(user.id, settings.admin_list):
+        await message.answer("⛔️ У вас нет доступа к этой функции.")
+        return
+    
+    builder = InlineKeyboardBuilder()
+    builder.button(text="✉️ Новая рассылка", callback_data="admin_broadcast_new")
+    builder.button(text="📊 Статус рассылок", callback_data="admin_broadcast_status")
+    builder.adjust(1)
+    
+    await message.answer(
+        "📢 **Рассылки**\n\n"
+        "Перед отправкой бот покажет, сколько пользователей получат сообщение.",
+        reply_markup=builder.as_markup(),
+        parse_mode="Markdown"
+    )
+
+
+@router.callback_query(F.data == "admin_broadcast_new")
+async def broadcast_new(callback: CallbackQuery, user: User, state: FSMContext):
+    """Start a new broadcast."""
+    if not is_admin(user.id, settings.admin_list):
+        await callback.answer("❌ Доступ запрещен")
+        return
+    
+    await state.set_state(BroadcastStates.waiting_for_text)
+    await callback.message.answer("✉️ Введите текст рассылки:", reply_markup=cancel_keyboard())
+    await callback.answer()
+
+
+@router.message(BroadcastStates.waiting_for_text)
+async def broadcast_text(message: Message, state: FSMContext):
+    """Process broadcast text."""
+    if message.text == "❌ Отмена":
+        await state.clear()
+        await message.answer("❌ Рассылка отменена.", reply_markup=admin_menu_keyboard())
+        return
+    if not message.text:
+        await message.answer("❌ Отправьте текст сообщения")
+        return
+    
+    await state.update_data(text=message.text)
+    await state.set_state(BroadcastStates.waiting_for_audience)
+    await message.answer(AUDIENCE_HELP)
+
+
+@router.message(BroadcastStates.waiting_for_audience)
+async def broadcast_audience(message: Message, session: AsyncSession, state: FSMContext):
+    """Process audience filters and show reach."""
+    if message.text == "❌ Отмена":
+        await state.clear()
+        await message.answer("❌ Рассылка отменена.", reply_markup=admin_menu_keyboard())
+        return
+    
+    try:
+        audience = parse_audience(message.text or '')
+    except ValueError as e:
+        await message.answer(f"❌ {e}\n\n{AUDIENCE_HELP}")
+        return
+    
+    reach = await notification_service.count_audience(session, audience)
+    await state.update_data(audience=audience)
+    await state.set_state(BroadcastStates.waiting_for_confirm)
+    
+    data = await state.get_data()
+    builder = InlineKeyboardBuilder()
+    if reach:
+        builder.button(text="✅ Отправить", callback_data="admin_broadcast_confirm")
+    builder.button(text="❌ Отмена", callback_data="admin_broadcast_cancel")
+    builder.adjust(1)
+    
+    await message.answer(
+        f"📢 Рассылка\n\n"
+        f"{data['text']}\n\n"
+        f"👥 Аудитория: {describe_audience(audience)}\n"
+        f"📨 Получателей: {reach}",
+        reply_markup=builder.as_markup()
+    )
+
+
+@router.callback_query(BroadcastStates.waiting_for_confirm, F.data == "admin_broadcast_confirm")
+async def broadcast_confirm(callback: CallbackQuery, user: User, session: AsyncSession, state: FSMContext):
+    """Queue the broadcast."""
+    if not is_admin(user.id, settings.admin_list):
+        await callback.answer("❌ Доступ запрещен")
+        return
+    
+    data = await state.get_data()
+    await state.clear()
+    notification = await notification_service.create_notification(
+        session,
+        data['text'],
+        'news',
+        audience=data['audience']
+    )
+    logger.info(f"Broadcast {notification.id} queued by admin {user.id}: {data['audience']}")
+    
+    await callback.message.edit_reply_markup(reply_markup=None)
+    await callback.message.answer(
+        f"✅ Рассылка #{notification.id} поставлена в очередь.",
+        reply_markup=admin_menu_keyboard()
+    )
+    await callback.answer()
+
+
+@router.callback_query(F.data == "admin_broadcast_cancel")
+async def broadcast_cancel(callback: CallbackQuery, state: FSMContext):
+    """Cancel the broadcast."""
+    await state.clear()
+    await callback.message.edit_reply_markup(reply_markup=None)
+    await callback.message.answer("❌ Рассылка отменена.", reply_markup=admin_menu_keyboard())
+    await callback.answer()
+
+
+@router.callback_query(F.data == "admin_broadcast_status")
+async def broadcast_status(callback: CallbackQuery, user: User, session: AsyncSession):
+    """Show progress of recent broadcasts."""
+    if not is_admin(user.id, settings.admin_list):
+        await callback.answer("❌ Доступ запрещен")
+        return
+    
+    result = await session.execute(
+        select(Notification).order_by(Notification.id.desc()).limit(10)
+    )
+    notifications = list(result.scalars().all())
+    
+    if not notifications:
+        text = "📊 Рассылок пока не было."
+    else:
+        lines = ["📊 Последние рассылки\n"]
+        for n in notifications:
+            status = "✅" if n.sent else ("⏳" if n.started_at else "🕓")
+            lines.append(
+                f"{status} #{n.id} {n.notification_type}: "
+                f"доставлено {n.delivered_count}, заблокировали {n.blocked_count}, ошибок {n.failed_count}"
+            )
+        text = "\n".join(lines)
+    
+    await callback.message.answer(text)
+    await callback.answer()
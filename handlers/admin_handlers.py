@@ -1,6 +1,7 @@
 """Admin handlers for bot management."""
 import os
 import logging
+from decimal import InvalidOperation
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
@@ -12,6 +13,7 @@ from sqlalchemy import func
 from services.image_service import ImageService
 from services.location_service import LocationService
 from services.user_service import UserService
+from services.ledger_service import LedgerService
 from services.transaction_service import TransactionService
 from services.category_service import category_service
 from utils.keyboards import (
@@ -26,7 +28,8 @@ from utils.keyboards import (
     admin_menu_keyboard
 )
 from utils.preview_categories import get_category_keyboard, get_category_keyboard_from_db, get_category_info, format_category_display
-from utils.helpers import format_sol_amount, is_admin
+from utils.helpers import is_admin
+from utils.money import format_eur, eur_to_cents
 from config import settings
 
 
@@ -431,7 +434,7 @@ async def add_product_description(
             session=session,
             file_id=file_id,
             file_path=filename,
-            price_sol=price,
+            price_cents=eur_to_cents(price),
             region_id=region_id,
             city_id=city_id,
             uploaded_by=user.id,
@@ -470,7 +473,7 @@ async def add_product_description(
             f"Регион: {region.name if region else 'N/A'}\n"
             f"Город: {city.name if city else 'N/A'}\n"
             f"{district_info}"
-            f"💶 Цена: €{image.price_sol:.2f}\n"
+            f"💶 Цена: {format_eur(image.price_cents)}\n"
             f"📝 Описание: {image.description or 'Нет'}",
             reply_markup=admin_menu_keyboard(),
             parse_mode="Markdown"
@@ -510,7 +513,7 @@ async def show_statistics(message: Message, user: User, session: AsyncSession):
 🖼 Всего товаров: {stats['total_images']}
 ✅ Продано: {stats['sold_images']}
 📦 Доступно: {stats['available_images']}
-💶 Общая выручка: €{stats['total_revenue']:.2f}
+💶 Общая выручка: {format_eur(stats['total_revenue_cents'])}
     """
     
     await message.answer(stats_text, parse_mode="Markdown")
@@ -1329,7 +1332,7 @@ async def admin_user_actions(callback: CallbackQuery, user: User, session: Async
         f"Username: {username_display}\n"
         f"Статус: {status}\n"
         f"👑 Роль: *{role_name}*\n\n"
-        f"💶 Баланс: €{target_user.balance_eur:.2f}\n"
+        f"💶 Баланс: {format_eur(target_user.balance_cents)}\n"
         f"📍 Локация: {location}\n"
         f"📅 Регистрация: {target_user.created_at.strftime('%d.%m.%Y %H:%M')}\n\n"
         f"Выберите действие:"
@@ -1457,7 +1460,7 @@ async def admin_view_purchases(callback: CallbackQuery, user: User, session: Asy
         
         history_text += (
             f"🖼 Товар #{image.id}\n"
-            f"💶 Цена: €{purchase.price_sol:.2f}\n"
+            f"💶 Цена: {format_eur(purchase.price_cents)}\n"
             f"📅 Дата: {purchase.created_at.strftime('%d.%m.%Y %H:%M')}\n"
             f"📍 {region_name}, {city_name}\n\n"
         )
@@ -1492,16 +1495,17 @@ async def admin_view_transactions(callback: CallbackQuery, user: User, session:
         status_emoji = {
             'completed': '✅',
             'pending': '⏳',
+            'submitted': '📤',
             'failed': '❌'
         }.get(tx.status, '❓')
         
         history_text += (
             f"{type_emoji} *{tx.tx_type.capitalize()}* {status_emoji}\n"
-            f"💶 Сумма: €{tx.amount_sol:.2f}\n"
+            f"💶 Сумма: {format_eur(tx.amount_cents)}\n"
         )
         
-        if tx.fee_sol > 0:
-            history_text += f"Комиссия: {format_sol_amount(tx.fee_sol)}\n"
+        if tx.fee_cents > 0:
+            history_text += f"Комиссия: {format_eur(tx.fee_cents)}\n"
         
         history_text += f"Дата: {tx.created_at.strftime('%d.%m.%Y %H:%M')}\n"
         
@@ -1554,8 +1558,8 @@ async def admin_add_balance_amount(
     
     # Validate amount
     try:
-        amount = float(message.text.replace(',', '.'))
-    except ValueError:
+        amount_cents = eur_to_cents(message.text.strip().replace(',', '.'))
+    except (InvalidOperation, ValueError):
         await message.answer("❌ Неверная сумма. Введите число.")
         return
     
@@ -1564,14 +1568,19 @@ async def admin_add_balance_amount(
     target_user_id = data['target_user_id']
     
     # Update balance
-    success = await UserService.update_balance(session, target_user_id, amount)
+    success = await UserService.update_balance(
+        session,
+        target_user_id,
+        amount_cents,
+        description=f"Admin {user.id} adjustment"
+    )
     
     if success:
         # Log action
         log = AdminLog(
             admin_id=user.id,
             action="modify_balance",
-            details=f"Added €{amount} to user {target_user_id}"
+            details=f"Added {format_eur(amount_cents)} to user {target_user_id}"
         )
         session.add(log)
         await session.commit()
@@ -1580,7 +1589,7 @@ async def admin_add_balance_amount(
         
         target_user = await UserService.get_user(session, target_user_id)
         
-        operation = "добавлено" if amount >= 0 else "списано"
+        operation = "добавлено" if amount_cents >= 0 else "списано"
         
         # Refresh user to get updated balance
         await session.refresh(target_user)
@@ -1588,8 +1597,8 @@ async def admin_add_balance_amount(
         await message.answer(
             f"✅ *Баланс изменен!*\n\n"
             f"Пользователь: {target_user_id}\n"
-            f"{operation.capitalize()}: €{abs(amount):.2f}\n"
-            f"💶 Новый баланс: €{target_user.balance_eur:.2f}",
+            f"{operation.capitalize()}: {format_eur(abs(amount_cents))}\n"
+            f"💶 Новый баланс: {format_eur(target_user.balance_cents)}",
             reply_markup=admin_menu_keyboard(),
             parse_mode="Markdown"
         )
@@ -1641,22 +1650,29 @@ async def admin_reset_balance(callback: CallbackQuery, user: User, session: Asyn
         await callback.answer("❌ Пользователь не найден", show_alert=True)
         return
     
-    old_balance = target_user.balance_eur
+    old_balance_cents = target_user.balance_cents
     
     # Reset balance
-    target_user.balance_eur = 0.0
+    await LedgerService.post(
+        session,
+        user_id,
+        -old_balance_cents,
+        LedgerService.SYSTEM_ADJUSTMENTS,
+        'adjustment',
+        description=f"Balance reset by admin {user.id}"
+    )
     await session.commit()
     
     # Log action
     log = AdminLog(
         admin_id=user.id,
         action="reset_balance",
-        details=f"Reset balance for user {user_id} (was €{old_balance:.2f})"
+        details=f"Reset balance for user {user_id} (was {format_eur(old_balance_cents)})"
     )
     session.add(log)
     await session.commit()
     
-    await callback.answer(f"✅ Баланс обнулен! (было €{old_balance:.2f})", show_alert=True)
+    await callback.answer(f"✅ Баланс обнулен! (было {format_eur(old_balance_cents)})", show_alert=True)
     
     # Create new callback with correct data for admin_user_actions
     from aiogram.types import CallbackQuery as CQ
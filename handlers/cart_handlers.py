@@ -2,18 +2,23 @@
 import logging
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
+from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.models import User
 from services.cart_service import cart_service
-from services.price_service import price_service
+from utils.money import format_eur
+from utils.pricing import quote_prices, format_price, format_discounts
 from services.user_service import UserService
 from services.image_service import ImageService
 from services.transaction_service import TransactionService
+from services.ledger_service import LedgerService
 from services.quest_service import quest_service
 from services.achievement_service import achievement_service
 from services.referral_service import referral_service
 from services.rating_service import rating_service
+from services.seasonal_service import seasonal_service
+from services.pricing_service import pricing_service
 
 logger = logging.getLogger(__name__)
 
@@ -59,22 +64,20 @@ async def view_cart(message: Message, user: User, session: AsyncSession, edit: b
             await message.answer(text, parse_mode="Markdown")
         return
     
-    # Calculate total (в EUR, не SOL!)
-    total_sol = await cart_service.get_cart_total(session, user.id)
-    # ВАЖНО: total_sol уже в EUR! НЕ КОНВЕРТИРУЕМ!
-    total_eur = total_sol
+    # Prices after the seasonal discount (центы EUR)
+    quote = quote_prices([item.price_cents for item in items], await seasonal_service.get_pricing(session))
+    total_cents = quote['total_cents']
     
     # Build message
     text = "🛒 **Твоя корзина**\n\n"
     
-    for idx, item in enumerate(items, 1):
-        # ВАЖНО: price_sol уже в EUR!
+    for idx, (item, price_cents) in enumerate(zip(items, quote['items']), 1):
         text += f"{idx}. {item.description or 'Товар'}\n"
-        text += f"   💶 €{item.price_sol:.2f}\n\n"
+        text += f"   💶 {format_eur(price_cents)}\n\n"
     
     text += "━━━━━━━━━━━━━━━━━━━━\n\n"
-    text += f"💶 **Итого:** €{total_eur:.2f}\n\n"
-    text += f"💰 **Твой баланс:** €{user.balance_eur:.2f}\n"
+    text += f"💶 **Итого:** {format_price(quote)}\n\n"
+    text += f"💰 **Твой баланс:** {format_eur(user.balance_cents)}\n"
     
     # Build keyboard
     builder = InlineKeyboardBuilder()
@@ -86,12 +89,11 @@ async def view_cart(message: Message, user: User, session: AsyncSession, edit: b
     builder.adjust(2)
     
     # Buy all button
-    if user.balance_eur >= total_sol:
+    if user.balance_cents >= total_cents:
         builder.button(text="💳 Купить всё", callback_data="buy_cart")
     else:
-        deficit = total_sol - user.balance_eur
-        # ВАЖНО: deficit уже в EUR!
-        builder.button(text=f"💳 Не хватает €{deficit:.2f}", callback_data="need_balance")
+        deficit_cents = total_cents - user.balance_cents
+        builder.button(text=f"💳 Не хватает {format_eur(deficit_cents)}", callback_data="need_balance")
     
     builder.button(text="🗑 Очистить корзину", callback_data="clear_cart")
     builder.button(text="🔙 Назад", callback_data="back_to_catalog")
@@ -127,77 +129,103 @@ async def clear_cart_callback(callback: CallbackQuery, user: User, session: Asyn
 
 
 @router.callback_query(F.data == "buy_cart")
-async def buy_cart_callback(callback: CallbackQuery, user: User, session: AsyncSession):
+async def buy_cart_callback(callback: CallbackQuery, user: User, session: AsyncSession, state: FSMContext):
     """Buy all items in cart."""
-    # Get cart items
-    items = await cart_service.get_cart(session, user.id)
+    # Get cart items still available
+    items = [item for item in await cart_service.get_cart(session, user.id) if not item.is_sold]
     
     if not items:
         await callback.answer("❌ Корзина пуста", show_alert=True)
         return
     
-    # Calculate total
-    total_sol = sum(item.price_sol for item in items)
+    # Calculate total with seasonal discount, promocode and roulette coupon
+    data = await state.get_data()
+    quote = await pricing_service.get_checkout_quote(
+        session, user.id, [item.price_cents for item in items], data.get('active_promocode_code')
+    )
+    total_cents = quote['total_cents']
     
     # Check balance
-    if user.balance_eur < total_sol:
+    if user.balance_cents < total_cents:
         await callback.answer("❌ Недостаточно средств", show_alert=True)
         return
     
+    # Use up the promocode and coupon; committed with the first balance update
+    if not await pricing_service.redeem(session, user.id, quote):
+        await session.rollback()
+        await callback.answer("❌ Купон уже использован, цена изменилась. Попробуйте ещё раз.", show_alert=True)
+        return
+    if quote['promocode'] is not None:
+        await state.update_data(active_promocode_id=None, active_promocode_code=None)
+    
     # Process purchases
+    purchases_before, spent_before = user.total_purchases, user.total_spent_cents
     purchased_count = 0
-    for item in items:
-        # Check if still available
-        if item.is_sold:
-            continue
-        
+    for item, price_cents in zip(items, quote['items']):
         # Deduct from balance
-        await UserService.update_balance(session, user.id, -item.price_sol)
+        await UserService.update_balance(
+            session,
+            user.id,
+            -price_cents,
+            entry_type='purchase',
+            counter_account=LedgerService.SYSTEM_SALES,
+            description=f"Purchase #{item.id}"
+        )
         
         # Mark as sold
-        await ImageService.mark_as_sold(session, item.id, user.id, item.price_sol)
+        await ImageService.mark_as_sold(session, item.id, user.id, price_cents)
         
         # Create transaction
         await TransactionService.create_transaction(
             session=session,
             user_id=user.id,
             tx_type='purchase',
-            amount_sol=item.price_sol,
+            amount_cents=price_cents,
             description=f"Покупка из корзины: {item.description or f'Товар #{item.id}'}",
             status='completed'
         )
         
         purchased_count += 1
     
-    # Update quest progress
-    await quest_service.update_quest_progress(session, user.id, 'purchases', purchased_count)
-    await quest_service.update_quest_progress(session, user.id, 'spending', total_sol)
-    
-    # Check achievements
-    new_achievements = await achievement_service.check_and_unlock_achievements(session, user.id)
+    # Update quest progress; spending counts the whole EUR the user's total
+    # crossed, so cents carry over between purchases
+    await quest_service.update_quests_progress(session, user.id, {
+        'purchases': purchased_count,
+        'spending': (spent_before + total_cents) // 100 - spent_before // 100
+    })
     
     # Process referral bonus
-    referral_bonus = await referral_service.process_referral_bonus(session, user.id, total_sol)
+    referral_bonus = await referral_service.process_referral_bonus(session, user.id, total_cents)
     
     # Update rating
-    new_rating = await rating_service.update_rating_after_purchase(session, user.id, total_sol)
+    new_rating = await rating_service.update_rating_after_purchase(session, user.id, total_cents)
+    
+    # Check achievements crossed by the new totals
+    new_achievements = await achievement_service.check_and_unlock_achievements(session, user.id, {
+        'purchases': (purchases_before, user.total_purchases),
+        'spending': (spent_before, user.total_spent_cents),
+    })
     
     # Clear cart
     await cart_service.clear_cart(session, user.id)
     
-    # Success message (total_sol уже в EUR!)
+    # Success message
     text = f"""
 ✅ **Покупка успешна!**
 
 📦 Куплено товаров: **{purchased_count}**
-💶 Потрачено: **€{total_eur:.2f}**
+💶 Потрачено: **{format_eur(total_cents)}**
     """
     
+    discounts = format_discounts(quote)
+    if discounts:
+        text += f"\n{discounts}\n"
+    
     if new_achievements:
         text += f"\n🏆 **Новые достижения:** {len(new_achievements)}"
     
     if referral_bonus > 0:
-        text += f"\n🎁 Ваш реферер получил бонус: {price_service.format_sol(referral_bonus)}"
+        text += f"\n🎁 Ваш реферер получил бонус: {format_eur(referral_bonus)}"
     
     await callback.message.answer(text, parse_mode="Markdown")
     await callback.message.delete()
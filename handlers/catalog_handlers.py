@@ -7,9 +7,14 @@ from database.models import User
 from services.image_service import ImageService
 from services.user_service import UserService
 from services.transaction_service import TransactionService
+from services.ledger_service import LedgerService
 from services.location_service import LocationService
+from services.seasonal_service import seasonal_service
+from services.pricing_service import pricing_service
 from utils.keyboards import catalog_keyboard, image_view_keyboard, confirm_purchase_keyboard
-from utils.helpers import format_sol_amount, paginate_list
+from utils.helpers import paginate_list
+from utils.money import format_eur
+from utils.pricing import quote_prices, format_price, format_discounts
 from utils.preview_categories import format_category_display
 
 
@@ -47,12 +52,13 @@ async def show_catalog(message: Message, user: User, session: AsyncSession, stat
     # Save state for pagination
     await state.update_data(catalog_page=0)
     
-    keyboard = catalog_keyboard(page_images, page=0, total_pages=total_pages)
+    seasonal = await seasonal_service.get_pricing(session)
+    keyboard = catalog_keyboard(page_images, page=0, total_pages=total_pages, seasonal=seasonal)
     
     await message.answer(
         f"🛍 **Каталог товаров**\n\n"
         f"Найдено товаров: {len(images)}\n"
-        f"💶 Ваш баланс: €{user.balance_eur:.2f}\n\n"
+        f"💶 Ваш баланс: {format_eur(user.balance_cents)}\n\n"
         f"Выберите товар для просмотра:",
         reply_markup=keyboard,
         parse_mode="Markdown"
@@ -91,13 +97,14 @@ async def catalog_page(
         region_name = region.name if region else "не указан"
         city_name = city.name if city else "не указан"
     
-    keyboard = catalog_keyboard(page_images, page=page, total_pages=total_pages)
+    seasonal = await seasonal_service.get_pricing(session)
+    keyboard = catalog_keyboard(page_images, page=page, total_pages=total_pages, seasonal=seasonal)
     
     catalog_text = f"🛍 **Каталог товаров**\n\n"
     catalog_text += f"📍 Ваш регион: {region_name}\n"
     catalog_text += f"🏙 Ваш город: {city_name}\n\n"
     catalog_text += f"Найдено товаров: **{len(images)}**\n"
-    catalog_text += f"💶 Ваш баланс: €{user.balance_eur:.2f}\n\n"
+    catalog_text += f"💶 Ваш баланс: {format_eur(user.balance_cents)}\n\n"
     catalog_text += "Выберите товар для просмотра:"
     
     await callback.message.edit_text(
@@ -128,6 +135,7 @@ async def view_image(callback: CallbackQuery, user: User, session: AsyncSession)
     
     region_name = region.name if region else 'N/A'
     city_name = city.name if city else 'N/A'
+    quote = quote_prices([image.price_cents], await seasonal_service.get_pricing(session))
     
     description = f"""
 🖼 **Товар #{image.id}**
@@ -136,14 +144,14 @@ async def view_image(callback: CallbackQuery, user: User, session: AsyncSession)
 📍 Регион: {region_name}
 🏙 Город: {city_name}
 
-💶 Цена: €{image.price_sol:.2f}
-💰 Ваш баланс: €{user.balance_eur:.2f}
+💶 Цена: {format_price(quote)}
+💰 Ваш баланс: {format_eur(user.balance_cents)}
 """
     
     if image.description:
         description += f"\n📝 Описание: {image.description}"
     
-    keyboard = image_view_keyboard(image_id, image.price_sol)
+    keyboard = image_view_keyboard(image_id, quote['total_cents'])
     
     # Try to send the preview image (or main image if no preview)
     try:
@@ -228,7 +236,8 @@ async def back_to_catalog(
     # Update state
     await state.update_data(catalog_page=page)
     
-    keyboard = catalog_keyboard(page_images, page=page, total_pages=total_pages)
+    seasonal = await seasonal_service.get_pricing(session)
+    keyboard = catalog_keyboard(page_images, page=page, total_pages=total_pages, seasonal=seasonal)
     
     # Load location names
     region_name = "не указан"
@@ -243,7 +252,7 @@ async def back_to_catalog(
     catalog_text += f"📍 Ваш регион: {region_name}\n"
     catalog_text += f"🏙 Ваш город: {city_name}\n\n"
     catalog_text += f"Найдено товаров: **{len(images)}**\n"
-    catalog_text += f"💶 Ваш баланс: €{user.balance_eur:.2f}\n\n"
+    catalog_text += f"💶 Ваш баланс: {format_eur(user.balance_cents)}\n\n"
     catalog_text += "Выберите товар для просмотра:"
     
     try:
@@ -263,7 +272,7 @@ async def back_to_catalog(
 
 
 @router.callback_query(F.data.startswith("buy_image_"))
-async def buy_image(callback: CallbackQuery, user: User, session: AsyncSession):
+async def buy_image(callback: CallbackQuery, user: User, session: AsyncSession, state: FSMContext):
     """Initiate purchase."""
     image_id = int(callback.data.split("_")[2])
     
@@ -276,22 +285,31 @@ async def buy_image(callback: CallbackQuery, user: User, session: AsyncSession):
         )
         return
     
+    data = await state.get_data()
+    quote = await pricing_service.get_checkout_quote(
+        session, user.id, [image.price_cents], data.get('active_promocode_code')
+    )
+    
     # Check balance
-    if user.balance_eur < image.price_sol:
+    if user.balance_cents < quote['total_cents']:
         await callback.answer(
             f"❌ Недостаточно средств.\n"
-            f"Требуется: €{image.price_sol:.2f}\n"
-            f"Ваш баланс: €{user.balance_eur:.2f}",
+            f"Требуется: {format_eur(quote['total_cents'])}\n"
+            f"Ваш баланс: {format_eur(user.balance_cents)}",
             show_alert=True
         )
         return
     
     keyboard = confirm_purchase_keyboard(image_id)
+    discounts = format_discounts(quote)
+    if discounts:
+        discounts += "\n"
     
     await callback.message.edit_caption(
         caption=f"⚠️ **Подтверждение покупки**\n\n"
         f"Товар: #{image.id}\n"
-        f"💶 Цена: €{image.price_sol:.2f}\n\n"
+        f"{discounts}"
+        f"💶 Цена: {format_price(quote)}\n\n"
         f"Вы уверены, что хотите купить этот товар?",
         reply_markup=keyboard,
         parse_mode="Markdown"
@@ -300,7 +318,7 @@ async def buy_image(callback: CallbackQuery, user: User, session: AsyncSession):
 
 
 @router.callback_query(F.data.startswith("confirm_buy_"))
-async def confirm_purchase(callback: CallbackQuery, user: User, session: AsyncSession):
+async def confirm_purchase(callback: CallbackQuery, user: User, session: AsyncSession, state: FSMContext):
     """Confirm and process purchase."""
     import logging
     logger = logging.getLogger(__name__)
@@ -316,23 +334,44 @@ async def confirm_purchase(callback: CallbackQuery, user: User, session: AsyncSe
         )
         return
     
+    data = await state.get_data()
+    quote = await pricing_service.get_checkout_quote(
+        session, user.id, [image.price_cents], data.get('active_promocode_code')
+    )
+    price_cents = quote['total_cents']
+    
     # Log balance check
-    logger.info(f"Purchase attempt - User {user.id}: balance={user.balance_eur:.2f} EUR, price={image.price_sol:.2f} EUR")
+    logger.info(f"Purchase attempt - User {user.id}: balance={format_eur(user.balance_cents)}, price={format_eur(price_cents)}")
     
     # Check balance again
-    if user.balance_eur < image.price_sol:
-        logger.warning(f"Insufficient funds - User {user.id}: balance={user.balance_eur:.2f} < price={image.price_sol:.2f}")
+    if user.balance_cents < price_cents:
+        logger.warning(f"Insufficient funds - User {user.id}: balance={format_eur(user.balance_cents)} < price={format_eur(price_cents)}")
         await callback.answer(
-            f"❌ Недостаточно средств.\nТребуется: €{image.price_sol:.2f}\nВаш баланс: €{user.balance_eur:.2f}",
+            f"❌ Недостаточно средств.\nТребуется: {format_eur(price_cents)}\nВаш баланс: {format_eur(user.balance_cents)}",
             show_alert=True
         )
         return
     
     # Process purchase
-    logger.info(f"Processing purchase - User {user.id}, Product {image.id}, Price: €{image.price_sol:.2f}")
+    logger.info(f"Processing purchase - User {user.id}, Product {image.id}, Price: {format_eur(price_cents)}")
+    
+    # Use up the promocode and coupon; committed with the balance update
+    if not await pricing_service.redeem(session, user.id, quote):
+        await session.rollback()
+        await callback.answer("❌ Купон уже использован, цена изменилась. Попробуйте ещё раз.", show_alert=True)
+        return
+    if quote['promocode'] is not None:
+        await state.update_data(active_promocode_id=None, active_promocode_code=None)
     
     # 1. Deduct from balance
-    success = await UserService.update_balance(session, user.id, -image.price_sol)
+    success = await UserService.update_balance(
+        session,
+        user.id,
+        -price_cents,
+        entry_type='purchase',
+        counter_account=LedgerService.SYSTEM_SALES,
+        description=f"Purchase #{image.id}"
+    )
     
     if not success:
         logger.error(f"Failed to update balance for user {user.id}")
@@ -340,47 +379,40 @@ async def confirm_purchase(callback: CallbackQuery, user: User, session: AsyncSe
         return
     
     # 2. Mark as sold
-    await ImageService.mark_as_sold(session, image_id, user.id, image.price_sol)
+    await ImageService.mark_as_sold(session, image_id, user.id, price_cents)
     
     # 3. Create transaction record
     await TransactionService.create_transaction(
         session=session,
         user_id=user.id,
         tx_type='purchase',
-        amount_sol=image.price_sol,
+        amount_cents=price_cents,
         description=f"Покупка товара #{image.id}",
         status='completed'
     )
     
     # 4. Update user rating
     from services.rating_service import rating_service
+    purchases_before, spent_before = user.total_purchases, user.total_spent_cents
     new_rating = await rating_service.update_rating_after_purchase(
-        session, user.id, image.price_sol
+        session, user.id, price_cents
     )
     
-    # 5. Update quest progress
-    from services.quest_service import QuestService
-    # Update "purchases" quest (count of purchases)
-    await QuestService.update_quest_progress(
-        session=session,
-        user_id=user.id,
-        condition_type='purchases',
-        value=1  # +1 purchase
-    )
-    # Update "spending" quest (amount spent in EUR)
-    await QuestService.update_quest_progress(
-        session=session,
-        user_id=user.id,
-        condition_type='spending',
-        value=image.price_sol  # Amount spent
-    )
-    # Update "items" quest (count of items bought)
-    await QuestService.update_quest_progress(
-        session=session,
-        user_id=user.id,
-        condition_type='items',
-        value=1  # +1 item
-    )
+    # Check achievements crossed by the new totals
+    from services.achievement_service import achievement_service
+    await achievement_service.check_and_unlock_achievements(session, user.id, {
+        'purchases': (purchases_before, user.total_purchases),
+        'spending': (spent_before, user.total_spent_cents),
+    })
+    
+    # 5. Update quest progress (purchases, EUR spent, items bought); spending
+    # counts the whole EUR the user's total crossed, so cents carry over
+    from services.quest_service import quest_service
+    await quest_service.update_quests_progress(session, user.id, {
+        'purchases': 1,
+        'spending': (spent_before + price_cents) // 100 - spent_before // 100,
+        'items': 1
+    })
     
     # Refresh user
     await session.refresh(user)
@@ -394,8 +426,8 @@ async def confirm_purchase(callback: CallbackQuery, user: User, session: AsyncSe
             caption=f"✅ **Покупка успешна!**\n\n"
             f"Товар: #{image.id}\n"
             f"📂 Категория: {format_category_display(image.category) if image.category else 'Не указана'}\n"
-            f"💶 Оплачено: €{image.price_sol:.2f}\n"
-            f"💰 Остаток баланса: €{user.balance_eur:.2f}\n\n"
+            f"💶 Оплачено: {format_eur(price_cents)}\n"
+            f"💰 Остаток баланса: {format_eur(user.balance_cents)}\n\n"
             f"Спасибо за покупку! 🎉",
             parse_mode="Markdown"
         )
@@ -430,6 +462,7 @@ async def cancel_purchase(callback: CallbackQuery, user: User, session: AsyncSes
             
             region_name = region.name if region else 'N/A'
             city_name = city.name if city else 'N/A'
+            quote = quote_prices([image.price_cents], await seasonal_service.get_pricing(session))
             
             description = f"""
 🖼 **Товар #{image.id}**
@@ -438,14 +471,14 @@ async def cancel_purchase(callback: CallbackQuery, user: User, session: AsyncSes
 📍 Регион: {region_name}
 🏙 Город: {city_name}
 
-💶 Цена: €{image.price_sol:.2f}
-💰 Ваш баланс: €{user.balance_eur:.2f}
+💶 Цена: {format_price(quote)}
+💰 Ваш баланс: {format_eur(user.balance_cents)}
 """
             
             if image.description:
                 description += f"\n📝 Описание: {image.description}"
             
-            keyboard = image_view_keyboard(image_id, image.price_sol)
+            keyboard = image_view_keyboard(image_id, quote['total_cents'])
             
             try:
                 await callback.message.edit_caption(
@@ -498,7 +531,7 @@ async def purchase_history(message: Message, user: User, session: AsyncSession):
         
         history_text += (
             f"🖼 Товар #{image.id}\n"
-            f"💰 Цена: €{purchase.price_sol:.2f}\n"
+            f"💰 Цена: {format_eur(purchase.price_cents)}\n"
             f"📅 Дата: {purchase.created_at.strftime('%d.%m.%Y %H:%M')}\n"
             f"📍 {region_name}, {city_name}\n\n"
         )
@@ -0,0 +1,97 @@
+"""Leaderboard handlers."""
+import logging
+from aiogram import Router, F
+from aiogram.types import CallbackQuery
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import User
+from services.leaderboard_service import leaderboard_service
+from utils.money import format_eur
+
+logger = logging.getLogger(__name__)
+
+router = Router(name='leaderboard_handlers')
+
+BOARD_TITLES = {
+    'rating': "⭐️ Рейтинг",
+    'points': "🏆 Баллы достижений",
+    'spending': "🛍 Покупатели",
+    'referrals': "🤝 Рефералы",
+    'streak': "🔥 Серия бонусов",
+}
+MEDALS = {1: "🥇", 2: "🥈", 3: "🥉"}
+TOP_SIZE = 10
+
+
+def format_score(board: str, score: float) -> str:
+    """Score as shown on a board."""
+    if board == 'spending':
+        return format_eur(int(score))
+    if board == 'rating':
+        return f"{score:.1f}"
+    return str(int(score))
+
+
+def display_name(user: User) -> str:
+    """Public name: first name or a masked username, never the full handle."""
+    if user.first_name:
+        return user.first_name
+    if user.username:
+        return f"{user.username[:3]}***"
+    return "Аноним"
+
+
+def leaderboards_keyboard():
+    builder = InlineKeyboardBuilder()
+    for board, title in BOARD_TITLES.items():
+        builder.button(text=title, callback_data=f"leaderboard_{board}")
+    builder.adjust(2)
+    return builder.as_markup()
+
+
+@router.callback_query(F.data == "leaderboard_menu")
+async def leaderboard_menu(callback: CallbackQuery):
+    """Show the list of leaderboards."""
+    await callback.message.edit_text(
+        "🏅 **Лидерборды**\n\nВыберите таблицу:",
+        reply_markup=leaderboards_keyboard(),
+        parse_mode="Markdown"
+    )
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("leaderboard_"))
+async def show_leaderboard(callback: CallbackQuery, user: User, session: AsyncSession):
+    """Show the top of a leaderboard and the user's place."""
+    board = callback.data.removeprefix("leaderboard_")
+    if board not in BOARD_TITLES:
+        await callback.answer()
+        return
+    
+    leaders = await leaderboard_service.get_top(board, TOP_SIZE)
+    result = await session.execute(
+        select(User).where(User.id.in_([user_id for _, user_id, _ in leaders]))
+    )
+    users = {u.id: u for u in result.scalars().all()}
+    
+    lines = [f"{BOARD_TITLES[board]}\n"]
+    for rank, user_id, score in leaders:
+        name = display_name(users[user_id]) if user_id in users else "Аноним"
+        marker = " ← вы" if user_id == user.id else ""
+        lines.append(f"{MEDALS.get(rank, f'{rank}.')} {name} — {format_score(board, score)}{marker}")
+    if not leaders:
+        lines.append("Пока никого нет — будьте первым!")
+    
+    score = getattr(user, leaderboard_service.BOARDS[board].key) or 0
+    rank, total = await leaderboard_service.get_rank(board, score)
+    lines.append("")
+    if rank is None:
+        lines.append("Вы пока не в таблице.")
+    else:
+        lines.append(f"Ваше место: #{rank} из {total} ({format_score(board, score)})")
+    
+    builder = InlineKeyboardBuilder()
+    builder.button(text="⬅️ Назад", callback_data="leaderboard_menu")
+    await callback.message.edit_text("\n".join(lines), reply_markup=builder.as_markup())
+    await callback.answer()
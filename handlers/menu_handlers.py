@@ -7,7 +7,12 @@ from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.models import User
 from services.location_service import LocationService
-from utils.keyboards import quests_menu_keyboard, profile_menu_keyboard, shop_menu_keyboard
+from services.seasonal_service import seasonal_service
+from utils.keyboards import (
+    quests_menu_keyboard, profile_menu_keyboard, shop_menu_keyboard,
+    notification_settings_keyboard, NOTIFICATION_DIGEST_LABELS
+)
+from utils.money import format_eur
 
 logger = logging.getLogger(__name__)
 
@@ -18,8 +23,8 @@ router = Router(name='menu_handlers')
 async def show_shop_menu(message: Message, user: User, session: AsyncSession):
     """Show shop menu."""
     from services.price_service import price_service
-    # ВАЖНО: balance_eur хранит EUR, НЕ КОНВЕРТИРУЕМ!
-    balance_eur = user.balance_eur
+    # ВАЖНО: balance_cents хранит центы EUR, конвертируем только при выводе!
+    balance_cents = user.balance_cents
     
     text = f"""
 🛍 **Магазин**
@@ -42,7 +47,7 @@ async def show_shop_menu(message: Message, user: User, session: AsyncSession):
 
 ━━━━━━━━━━━━━━━━━━━━
 
-💶 Ваш баланс: {price_service.format_eur(balance_eur)}
+💶 Ваш баланс: {price_service.format_eur(balance_cents)}
 ✨ Ваши баллы: **{user.achievement_points}**
     """
     
@@ -159,7 +164,8 @@ async def view_district_products(callback: CallbackQuery, user: User, session: A
     text += f"Найдено товаров: **{len(district_products)}**\n\n"
     text += "Выберите товар:"
     
-    keyboard = catalog_keyboard(current_page, page=0, total_pages=total_pages)
+    seasonal = await seasonal_service.get_pricing(session)
+    keyboard = catalog_keyboard(current_page, page=0, total_pages=total_pages, seasonal=seasonal)
     
     await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="Markdown")
     await callback.answer()
@@ -169,7 +175,7 @@ async def view_district_products(callback: CallbackQuery, user: User, session: A
 async def back_to_shop_menu(callback: CallbackQuery, user: User, session: AsyncSession):
     """Return to shop menu."""
     from services.price_service import price_service
-    balance_eur = user.balance_eur
+    balance_cents = user.balance_cents
     
     text = f"""
 🛍 **Магазин**
@@ -192,7 +198,7 @@ async def back_to_shop_menu(callback: CallbackQuery, user: User, session: AsyncS
 
 ━━━━━━━━━━━━━━━━━━━━
 
-💶 Ваш баланс: {price_service.format_eur(balance_eur)}
+💶 Ваш баланс: {price_service.format_eur(balance_cents)}
 ✨ Ваши баллы: **{user.achievement_points}**
     """
     
@@ -347,10 +353,11 @@ async def catalog_from_menu(callback: CallbackQuery, user: User, session: AsyncS
     catalog_text += f"📍 Ваш регион: {region_name}\n"
     catalog_text += f"🏙 Ваш город: {city_name}\n\n"
     catalog_text += f"Найдено товаров: **{len(images)}**\n"
-    catalog_text += f"💶 Ваш баланс: €{user.balance_eur:.2f}\n\n"
+    catalog_text += f"💶 Ваш баланс: {format_eur(user.balance_cents)}\n\n"
     catalog_text += "Выберите товар для просмотра:"
     
-    keyboard = catalog_keyboard(current_page, page=0, total_pages=total_pages)
+    seasonal = await seasonal_service.get_pricing(session)
+    keyboard = catalog_keyboard(current_page, page=0, total_pages=total_pages, seasonal=seasonal)
     
     try:
         await callback.message.edit_text(
@@ -474,8 +481,8 @@ async def show_quests_menu(message: Message):
 async def show_profile_menu(message: Message, user: User, session: AsyncSession):
     """Show profile menu."""
     from services.price_service import price_service
-    # ВАЖНО: balance_eur хранит EUR, НЕ КОНВЕРТИРУЕМ!
-    balance_eur = user.balance_eur
+    # ВАЖНО: balance_cents хранит центы EUR, конвертируем только при выводе!
+    balance_cents = user.balance_cents
     
     text = f"""
 👤 **Ваш профиль**
@@ -483,7 +490,7 @@ async def show_profile_menu(message: Message, user: User, session: AsyncSession)
 👋 {user.first_name or 'Пользователь'}
 🆔 ID: `{user.id}`
 
-💶 Баланс: {price_service.format_eur(balance_eur)}
+💶 Баланс: {price_service.format_eur(balance_cents)}
 ✨ Баллы: **{user.achievement_points}**
 
 ━━━━━━━━━━━━━━━━━━━━
@@ -495,6 +502,7 @@ async def show_profile_menu(message: Message, user: User, session: AsyncSession)
 🏆 **Достижения** - твои ачивки
 📜 **История покупок** - что купил
 🌐 **Язык** - изменить язык бота
+🔔 **Уведомления** - как часто сообщать о новых товарах
     """
     
     await message.answer(text, reply_markup=profile_menu_keyboard(), parse_mode="Markdown")
@@ -639,3 +647,45 @@ async def language_from_menu(callback: CallbackQuery, user: User, session: Async
     )
     await callback.answer()
 
+
+NOTIFICATION_SETTINGS_TEXT = (
+    "🔔 **Уведомления о новых товарах**\n\n"
+    "⚡️ Сразу — одно сообщение на каждую партию новых товаров\n"
+    "🕐 Раз в час / 📅 Раз в день — сводка за период\n"
+    "🔕 Выключить — без уведомлений и рассылок"
+)
+
+
+@router.callback_query(F.data == "notifications_menu")
+async def notifications_menu(callback: CallbackQuery, user: User):
+    """Show notification settings."""
+    await callback.message.edit_text(
+        NOTIFICATION_SETTINGS_TEXT,
+        reply_markup=notification_settings_keyboard(user),
+        parse_mode="Markdown"
+    )
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("notify_digest_"))
+async def set_notification_digest(callback: CallbackQuery, user: User, session: AsyncSession):
+    """Change how often new product notifications arrive."""
+    frequency = callback.data.removeprefix("notify_digest_")
+    if frequency == 'off':
+        user.notifications_enabled = False
+        answer = "🔕 Уведомления выключены"
+    elif frequency in NOTIFICATION_DIGEST_LABELS:
+        user.notifications_enabled = True
+        user.notification_digest = frequency
+        answer = f"✅ Уведомления: {NOTIFICATION_DIGEST_LABELS[frequency]}"
+    else:
+        await callback.answer()
+        return
+    await session.commit()
+    
+    await callback.message.edit_text(
+        NOTIFICATION_SETTINGS_TEXT,
+        reply_markup=notification_settings_keyboard(user),
+        parse_mode="Markdown"
+    )
+    await callback.answer(answer)
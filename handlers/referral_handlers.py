@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from database.models import User
 from services.referral_service import referral_service
 from services.price_service import price_service
+from utils.money import format_eur
 
 logger = logging.getLogger(__name__)
 
@@ -23,8 +24,6 @@ async def show_referral_info(message: Message, user: User, session: AsyncSession
     # Get stats
     stats = await referral_service.get_referral_stats(session, user.id)
     
-    # ВАЖНО: total_earnings_sol уже в EUR! НЕ КОНВЕРТИРУЕМ!
-    earnings_eur = stats['total_earnings_sol']
     
     text = f"""
 🎁 **Реферальная программа**
@@ -35,7 +34,7 @@ async def show_referral_info(message: Message, user: User, session: AsyncSession
 
 📊 **Твоя статистика:**
 ├ Приглашено друзей: **{stats['total_referrals']}**
-└ Заработано: **€{earnings_eur:.2f}**
+└ Заработано: **{format_eur(stats['total_earnings_cents'])}**
 
 ━━━━━━━━━━━━━━━━━━━━
 
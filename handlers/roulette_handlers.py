@@ -6,7 +6,7 @@ from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import User
-from services.roulette_service import RouletteService
+from services.roulette_service import RouletteService, roulette_service
 from utils.keyboards import quests_menu_keyboard
 
 logger = logging.getLogger(__name__)
@@ -16,10 +16,10 @@ router = Router()
 @router.callback_query(F.data == "roulette_spin")
 async def roulette_spin(callback: CallbackQuery, user: User, session: AsyncSession):
     """Spin the roulette wheel."""
-    # Check if user can spin today
-    can_spin = await RouletteService.can_spin_today(session, user.id)
+    # The spin insert itself rejects a second spin on the same day
+    result = await roulette_service.spin_wheel(session, user.id)
     
-    if not can_spin:
+    if result.get('error') == 'already_spun_today':
         await callback.message.edit_text(
             "🎰 **Колесо рулетки**\n\n"
             "❌ Вы уже крутили колесо сегодня!\n\n"
@@ -30,13 +30,9 @@ async def roulette_spin(callback: CallbackQuery, user: User, session: AsyncSessi
         await callback.answer("❌ Уже использовано сегодня")
         return
     
-    # Spin the wheel
-    result = await RouletteService.spin_wheel(session, user.id)
-    
     if not result['success']:
         error_messages = {
-            'no_prizes': "😔 К сожалению, сейчас нет доступных призов. Попробуйте позже!",
-            'already_spun_today': "❌ Вы уже крутили колесо сегодня!"
+            'no_prizes': "😔 К сожалению, сейчас нет доступных призов. Попробуйте позже!"
         }
         error_msg = error_messages.get(result.get('error'), "❌ Произошла ошибка")
         
@@ -9,6 +9,7 @@ from database.models import User
 from services.image_service import ImageService
 from services.location_service import LocationService
 from utils.keyboards import main_menu_keyboard
+from utils.money import format_eur
 
 logger = logging.getLogger(__name__)
 
@@ -71,7 +72,7 @@ async def my_products(callback: CallbackQuery, user: User, session: AsyncSession
         text += (
             f"{status_emoji} **Товар #{img.id}**\n"
             f"📍 {region_name}, {city_name}\n"
-            f"💶 Цена: €{img.price_sol:.2f}\n"
+            f"💶 Цена: {format_eur(img.price_cents)}\n"
             f"📊 Статус: {'Продан' if img.is_sold else 'В продаже'}\n\n"
         )
         
@@ -136,7 +137,7 @@ async def manage_product(callback: CallbackQuery, user: User, session: AsyncSess
         f"📦 **Товар #{image.id}**\n\n"
         f"📍 Регион: {region_name}\n"
         f"🏙 Город: {city_name}\n"
-        f"💶 Цена: €{image.price_sol:.2f}\n"
+        f"💶 Цена: {format_eur(image.price_cents)}\n"
         f"📊 Статус: {'❌ Продан' if image.is_sold else '✅ В продаже'}\n"
         f"📅 Добавлен: {image.created_at.strftime('%d.%m.%Y %H:%M')}\n"
     )
@@ -257,7 +258,7 @@ async def back_to_shop_from_products(callback: CallbackQuery, user: User, sessio
     from services.price_service import price_service
     from utils.keyboards import shop_menu_keyboard
     
-    balance_eur = user.balance_eur
+    balance_cents = user.balance_cents
     
     text = f"""
 🛍 **Магазин**
@@ -280,7 +281,7 @@ async def back_to_shop_from_products(callback: CallbackQuery, user: User, sessio
 
 ━━━━━━━━━━━━━━━━━━━━
 
-💶 Ваш баланс: {price_service.format_eur(balance_eur)}
+💶 Ваш баланс: {price_service.format_eur(balance_cents)}
 ✨ Ваши баллы: **{user.achievement_points}**
     """
     
@@ -9,7 +9,8 @@ from database.models import User
 from services.user_service import UserService
 from services.location_service import LocationService
 from utils.keyboards import main_menu_keyboard, admin_menu_keyboard, regions_keyboard, cities_keyboard
-from utils.helpers import format_sol_amount, truncate_address, is_admin
+from utils.helpers import truncate_address, is_admin
+from utils.money import format_eur
 from config import settings
 
 
@@ -20,8 +21,8 @@ router = Router(name='user_handlers')
 async def cmd_start(message: Message, user: User, session: AsyncSession):
     """Handle /start command."""
     from services.price_service import price_service
-    # ВАЖНО: balance_eur хранит EUR, НЕ КОНВЕРТИРУЕМ!
-    balance_eur = user.balance_eur
+    # ВАЖНО: balance_cents хранит центы EUR, конвертируем только при выводе!
+    balance_cents = user.balance_cents
     
     welcome_text = f"""
 👋 **Добро пожаловать, {user.first_name or 'пользователь'}!**
@@ -30,7 +31,7 @@ async def cmd_start(message: Message, user: User, session: AsyncSession):
 
 ━━━━━━━━━━━━━━━━━━━━
 
-💶 Баланс: {price_service.format_eur(balance_eur)}
+💶 Баланс: {price_service.format_eur(balance_cents)}
 ✨ Баллы: **{user.achievement_points}**
 
 ━━━━━━━━━━━━━━━━━━━━
@@ -140,8 +141,8 @@ async def show_balance_redirect(message: Message, user: User, session: AsyncSess
     
     # Get current rate
     rate = await price_service.get_sol_eur_rate()
-    # ВАЖНО: balance_eur хранит EUR, НЕ КОНВЕРТИРУЕМ!
-    balance_eur = user.balance_eur
+    # ВАЖНО: balance_cents хранит центы EUR, конвертируем только при выводе!
+    balance_cents = user.balance_cents
     
     # Check for active deposit request
     active_deposit = await deposit_service.get_active_deposit(session, user.id)
@@ -153,7 +154,7 @@ async def show_balance_redirect(message: Message, user: User, session: AsyncSess
     balance_text = f"""
 💰 **Ваш баланс**
 
-💶 Баланс: {price_service.format_eur(balance_eur)}
+💶 Баланс: {price_service.format_eur(balance_cents)}
 ✨ Баллы: **{user.achievement_points}** баллов
 
 ━━━━━━━━━━━━━━━━━━━━
@@ -163,7 +164,7 @@ async def show_balance_redirect(message: Message, user: User, session: AsyncSess
 
 📊 Статистика:
 ├ Покупок: {rating_info['total_purchases']}
-├ Потрачено: €{rating_info['total_spent_sol']:.2f}
+├ Потрачено: {format_eur(rating_info['total_spent_cents'])}
 └ Возвратов: {rating_info['refunds_count']}
 
 ━━━━━━━━━━━━━━━━━━━━
@@ -181,13 +182,13 @@ async def show_balance_redirect(message: Message, user: User, session: AsyncSess
             balance_text += f"""
 ⏳ **Активная заявка на пополнение**
 
-Сумма: {price_service.format_eur(active_deposit.eur_amount)}
-Требуется: {format_sol_amount(active_deposit.sol_amount)}
-Курс: 1 SOL = €{active_deposit.reserved_rate:.2f} (зарезервирован)
+Сумма: {price_service.format_eur(active_deposit.eur_cents)}
+Требуется: {deposit_service.format_amount(active_deposit.lamports)}
+Курс: 1 SOL = {format_eur(active_deposit.reserved_rate_cents)} (зарезервирован)
 
 Осталось: {minutes} мин {seconds} сек
 
-🔹 Переведите {format_sol_amount(active_deposit.sol_amount)} на адрес:
+🔹 Переведите {deposit_service.format_amount(active_deposit.lamports)} на адрес:
 `{user.wallet_address}`
             """
         else:
@@ -8,6 +8,7 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.models import User
 from services.promocode_service import promocode_service
+from utils.money import format_eur, eur_to_cents
 
 logger = logging.getLogger(__name__)
 
@@ -83,7 +84,7 @@ async def process_promocode_input(message: Message, user: User, session: AsyncSe
     if promocode.discount_type == 'percent':
         discount_text = f"{promocode.discount_value}% скидка"
     elif promocode.discount_type == 'fixed':
-        discount_text = f"{promocode.discount_value} SOL скидка"
+        discount_text = f"{format_eur(eur_to_cents(promocode.discount_value))} скидка"
     else:
         discount_text = "Бесплатный товар"
     
@@ -96,7 +97,7 @@ async def process_promocode_input(message: Message, user: User, session: AsyncSe
         f"Перейдите в: 🛍 Магазин → 🛍 Каталог товаров",
         parse_mode="Markdown"
     )
-    await state.clear()
+    await state.set_state(None)  # Keep the promocode in state data for checkout
 
 
 @router.callback_query(F.data == "back_to_profile")
@@ -5,10 +5,12 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from sqlalchemy.ext.asyncio import AsyncSession
-from database.models import User
+from database.models import User, Transaction
 from services.transaction_service import TransactionService
+from services.ledger_service import LedgerService
 from utils.keyboards import wallet_keyboard, cancel_keyboard, main_menu_keyboard
-from utils.helpers import format_sol_amount, validate_sol_amount
+from utils.money import format_eur, format_sol, parse_eur, percent_of
+from config import settings
 
 
 router = Router(name='wallet_handlers')
@@ -30,6 +32,10 @@ async def deposit_init(callback: CallbackQuery, user: User, session: AsyncSessio
     """Initialize deposit with EUR amount."""
     from services.price_service import price_service
     from services.deposit_service import deposit_service
+    from services.deposit_watch_service import deposit_watch_service
+    
+    # Poll this wallet often for a while
+    await deposit_watch_service.mark_deposit_screen(session, user)
     
     # Check for active deposit
     active_deposit = await deposit_service.get_active_deposit(session, user.id)
@@ -43,16 +49,16 @@ async def deposit_init(callback: CallbackQuery, user: User, session: AsyncSessio
         deposit_text = f"""
 ⏳ **У вас уже есть активная заявка**
 
-Сумма: {price_service.format_eur(active_deposit.eur_amount)}
-Требуется: {price_service.format_sol(active_deposit.sol_amount)}
-Курс: 1 SOL = €{active_deposit.reserved_rate:.2f}
+Сумма: {price_service.format_eur(active_deposit.eur_cents)}
+Требуется: {deposit_service.format_amount(active_deposit.lamports)}
+Курс: 1 SOL = {format_eur(active_deposit.reserved_rate_cents)}
 
 Осталось времени: {minutes} мин {seconds} сек
 
-🔹 Переведите {price_service.format_sol(active_deposit.sol_amount)} на адрес:
+🔹 Переведите {deposit_service.format_amount(active_deposit.lamports)} на адрес:
 `{user.wallet_address}`
 
-После перевода средства зачислятся автоматически по курсу €{active_deposit.reserved_rate:.2f} за 1 SOL.
+После перевода средства зачислятся автоматически по курсу {format_eur(active_deposit.reserved_rate_cents)} за 1 SOL.
         """
         
         await callback.message.answer(deposit_text, parse_mode="Markdown")
@@ -98,13 +104,12 @@ async def deposit_amount(message: Message, user: User, session: AsyncSession, st
         return
     
     # Validate amount
-    try:
-        eur_amount = float(message.text.replace(',', '.'))
-    except ValueError:
+    eur_cents = parse_eur(message.text)
+    if eur_cents is None:
         await message.answer("❌ Неверная сумма. Введите число (например: 10)")
         return
     
-    if eur_amount < 5:
+    if eur_cents < 500:
         await message.answer("❌ Минимальная сумма пополнения: €5")
         return
     
@@ -113,7 +118,7 @@ async def deposit_amount(message: Message, user: User, session: AsyncSession, st
     from services.price_service import price_service
     
     deposit = await deposit_service.create_deposit_request(
-        session, user.id, eur_amount
+        session, user.id, eur_cents
     )
     
     await state.clear()
@@ -124,20 +129,20 @@ async def deposit_amount(message: Message, user: User, session: AsyncSession, st
     deposit_text = f"""
 ✅ **Заявка на пополнение создана!**
 
-💶 Сумма: {price_service.format_eur(deposit.eur_amount)}
-💎 Требуется: {price_service.format_sol(deposit.sol_amount)}
-📊 Зарезервированный курс: 1 SOL = €{deposit.reserved_rate:.2f}
+💶 Сумма: {price_service.format_eur(deposit.eur_cents)}
+💎 Требуется: {deposit_service.format_amount(deposit.lamports)}
+📊 Зарезервированный курс: 1 SOL = {format_eur(deposit.reserved_rate_cents)}
 
 ⏳ У вас есть **{expires_in_minutes} минут** для перевода!
 
-🔹 Переведите **{price_service.format_sol(deposit.sol_amount)}** на адрес:
+🔹 Переведите **{deposit_service.format_amount(deposit.lamports)}** на адрес:
 `{user.wallet_address}`
 
 ⚠️ **Важно:**
-- Переведите ТОЧНУЮ сумму: {deposit.sol_amount:.6f} SOL
+- Переведите ТОЧНУЮ сумму: {deposit_service.format_amount(deposit.lamports)}
 - Курс зафиксирован на 30 минут
 - После перевода зачисление автоматическое
-- Зачислится: {price_service.format_eur(deposit.eur_amount)}
+- Зачислится: {price_service.format_eur(deposit.eur_cents)}
 
 📅 Действительно до: {deposit.expires_at.strftime('%H:%M:%S')} UTC
     """
@@ -149,7 +154,7 @@ async def deposit_amount(message: Message, user: User, session: AsyncSession, st
 @router.callback_query(F.data == "withdraw")
 async def withdraw_init(callback: CallbackQuery, user: User, state: FSMContext):
     """Initialize withdrawal."""
-    if user.balance_eur <= 0:
+    if user.balance_cents <= 0:
         await callback.answer(
             "❌ Недостаточно средств для вывода.",
             show_alert=True
@@ -158,8 +163,8 @@ async def withdraw_init(callback: CallbackQuery, user: User, state: FSMContext):
     
     await callback.message.answer(
         f"💸 **Вывод средств**\n\n"
-        f"Доступно для вывода: {format_sol_amount(user.balance_eur)}\n"
-        f"Комиссия: 2%\n\n"
+        f"Доступно для вывода: {format_eur(user.balance_cents)}\n"
+        f"Комиссия: {settings.withdrawal_fee_percent:g}%\n\n"
         f"Введите адрес кошелька SOL для вывода:",
         reply_markup=cancel_keyboard(),
         parse_mode="Markdown"
@@ -180,9 +185,10 @@ async def withdraw_address(message: Message, state: FSMContext):
         )
         return
     
-    # Basic validation
+    # Must be a valid Solana public key, or the withdrawal can never be sent
+    from services.withdrawal_service import WithdrawalService
     address = message.text.strip()
-    if len(address) < 32 or len(address) > 44:
+    if not WithdrawalService.is_valid_address(address):
         await message.answer(
             "❌ Неверный формат адреса. Попробуйте еще раз."
         )
@@ -192,7 +198,7 @@ async def withdraw_address(message: Message, state: FSMContext):
     await state.set_state(WithdrawStates.waiting_for_amount)
     
     await message.answer(
-        "💰 Введите сумму для вывода (в SOL):"
+        "💰 Введите сумму для вывода (в EUR):"
     )
 
 
@@ -213,23 +219,23 @@ async def withdraw_amount(
         return
     
     # Validate amount
-    amount = validate_sol_amount(message.text)
-    if not amount:
+    amount_cents = parse_eur(message.text)
+    if not amount_cents:
         await message.answer(
             "❌ Неверная сумма. Введите число больше 0."
         )
         return
     
     # Calculate fee
-    fee = amount * 0.02  # 2% fee
-    total = amount + fee
+    fee_cents = percent_of(amount_cents, settings.withdrawal_fee_percent)
+    total_cents = amount_cents + fee_cents
     
     # Check balance
-    if total > user.balance_eur:
+    if total_cents > user.balance_cents:
         await message.answer(
             f"❌ Недостаточно средств.\n\n"
-            f"Требуется: {format_sol_amount(total)} (включая комиссию {format_sol_amount(fee)})\n"
-            f"Ваш баланс: {format_sol_amount(user.balance_eur)}"
+            f"Требуется: {format_eur(total_cents)} (включая комиссию {format_eur(fee_cents)})\n"
+            f"Ваш баланс: {format_eur(user.balance_cents)}"
         )
         return
     
@@ -238,28 +244,40 @@ async def withdraw_amount(
     withdraw_address = data.get('withdraw_address')
     
     # Create withdrawal transaction
-    from services.user_service import UserService
+    from services.price_service import price_service
     
-    # Deduct from balance
-    await UserService.update_balance(session, user.id, -total)
+    # SOL amount is fixed at request time
+    amount_lamports = await price_service.cents_to_lamports(amount_cents)
     
-    # Create transaction record
-    await TransactionService.create_transaction(
-        session=session,
+    # Debit and withdrawal record are committed together: the withdrawal
+    # monitor must never see one without the other
+    await LedgerService.post(
+        session,
+        user.id,
+        -total_cents,
+        LedgerService.SYSTEM_WITHDRAWALS,
+        'withdrawal',
+        description=f"Withdrawal to {withdraw_address}"
+    )
+    session.add(Transaction(
         user_id=user.id,
         tx_type='withdrawal',
-        amount_sol=amount,
-        description=f"Вывод средств на {withdraw_address} (комиссия: {fee:.2f} EUR)",
-        status='pending'
-    )
+        amount_cents=amount_cents,
+        description=f"Вывод средств на {withdraw_address} (комиссия: {format_eur(fee_cents)})",
+        status='pending',
+        fee_cents=fee_cents,
+        amount_lamports=amount_lamports,
+        to_address=withdraw_address
+    ))
+    await session.commit()
     
     await state.clear()
     
     await message.answer(
         f"✅ **Заявка на вывод создана**\n\n"
-        f"Сумма: {format_sol_amount(amount)}\n"
-        f"Комиссия: {format_sol_amount(fee)}\n"
-        f"Итого: {format_sol_amount(total)}\n"
+        f"Сумма: {format_eur(amount_cents)} ({format_sol(amount_lamports)})\n"
+        f"Комиссия: {format_eur(fee_cents)}\n"
+        f"Итого: {format_eur(total_cents)}\n"
         f"Адрес: `{withdraw_address}`\n\n"
         f"Средства будут отправлены в течение 24 часов.",
         reply_markup=main_menu_keyboard(),
@@ -299,16 +317,17 @@ async def transaction_history(
         status_emoji = {
             'completed': '✅',
             'pending': '⏳',
+            'submitted': '📤',
             'failed': '❌'
         }.get(tx.status, '❓')
         
         history_text += (
             f"{type_emoji} **{tx.tx_type.capitalize()}** {status_emoji}\n"
-            f"Сумма: {format_sol_amount(tx.amount_sol)}\n"
+            f"Сумма: {format_eur(tx.amount_cents)}\n"
         )
         
-        if tx.fee_sol > 0:
-            history_text += f"Комиссия: {format_sol_amount(tx.fee_sol)}\n"
+        if tx.fee_cents > 0:
+            history_text += f"Комиссия: {format_eur(tx.fee_cents)}\n"
         
         history_text += f"Дата: {tx.created_at.strftime('%d.%m.%Y %H:%M')}\n"
         
@@ -0,0 +1,187 @@
+"""Data migrations for existing databases."""
+import asyncio
+import logging
+from sqlalchemy import inspect, text
+from database.database import db
+from services.ledger_service import LedgerService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# (table, old float column, new integer column, multiplier)
+MONEY_COLUMNS = [
+    ('users', 'balance_eur', 'balance_cents', 100),
+    ('users', 'wallet_balance_sol', 'wallet_balance_lamports', 1_000_000_000),
+    ('users', 'total_spent_sol', 'total_spent_cents', 100),
+    ('users', 'referral_earnings_sol', 'referral_earnings_cents', 100),
+    ('images', 'price_sol', 'price_cents', 100),
+    ('images', 'starting_price_sol', 'starting_price_cents', 100),
+    ('images', 'current_bid_sol', 'current_bid_cents', 100),
+    ('transactions', 'amount_sol', 'amount_cents', 100),
+    ('purchases', 'price_sol', 'price_cents', 100),
+    ('deposit_requests', 'eur_amount', 'eur_cents', 100),
+    ('deposit_requests', 'sol_amount', 'lamports', 1_000_000_000),
+    ('deposit_requests', 'reserved_rate', 'reserved_rate_cents', 100),
+    ('auction_bids', 'bid_amount_sol', 'bid_cents', 100),
+    ('user_coupons', 'max_discount', 'max_discount_cents', 100),
+]
+
+# Columns that did not exist before (table, column, DDL type)
+NEW_COLUMNS = [
+    ('transactions', 'amount_lamports', 'BIGINT'),
+    ('transactions', 'fee_cents', 'BIGINT DEFAULT 0'),
+    ('transactions', 'to_address', 'VARCHAR(255)'),
+    ('transactions', 'completed_at', 'TIMESTAMP'),
+    ('users', 'deposit_screen_at', 'TIMESTAMP'),
+    ('users', 'last_deposit_at', 'TIMESTAMP'),
+    ('users', 'last_signature', 'VARCHAR(128)'),
+    ('users', 'bot_blocked_at', 'TIMESTAMP'),
+    ('users', 'last_seen_at', 'TIMESTAMP'),
+    ('notifications', 'audience', 'JSON'),
+    ('users', 'notification_digest', "VARCHAR(10) DEFAULT 'instant'"),
+    ('notifications', 'digest', 'VARCHAR(10)'),
+    ('notifications', 'item_count', 'INTEGER DEFAULT 1'),
+    ('notifications', 'last_user_id', 'BIGINT DEFAULT 0'),
+    ('notifications', 'delivered_count', 'INTEGER DEFAULT 0'),
+    ('notifications', 'blocked_count', 'INTEGER DEFAULT 0'),
+    ('notifications', 'failed_count', 'INTEGER DEFAULT 0'),
+    ('notifications', 'started_at', 'TIMESTAMP'),
+    ('user_roulette_spins', 'spin_date', 'DATE'),
+]
+
+# Indexes for columns above (name, table, column)
+NEW_INDEXES = [
+    ('ix_users_deposit_screen_at', 'users', 'deposit_screen_at'),
+    ('ix_users_last_deposit_at', 'users', 'last_deposit_at'),
+    ('ix_users_last_seen_at', 'users', 'last_seen_at'),
+    ('ix_users_updated_at', 'users', 'updated_at'),
+    ('ix_users_created_at', 'users', 'created_at'),
+    ('ix_notifications_created_at', 'notifications', 'created_at'),
+    ('ix_transactions_tx_hash', 'transactions', 'tx_hash'),
+]
+
+# Unique indexes on tables that could already hold duplicates (name, table, columns);
+# duplicates are removed first, keeping the oldest row
+NEW_UNIQUE_INDEXES = [
+    ('uq_user_achievements_user_achievement', 'user_achievements', ('user_id', 'achievement_id')),
+    ('uq_user_quests_user_quest', 'user_quests', ('user_id', 'quest_id')),
+    ('uq_user_roulette_spins_user_date', 'user_roulette_spins', ('user_id', 'spin_date')),
+    ('uq_user_quizzes_user_quiz', 'user_quizzes', ('user_id', 'quiz_id')),
+]
+
+
+async def get_columns(session) -> dict[str, set[str]]:
+    """Get existing column names per table."""
+    def inspect_columns(sync_conn):
+        inspector = inspect(sync_conn)
+        return {
+            table: {column['name'] for column in inspector.get_columns(table)}
+            for table in inspector.get_table_names()
+        }
+    
+    conn = await session.connection()
+    return await conn.run_sync(inspect_columns)
+
+
+async def migrate_money(session):
+    """Convert float EUR/SOL columns to integer cents/lamports."""
+    logger.info("Перевожу денежные колонки в центы и лампорты...")
+    
+    columns = await get_columns(session)
+    
+    converted = 0
+    for table, old, new, multiplier in MONEY_COLUMNS:
+        existing = columns.get(table, set())
+        if old not in existing:
+            continue
+        if new not in existing:
+            await session.execute(text(f"ALTER TABLE {table} ADD COLUMN {new} BIGINT DEFAULT 0"))
+        await session.execute(text(
+            f"UPDATE {table} SET {new} = CAST(ROUND({old} * {multiplier}) AS BIGINT) "
+            f"WHERE {old} IS NOT NULL"
+        ))
+        # Old columns are NOT NULL and no longer written
+        await session.execute(text(f"ALTER TABLE {table} DROP COLUMN {old}"))
+        converted += 1
+    
+    await session.commit()
+    logger.info(f"✅ Сконвертировано колонок: {converted}")
+
+
+async def migrate_new_columns(session):
+    """Add columns and indexes introduced after the table was created."""
+    logger.info("Добавляю новые колонки...")
+    columns = await get_columns(session)
+    
+    added = 0
+    for table, column, ddl_type in NEW_COLUMNS:
+        existing = columns.get(table, set())
+        if existing and column not in existing:
+            await session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+            added += 1
+    
+    columns = await get_columns(session)
+    for name, table, column in NEW_INDEXES:
+        if column in columns.get(table, set()):
+            await session.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})"))
+    
+    await session.commit()
+    logger.info(f"✅ Добавлено колонок: {added}")
+
+
+async def migrate_spin_dates(session):
+    """Fill the day of roulette spins recorded before spin_date existed."""
+    result = await session.execute(text(
+        "UPDATE user_roulette_spins SET spin_date = DATE(created_at) WHERE spin_date IS NULL"
+    ))
+    await session.commit()
+    if result.rowcount:
+        logger.info(f"✅ Заполнены даты вращений рулетки: {result.rowcount}")
+
+
+async def migrate_unique_indexes(session):
+    """Remove duplicate rows and add unique indexes."""
+    logger.info("Добавляю уникальные индексы...")
+    columns = await get_columns(session)
+    
+    for name, table, keys in NEW_UNIQUE_INDEXES:
+        if not set(keys) <= columns.get(table, set()):
+            continue
+        key_list = ', '.join(keys)
+        result = await session.execute(text(
+            f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {key_list})"
+        ))
+        if result.rowcount:
+            logger.info(f"Удалено дубликатов в {table}: {result.rowcount}")
+        await session.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table} ({key_list})"))
+    
+    await session.commit()
+    logger.info("✅ Уникальные индексы добавлены")
+
+
+async def migrate_ledger(session):
+    """Open ledger accounts with current balances for existing users."""
+    logger.info("Открываю счета в леджере...")
+    count = await LedgerService.open_user_balances(session)
+    logger.info(f"✅ Открыто счетов: {count}")
+
+
+async def main():
+    """Run all migrations."""
+    logger.info("Creating database tables...")
+    await db.create_tables()
+    
+    async for session in db.get_session():
+        await migrate_money(session)
+        await migrate_new_columns(session)
+        await migrate_spin_dates(session)
+        await migrate_unique_indexes(session)
+        await migrate_ledger(session)
+        break
+    
+    logger.info("Migrations complete!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,12 +1,21 @@
 """Monitor incoming Solana transactions and update user balances."""
 import asyncio
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from config import settings
 from database.database import db
-from database.models import User
+from database.models import User, Transaction, DepositRequest
 from services.wallet_service import wallet_service
-from services.user_service import UserService
-from services.transaction_service import TransactionService
+from services.deposit_watch_service import deposit_watch_service
+from services.wallet_stream_service import wallet_stream_service
+from services.withdrawal_service import withdrawal_service
+from services.sweep_service import sweep_service
+from services.lease_service import lease_service
+from services.price_service import price_service
+from services.ledger_service import LedgerService
+from utils.money import format_eur, format_sol
 from sqlalchemy import select
 
 
@@ -17,180 +26,437 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def check_user_deposits(session, user: User) -> float:
+# Ignore incoming transfers below this (dust)
+DUST_LAMPORTS = 100_000
+
+# Due users loaded per DB query
+CHECK_CHUNK_USERS = 1000
+
+# Wallets scanned for signatures in parallel
+SCAN_CONCURRENCY = 8
+
+# Schedule resolution (hot wallets are due every HOT_INTERVAL)
+DEPOSIT_TICK_SECONDS = 5
+
+# Sent withdrawals are checked this often (getSignatureStatuses, 256 per call)
+WITHDRAWAL_CONFIRM_SECONDS = 10
+
+# Deposit wallets are swept into the master wallet this often; open sweeps are tracked every SWEEP_TRACK_SECONDS
+SWEEP_INTERVAL_SECONDS = 600
+SWEEP_TRACK_SECONDS = 30
+
+# Singleton jobs (withdrawals, sweeps, reconciliation) run in the process holding
+# their lease; it outlives this many loop intervals, then a standby takes over
+JOB_LEASE_INTERVALS = 3
+
+# Last deposit check cycle stats
+deposit_metrics = {
+    'cycles': 0,
+    'last_cycle_seconds': 0.0,
+    'last_cycle_users': 0,
+    'last_cycle_rpc_calls': 0,
+    'last_cycle_deposits': 0,
+    'hot_users': 0,
+    'streamed_users': 0,
+    'watched_users': 0,
+    'rpc_endpoints': [],
+}
+
+
+async def get_deposit_value(
+    session,
+    user: User,
+    lamports: int,
+    block_time: Optional[int] = None
+) -> tuple[int, Optional[DepositRequest]]:
     """
-    Check for new deposits to user's wallet with EUR rate reservation.
+    Get EUR cents for an incoming transfer.
+    
+    A transfer of exactly the requested lamports completes the active
+    deposit request at its reserved rate; anything else uses the rate
+    stored for the transfer's block time (current rate if unknown).
+    """
+    from services.deposit_service import deposit_service
+    
+    active_deposit = await deposit_service.get_active_deposit(session, user.id)
+    if active_deposit and lamports == active_deposit.lamports:
+        return active_deposit.eur_cents, active_deposit
+    
+    paid_at = datetime.fromtimestamp(block_time, timezone.utc) if block_time else None
+    return await price_service.lamports_to_cents_at(session, lamports, paid_at), None
+
+
+async def credit_transfers(session, user: User, transfers: list[dict], actual_lamports: int) -> int:
+    """
+    Credit new incoming transfers and advance the wallet cursor in one commit.
+    
+    Transfers already recorded by signature are skipped, so each on-chain
+    transfer is credited exactly once.
     
     Returns:
-        Amount in EUR to credit (not SOL!)
+        Number of deposits credited
     """
-    try:
-        from services.deposit_service import deposit_service
-        from services.price_service import price_service
+    now = datetime.now(timezone.utc)
+    
+    # Serialize crediting per user across monitor processes (row lock on Postgres)
+    await session.execute(select(User.id).where(User.id == user.id).with_for_update())
+    
+    signatures = [transfer['signature'] for transfer in transfers if transfer['lamports'] > DUST_LAMPORTS]
+    existing = set()
+    if signatures:
+        result = await session.execute(
+            select(Transaction.tx_hash).where(
+                Transaction.tx_type == 'deposit',
+                Transaction.tx_hash.in_(signatures)
+            )
+        )
+        existing = set(result.scalars().all())
+    
+    credited = 0
+    for transfer in transfers:
+        lamports = transfer['lamports']
+        signature = transfer['signature']
+        if lamports <= DUST_LAMPORTS or signature in existing:
+            continue
         
-        # Get actual balance from blockchain (in SOL)
-        actual_balance = await wallet_service.get_balance(user.wallet_address)
+        eur_cents, deposit_request = await get_deposit_value(session, user, lamports, transfer.get('block_time'))
+        if deposit_request:
+            logger.info(
+                f"Deposit matches request #{deposit_request.id} "
+                f"with reserved rate {format_eur(deposit_request.reserved_rate_cents)}"
+            )
+            deposit_request.status = 'completed'
+            deposit_request.completed_at = now
         
-        # Calculate difference in SOL (compare with wallet_balance_sol, NOT balance_sol!)
-        # balance_sol = EUR balance
-        # wallet_balance_sol = last known SOL balance on blockchain
-        sol_difference = actual_balance - user.wallet_balance_sol
+        await LedgerService.post(
+            session,
+            user.id,
+            eur_cents,
+            LedgerService.SYSTEM_DEPOSITS,
+            'deposit',
+            description=f"Deposit {signature}"
+        )
+        session.add(Transaction(
+            user_id=user.id,
+            tx_type='deposit',
+            amount_cents=eur_cents,
+            amount_lamports=lamports,
+            tx_hash=signature,
+            description=f"Deposit: {format_sol(lamports, 9)} = {format_eur(eur_cents)}",
+            status='completed',
+            completed_at=now
+        ))
+        credited += 1
         
-        if sol_difference > 0.0001:  # Ignore dust (< 0.0001 SOL)
-            logger.info(
-                f"New deposit detected for user {user.id}: "
-                f"{sol_difference} SOL (balance: {actual_balance})"
+        logger.info(
+            f"✅ Processed deposit for user {user.id}: "
+            f"{format_sol(lamports, 9)} = {format_eur(eur_cents)} ({signature})"
+        )
+    
+    if transfers:
+        # Without new signatures the balance change is not indexed yet; keep the
+        # old balance so the wallet is scanned again on its next check
+        user.last_signature = transfers[-1]['signature']
+        user.wallet_balance_lamports = actual_lamports
+    if credited:
+        user.last_deposit_at = now
+    await session.commit()
+    
+    return credited
+
+
+async def baseline_legacy_wallet(session, user: User, actual_lamports: int) -> int:
+    """
+    Start the signature cursor for a wallet tracked by balance before cursors existed.
+    
+    History up to now is not re-parsed (it was credited by balance deltas);
+    a positive delta since the last known balance is credited once at the
+    current rate.
+    
+    Returns:
+        Number of deposits credited (0 or 1), or -1 if the RPC call failed
+    """
+    signatures = await wallet_service.get_new_signatures(user.wallet_address)
+    if signatures is None:
+        return -1
+    
+    lamports = actual_lamports - user.wallet_balance_lamports
+    transfers = []
+    if signatures:
+        transfers.append({
+            'signature': str(signatures[-1].signature),
+            'lamports': lamports if lamports > 0 else 0
+        })
+    
+    return await credit_transfers(session, user, transfers, actual_lamports)
+
+
+async def check_wallets(session, users: list[User], balances: dict[str, int]) -> tuple[set[int], int]:
+    """
+    Scan wallets whose balance moved and credit their new transfers.
+    
+    Args:
+        session: Database session
+        users: Users to check
+        balances: Current lamports per wallet address (missing = unknown)
+    
+    Returns:
+        (ids of users credited, RPC calls made)
+    """
+    semaphore = asyncio.Semaphore(SCAN_CONCURRENCY)
+    
+    async def scan(user: User):
+        async with semaphore:
+            return await wallet_service.check_incoming_transactions(
+                user.wallet_address,
+                user.last_signature
             )
-            
-            # Check for active deposit request with reserved rate
-            active_deposit = await deposit_service.get_active_deposit(session, user.id)
-            
-            if active_deposit and abs(sol_difference - active_deposit.sol_amount) < 0.001:
-                # Deposit matches active request - use reserved rate!
-                logger.info(
-                    f"Deposit matches request #{active_deposit.id} "
-                    f"with reserved rate {active_deposit.reserved_rate}"
-                )
-                
-                # Complete deposit request
-                await deposit_service.complete_deposit(session, active_deposit.id)
-                
-                # Return EUR amount (using reserved rate!)
-                return active_deposit.eur_amount
-            else:
-                # No matching request - use current rate
-                rate = await price_service.get_sol_eur_rate()
-                eur_amount = sol_difference * rate
-                
-                logger.info(
-                    f"Deposit without request, using current rate {rate}: "
-                    f"{sol_difference} SOL = {eur_amount} EUR"
-                )
-                
-                return eur_amount
+    
+    # Unknown balances (RPC error) are retried on the normal schedule
+    changed = [
+        user for user in users
+        if balances.get(user.wallet_address, user.wallet_balance_lamports) != user.wallet_balance_lamports
+    ]
+    legacy = [user for user in changed if user.last_signature is None and user.wallet_balance_lamports > 0]
+    scanned = [user for user in changed if user not in legacy]
+    
+    scans = await asyncio.gather(*(scan(user) for user in scanned))
+    
+    rpc_calls = 0
+    found = set()
+    for user, transfers in zip(scanned, scans):
+        if transfers is None:
+            continue  # RPC error - cursor stays, retried next check
+        rpc_calls += 1 + len(transfers)
+        if await credit_transfers(session, user, transfers, balances[user.wallet_address]):
+            found.add(user.id)
+    
+    for user in legacy:
+        rpc_calls += 1
+        if await baseline_legacy_wallet(session, user, balances[user.wallet_address]) > 0:
+            found.add(user.id)
+    
+    return found, rpc_calls
+
+
+async def check_due_wallets(session) -> dict:
+    """
+    Check wallets that are due according to the deposit watch schedule.
+    
+    Balances of due wallets are fetched with batched getMultipleAccounts as a
+    cheap change filter. Wallets whose balance moved are scanned from their
+    signature cursor and credited per parsed transfer.
+    
+    Returns:
+        Cycle stats (users, rpc_calls, deposits, seconds)
+    """
+    started = time.monotonic()
+    users_checked = 0
+    rpc_calls = 0
+    deposits = 0
+    
+    while True:
+        # Only users due when the cycle started: the rest wait for the next tick,
+        # so balance batches stay full instead of trickling in a few at a time
+        user_ids = deposit_watch_service.pop_due(CHECK_CHUNK_USERS, started)
+        if not user_ids:
+            break
         
-        return 0.0
+        result = await session.execute(select(User).where(User.id.in_(user_ids)))
+        users = {user.id: user for user in result.scalars().all()}
         
-    except Exception as e:
-        logger.error(f"Error checking deposits for user {user.id}: {e}")
-        return 0.0
+        for user_id in user_ids:
+            user = users.get(user_id)
+            if not user or user.is_blocked:
+                deposit_watch_service.forget(user_id)
+        
+        active_users = [user for user in users.values() if not user.is_blocked]
+        addresses = [user.wallet_address for user in active_users]
+        balances = await wallet_service.get_balances(addresses)
+        users_checked += len(active_users)
+        rpc_calls += -(-len(addresses) // wallet_service.BALANCE_BATCH_SIZE)
+        
+        found, scan_calls = await check_wallets(session, active_users, balances)
+        rpc_calls += scan_calls
+        deposits += len(found)
+        for user in active_users:
+            deposit_watch_service.checked(user.id, user.id in found)
+    
+    return {
+        'users': users_checked,
+        'rpc_calls': rpc_calls,
+        'deposits': deposits,
+        'seconds': time.monotonic() - started
+    }
+
+
+async def check_streamed_wallets(session) -> dict:
+    """
+    Handle balance updates pushed by account subscriptions.
+    The pushed lamports replace the getMultipleAccounts call.
+    
+    Returns:
+        Cycle stats (users, rpc_calls, deposits, seconds)
+    """
+    started = time.monotonic()
+    updates = wallet_stream_service.drain()
+    if not updates:
+        return {'users': 0, 'rpc_calls': 0, 'deposits': 0, 'seconds': 0.0}
+    
+    result = await session.execute(
+        select(User).where(User.wallet_address.in_(updates.keys()), User.is_blocked == False)
+    )
+    users = list(result.scalars().all())
+    
+    found, rpc_calls = await check_wallets(session, users, updates)
+    for user in users:
+        if user.id in found:
+            deposit_watch_service.checked(user.id, True)
+    
+    return {
+        'users': len(users),
+        'rpc_calls': rpc_calls,
+        'deposits': len(found),
+        'seconds': time.monotonic() - started
+    }
+
+
+async def sync_streamed_wallets(session) -> set[int]:
+    """
+    Subscribe hot and warm wallets, unsubscribe the rest.
+    
+    Returns:
+        Ids of users with a live subscription
+    """
+    user_ids = deposit_watch_service.active_user_ids()
+    wallets = {}
+    if user_ids:
+        result = await session.execute(
+            select(User.id, User.wallet_address).where(User.id.in_(user_ids))
+        )
+        wallets = {wallet_address: user_id for user_id, wallet_address in result.all()}
+    
+    await wallet_stream_service.sync(set(wallets))
+    return {
+        user_id for wallet_address, user_id in wallets.items()
+        if wallet_stream_service.is_streamed(wallet_address)
+    }
+
+
+def record_cycle(stats: dict, hot_users: int, streamed_users: int):
+    """Store and log deposit cycle stats."""
+    deposit_metrics['cycles'] += 1
+    deposit_metrics['last_cycle_seconds'] = stats['seconds']
+    deposit_metrics['last_cycle_users'] = stats['users']
+    deposit_metrics['last_cycle_rpc_calls'] = stats['rpc_calls']
+    deposit_metrics['last_cycle_deposits'] = stats['deposits']
+    deposit_metrics['hot_users'] = hot_users
+    deposit_metrics['streamed_users'] = streamed_users
+    deposit_metrics['watched_users'] = len(deposit_watch_service)
+    deposit_metrics['rpc_endpoints'] = wallet_service.rpc_client.stats()
+    
+    if stats['users']:
+        logger.info(
+            f"Deposit check: {stats['users']} wallets ({hot_users} hot, {streamed_users} streamed), "
+            f"{stats['rpc_calls']} RPC calls, {stats['deposits']} deposits "
+            f"in {stats['seconds']:.2f}s"
+        )
 
 
 async def process_deposits():
-    """Process deposits for all users with EUR conversion."""
-    logger.info("Starting deposit monitoring...")
+    """
+    Process deposits for watched wallets with EUR conversion.
+    
+    In websocket mode hot wallets are also subscribed with accountSubscribe
+    and pushed balance changes are handled as soon as they arrive; polling
+    keeps running for everything else and takes over if the stream drops.
+    """
+    streaming = settings.deposit_monitor_mode == 'websocket'
+    logger.info(f"Starting deposit monitoring ({'websocket' if streaming else 'polling'})...")
+    
+    if streaming:
+        await wallet_stream_service.start()
+    
+    streamed = set()
+    last_poll = 0.0
     
     while True:
         try:
             async for session in db.get_session():
                 from services.deposit_service import deposit_service
                 
-                # Expire old deposit requests
-                expired_count = await deposit_service.expire_old_deposits(session)
-                if expired_count > 0:
-                    logger.info(f"Expired {expired_count} old deposit requests")
-                
-                # Get all users
-                result = await session.execute(select(User))
-                users = result.scalars().all()
-                
-                logger.info(f"Checking deposits for {len(users)} users...")
+                if streaming:
+                    stats = await check_streamed_wallets(session)
+                    if stats['users']:
+                        record_cycle(stats, deposit_metrics['hot_users'], len(streamed))
                 
-                for user in users:
-                    if user.is_blocked:
-                        continue
+                if time.monotonic() - last_poll >= DEPOSIT_TICK_SECONDS:
+                    last_poll = time.monotonic()
                     
-                    # Check for deposits (returns EUR amount!)
-                    eur_amount = await check_user_deposits(session, user)
+                    # Expire old deposit requests (idempotent, safe in every process)
+                    expired_count = await deposit_service.expire_old_deposits(session)
+                    if expired_count > 0:
+                        logger.info(f"Expired {expired_count} old deposit requests")
                     
-                    if eur_amount > 0:
-                        # Get actual SOL amount for logging
-                        actual_balance = await wallet_service.get_balance(user.wallet_address)
-                        sol_received = actual_balance - user.wallet_balance_sol
-                        
-                        # Update user balance in EUR!
-                        await UserService.update_balance(
-                            session,
-                            user.id,
-                            eur_amount  # Add EUR, not SOL!
-                        )
-                        
-                        # Update wallet SOL balance tracker
-                        user.wallet_balance_sol = actual_balance
-                        await session.commit()
-                        
-                        # Create transaction record
-                        await TransactionService.create_transaction(
-                            session=session,
-                            user_id=user.id,
-                            tx_type='deposit',
-                            amount_sol=eur_amount,  # Store EUR amount in transaction
-                            description=f"Deposit: {sol_received:.6f} SOL = {eur_amount:.2f} EUR (rate reserved)",
-                            status='completed'
-                        )
-                        
-                        logger.info(
-                            f"✅ Processed deposit for user {user.id}: "
-                            f"{sol_received:.6f} SOL = {eur_amount:.2f} EUR"
-                        )
+                    # Update watch schedule for the shards leased by this process
+                    shards = await lease_service.claim_shards(session, settings.monitor_shards)
+                    deposit_watch_service.set_shards(shards, settings.monitor_shards)
+                    new_users = await deposit_watch_service.load_new_users(session)
+                    hot_users = await deposit_watch_service.refresh_active(session, streamed)
+                    if new_users:
+                        logger.info(f"Watching {new_users} new wallets ({len(deposit_watch_service)} total)")
+                    
+                    if streaming:
+                        streamed = await sync_streamed_wallets(session)
+                    
+                    stats = await check_due_wallets(session)
+                    record_cycle(stats, hot_users, len(streamed))
                 
-                # Wait before next check
-                await asyncio.sleep(30)  # Check every 30 seconds
+                # Wait for the next tick or a pushed update
+                if streaming:
+                    await wallet_stream_service.wait_for_update(DEPOSIT_TICK_SECONDS)
+                else:
+                    await asyncio.sleep(DEPOSIT_TICK_SECONDS)
                 
         except Exception as e:
             logger.error(f"Error in deposit monitoring: {e}", exc_info=True)
             await asyncio.sleep(60)  # Wait 1 minute on error
 
 
+async def holds_job(session, job: str, interval: float) -> bool:
+    """Take or renew the lease of a job that must run in one process only."""
+    return await lease_service.acquire(session, f"job:{job}", interval * JOB_LEASE_INTERVALS)
+
+
 async def process_withdrawals():
-    """Process pending withdrawals."""
+    """
+    Process pending withdrawals in batches.
+    On Postgres every monitor process sends (rows are claimed with SKIP
+    LOCKED); on SQLite only the holder of the withdrawals lease does.
+    Withdrawals are paid from the master wallet, which only sweeps fund.
+    """
+    if sweep_service.threshold_lamports <= 0:
+        logger.error(
+            "Wallet sweeping disabled (SWEEP_MIN_SOL=0): deposits stay in user wallets and the "
+            "master wallet cannot pay withdrawals, so they are left pending"
+        )
+        return
     logger.info("Starting withdrawal monitoring...")
     
     while True:
         try:
             async for session in db.get_session():
-                # Get pending withdrawals
-                pending = await TransactionService.get_pending_transactions(session)
-                withdrawals = [tx for tx in pending if tx.tx_type == 'withdrawal']
-                
-                if withdrawals:
-                    logger.info(f"Processing {len(withdrawals)} pending withdrawals...")
-                
-                for tx in withdrawals:
-                    try:
-                        # Get user's keypair
-                        user = await UserService.get_user(session, tx.user_id)
-                        if not user:
-                            logger.error(f"User {tx.user_id} not found for withdrawal {tx.id}")
-                            continue
-                        
-                        keypair = wallet_service.get_keypair(user.wallet_private_key)
-                        
-                        # Send transaction
-                        tx_hash = await wallet_service.transfer_sol(
-                            from_keypair=keypair,
-                            to_public_key=tx.to_address,
-                            amount_sol=tx.amount_sol
-                        )
-                        
-                        if tx_hash:
-                            # Update transaction status
-                            await TransactionService.update_transaction_status(
-                                session,
-                                tx.id,
-                                'completed',
-                                tx_hash
-                            )
-                            
-                            logger.info(
-                                f"✅ Processed withdrawal {tx.id}: "
-                                f"{tx.amount_sol} SOL to {tx.to_address}"
-                            )
-                        else:
-                            logger.error(f"Failed to process withdrawal {tx.id}")
-                        
-                    except Exception as e:
-                        logger.error(f"Error processing withdrawal {tx.id}: {e}")
+                if not db.is_postgres and not await holds_job(session, 'withdrawals', 60):
+                    await asyncio.sleep(60)
+                    continue
+                
+                stats = await withdrawal_service.process_pending(session)
+                if stats['withdrawals']:
+                    logger.info(
+                        f"Withdrawals: {stats['sent']}/{stats['withdrawals']} sent "
+                        f"in {stats['transactions']} transactions, {stats['unsent']} not sent, "
+                        f"{stats['refunded']} refunded"
+                    )
                 
                 # Wait before next check
                 await asyncio.sleep(60)  # Check every 1 minute
@@ -200,18 +466,122 @@ async def process_withdrawals():
             await asyncio.sleep(60)
 
 
+async def process_withdrawal_confirmations():
+    """Track sent withdrawals until finalized; resubmit expired ones."""
+    logger.info("Starting withdrawal confirmation tracking...")
+    
+    while True:
+        try:
+            async for session in db.get_session():
+                if not await holds_job(session, 'withdrawal_confirmations', WITHDRAWAL_CONFIRM_SECONDS):
+                    await asyncio.sleep(WITHDRAWAL_CONFIRM_SECONDS)
+                    continue
+                
+                stats = await withdrawal_service.track_submissions(session)
+                if stats['finalized'] or stats['failed'] or stats['expired']:
+                    logger.info(
+                        f"Withdrawal submissions: {stats['finalized']} finalized, "
+                        f"{stats['failed']} failed ({stats['refunded']} withdrawals refunded), "
+                        f"{stats['expired']} expired "
+                        f"({stats['resubmitted']} withdrawals resubmitted), "
+                        f"{stats['tracked']} tracked"
+                    )
+                
+                await asyncio.sleep(WITHDRAWAL_CONFIRM_SECONDS)
+                
+        except Exception as e:
+            logger.error(f"Error in withdrawal confirmation tracking: {e}", exc_info=True)
+            await asyncio.sleep(WITHDRAWAL_CONFIRM_SECONDS)
+
+
+async def process_sweeps():
+    """Sweep deposit wallets into the master wallet and track the sweeps."""
+    if sweep_service.threshold_lamports <= 0:
+        logger.info("Wallet sweeping disabled")
+        return
+    logger.info("Starting wallet sweeping...")
+    
+    last_sweep = 0.0
+    while True:
+        try:
+            async for session in db.get_session():
+                if not await holds_job(session, 'sweeps', SWEEP_TRACK_SECONDS):
+                    await asyncio.sleep(SWEEP_TRACK_SECONDS)
+                    continue
+                
+                stats = await sweep_service.track(session)
+                if stats['finalized'] or stats['failed'] or stats['expired']:
+                    logger.info(
+                        f"Sweeps: {stats['finalized']} finalized, {stats['failed']} failed, "
+                        f"{stats['expired']} expired, {stats['tracked']} tracked"
+                    )
+                
+                if time.monotonic() - last_sweep >= SWEEP_INTERVAL_SECONDS:
+                    last_sweep = time.monotonic()
+                    await sweep_service.sweep(session)
+                
+                await asyncio.sleep(SWEEP_TRACK_SECONDS)
+                
+        except Exception as e:
+            logger.error(f"Error in wallet sweeping: {e}", exc_info=True)
+            await asyncio.sleep(SWEEP_TRACK_SECONDS)
+
+
+async def process_ledger_reconciliation():
+    """Periodically reconcile materialized ledger balances."""
+    logger.info("Starting ledger reconciliation...")
+    
+    while True:
+        try:
+            async for session in db.get_session():
+                if not await holds_job(session, 'ledger_reconciliation', 600):
+                    await asyncio.sleep(600)
+                    continue
+                
+                report = await LedgerService.reconcile(session)
+                
+                if report['mismatches']:
+                    logger.error(
+                        f"❌ Ledger reconciliation found {len(report['mismatches'])} mismatches: "
+                        f"{report['mismatches'][:20]}"
+                    )
+                
+                # Wait before next check
+                await asyncio.sleep(600)  # Reconcile every 10 minutes
+                
+        except Exception as e:
+            logger.error(f"Error in ledger reconciliation: {e}", exc_info=True)
+            await asyncio.sleep(600)
+
+
 async def main():
-    """Main function to run both monitoring tasks."""
+    """Main function to run all monitoring tasks."""
     logger.info("=== Starting transaction monitor ===")
     
     # Create database tables if not exist
     await db.create_tables()
     
-    # Run both tasks concurrently
-    await asyncio.gather(
-        process_deposits(),
-        process_withdrawals()
-    )
+    # Keep a signed-ready blockhash for withdrawals
+    wallet_service.blockhash_cache.start()
+    
+    # Deposits are converted at the in-memory SOL/EUR rate
+    price_service.start()
+    
+    # Run all tasks concurrently; work is split with other monitor processes by leases
+    logger.info(f"Monitor worker {lease_service.owner}")
+    try:
+        await asyncio.gather(
+            process_deposits(),
+            process_withdrawals(),
+            process_withdrawal_confirmations(),
+            process_sweeps(),
+            process_ledger_reconciliation()
+        )
+    finally:
+        await price_service.stop()
+        # Hand shards and jobs to standby processes right away
+        async for session in db.get_session():
+            await lease_service.release_all(session)
 
 
 if __name__ == '__main__':
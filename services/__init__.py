@@ -1,10 +1,17 @@
 """Services package."""
 from services.wallet_service import wallet_service
+from services.wallet_stream_service import wallet_stream_service
+from services.wallet_pool_service import wallet_pool_service
 from services.user_service import UserService
+from services.ledger_service import ledger_service
+from services.lease_service import lease_service
 from services.image_service import ImageService
 from services.transaction_service import TransactionService
+from services.withdrawal_service import withdrawal_service
+from services.sweep_service import sweep_service
 from services.price_service import price_service
 from services.deposit_service import deposit_service
+from services.deposit_watch_service import deposit_watch_service
 from services.balance_api import balance_api
 from services.language_service import language_service
 from services.pricelist_service import pricelist_service
@@ -15,10 +22,13 @@ from services.cart_service import cart_service
 from services.achievement_service import achievement_service
 from services.daily_bonus_service import daily_bonus_service
 from services.quest_service import quest_service
+from services.leaderboard_service import leaderboard_service
 from services.auction_service import auction_service
 from services.notification_service import notification_service
+from services.notification_dispatcher import notification_dispatcher
 from services.ticket_service import ticket_service
 from services.seasonal_service import seasonal_service
+from services.pricing_service import pricing_service
 from services.quiz_service import quiz_service
 from services.role_service import role_service
 from services.district_service import district_service
@@ -26,11 +36,18 @@ from services.staff_service import staff_service
 
 __all__ = [
     'wallet_service',
+    'wallet_stream_service',
+    'wallet_pool_service',
     'UserService',
+    'ledger_service',
+    'lease_service',
     'ImageService',
     'TransactionService',
+    'withdrawal_service',
+    'sweep_service',
     'price_service',
     'deposit_service',
+    'deposit_watch_service',
     'balance_api',
     'language_service',
     'pricelist_service',
@@ -41,10 +58,13 @@ __all__ = [
     'achievement_service',
     'daily_bonus_service',
     'quest_service',
+    'leaderboard_service',
     'auction_service',
     'notification_service',
+    'notification_dispatcher',
     'ticket_service',
     'seasonal_service',
+    'pricing_service',
     'quiz_service',
     'role_service',
     'district_service',
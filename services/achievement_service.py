@@ -1,77 +1,138 @@
 """Achievement service."""
+import bisect
 import logging
+import time
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
+from database.database import db
 from database.models import Achievement, UserAchievement, User
 
 logger = logging.getLogger(__name__)
 
 
 class AchievementService:
-    """Service for managing achievements."""
+    """
+    Service for managing achievements.
     
-    @staticmethod
-    async def check_and_unlock_achievements(session: AsyncSession, user_id: int):
-        """Check and unlock new achievements for user."""
-        # Get user stats
-        stmt = select(
-            User.total_purchases,
-            User.total_spent_sol,
-            User.total_referrals,
-            User.daily_streak
-        ).where(User.id == user_id)
-        result = await session.execute(stmt)
-        user_stats = result.one_or_none()
+    Definitions are cached per condition_type, sorted by threshold. When a
+    user stat changes from old to new, only the achievements with a
+    threshold in (old, new] are candidates (found by bisection), so an
+    event costs O(log n + crossed) and usually no query at all. Unlocks
+    are one INSERT ... ON CONFLICT DO NOTHING RETURNING (already unlocked
+    ones are skipped by the unique index) and one points UPDATE.
+    """
+    
+    CACHE_SECONDS = 300
+    # Stat column per condition_type
+    STATS = {
+        'purchases': User.total_purchases,
+        'spending': User.total_spent_cents,
+        'referrals': User.total_referrals,
+        'streak': User.daily_streak,
+    }
+    STAT_SCALE = {'spending': 100}  # condition_value in EUR, stat in cents
+    
+    def __init__(self):
+        self._thresholds: dict[str, tuple[list[int], list[Achievement]]] = {}
+        self._loaded_at: Optional[float] = None
+    
+    def invalidate(self):
+        """Drop cached definitions (after they were changed)."""
+        self._loaded_at = None
+    
+    async def _get_thresholds(self, session: AsyncSession) -> dict[str, tuple[list[int], list[Achievement]]]:
+        """Definitions per condition_type: (sorted thresholds in stat units, achievements in the same order)."""
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.CACHE_SECONDS:
+            return self._thresholds
         
-        if not user_stats:
-            return
+        result = await session.execute(select(Achievement))
+        achievements = list(result.scalars().all())
+        for achievement in achievements:
+            session.expunge(achievement)  # Cached across sessions
         
-        purchases, spent, referrals, streak = user_stats
+        grouped: dict[str, list[tuple[int, Achievement]]] = {}
+        for achievement in achievements:
+            threshold = achievement.condition_value * self.STAT_SCALE.get(achievement.condition_type, 1)
+            grouped.setdefault(achievement.condition_type, []).append((threshold, achievement))
+        self._thresholds = {}
+        for condition_type, entries in grouped.items():
+            entries.sort(key=lambda entry: (entry[0], entry[1].id))
+            self._thresholds[condition_type] = ([t for t, _ in entries], [a for _, a in entries])
+        self._loaded_at = time.monotonic()
+        return self._thresholds
+    
+    async def unlock_crossed(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        changes: dict[str, tuple[int, int]]
+    ) -> list[Achievement]:
+        """
+        Unlock achievements whose threshold a stat change crossed. Does not commit.
         
-        # Get all achievements
-        stmt = select(Achievement)
-        result = await session.execute(stmt)
-        all_achievements = result.scalars().all()
+        Args:
+            changes: condition_type -> (old value, new value) of the user's stat
         
-        # Get already unlocked achievements
-        stmt = select(Achievement.id).join(UserAchievement).where(
-            UserAchievement.user_id == user_id
+        Returns:
+            Newly unlocked achievements
+        """
+        thresholds = await self._get_thresholds(session)
+        candidates = []
+        for condition_type, (old, new) in changes.items():
+            if condition_type not in thresholds or new <= old:
+                continue
+            values, achievements = thresholds[condition_type]
+            candidates.extend(achievements[bisect.bisect_right(values, old):bisect.bisect_right(values, new)])
+        if not candidates:
+            return []
+        
+        result = await session.execute(
+            db.insert(UserAchievement)
+            .values([{'user_id': user_id, 'achievement_id': achievement.id} for achievement in candidates])
+            .on_conflict_do_nothing(index_elements=['user_id', 'achievement_id'])
+            .returning(UserAchievement.achievement_id)
         )
-        result = await session.execute(stmt)
         unlocked_ids = set(result.scalars().all())
+        unlocked = [achievement for achievement in candidates if achievement.id in unlocked_ids]
+        if not unlocked:
+            return []
         
-        # Check each achievement
-        newly_unlocked = []
-        for ach in all_achievements:
-            if ach.id in unlocked_ids:
-                continue  # Already unlocked
-            
-            # Check condition
-            should_unlock = False
-            if ach.condition_type == 'purchases':
-                should_unlock = purchases >= ach.condition_value
-            elif ach.condition_type == 'spending':
-                should_unlock = spent >= ach.condition_value
-            elif ach.condition_type == 'referrals':
-                should_unlock = referrals >= ach.condition_value
-            elif ach.condition_type == 'streak':
-                should_unlock = streak >= ach.condition_value
-            
-            if should_unlock:
-                # Unlock achievement
-                user_ach = UserAchievement(user_id=user_id, achievement_id=ach.id)
-                session.add(user_ach)
-                
-                # Give points
-                stmt = select(User).where(User.id == user_id)
-                result = await session.execute(stmt)
-                user = result.scalars().first()
-                if user:
-                    user.achievement_points += ach.points
-                
-                newly_unlocked.append(ach)
-                logger.info(f"User {user_id} unlocked achievement: {ach.code}")
+        await session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(achievement_points=User.achievement_points + sum(a.points for a in unlocked))
+        )
+        for achievement in unlocked:
+            logger.info(f"User {user_id} unlocked achievement: {achievement.code}")
+        return unlocked
+    
+    async def check_and_unlock_achievements(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        changes: Optional[dict[str, tuple[int, int]]] = None
+    ) -> list[Achievement]:
+        """
+        Check and unlock new achievements for user. Commits.
+        
+        Args:
+            changes: condition_type -> (old value, new value) of stats that changed;
+                None checks every stat against its current value
+        """
+        if changes is None:
+            result = await session.execute(
+                select(*self.STATS.values()).where(User.id == user_id)
+            )
+            user_stats = result.one_or_none()
+            if not user_stats:
+                return []
+            changes = {
+                condition_type: (-1, value or 0)
+                for condition_type, value in zip(self.STATS, user_stats)
+            }
         
+        newly_unlocked = await self.unlock_crossed(session, user_id, changes)
         await session.commit()
         return newly_unlocked
     
@@ -202,6 +263,7 @@ class AchievementService:
                 session.add(ach)
         
         await session.commit()
+        achievement_service.invalidate()
         logger.info("Default achievements initialized")
 
 
@@ -2,8 +2,10 @@
 import logging
 from datetime import datetime, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select
 from database.models import Image, AuctionBid, User
+from services.ledger_service import LedgerService
+from utils.money import format_eur
 
 logger = logging.getLogger(__name__)
 
@@ -16,10 +18,10 @@ class AuctionService:
         session: AsyncSession,
         image_id: int,
         user_id: int,
-        bid_amount_sol: float
+        bid_cents: int
     ) -> tuple[bool, str]:
         """
-        Place a bid on auction item.
+        Place a bid (in cents) on auction item.
         Returns: (success, message)
         """
         # Get auction item
@@ -38,47 +40,55 @@ class AuctionService:
             return False, "❌ Аукцион завершен"
         
         # Check bid amount
-        min_bid = item.current_bid_sol or item.starting_price_sol
-        if bid_amount_sol <= min_bid:
-            return False, f"❌ Ставка должна быть больше {min_bid} SOL"
+        min_bid = item.current_bid_cents or item.starting_price_cents
+        if bid_cents <= min_bid:
+            return False, f"❌ Ставка должна быть больше {format_eur(min_bid)}"
         
         # Check user balance
-        stmt = select(User.balance_eur).where(User.id == user_id)
+        stmt = select(User.balance_cents).where(User.id == user_id)
         result = await session.execute(stmt)
         balance = result.scalar_one_or_none()
         
-        if balance < bid_amount_sol:
+        if balance is None or balance < bid_cents:
             return False, "❌ Недостаточно средств"
         
         # Return previous bidder's money
         if item.highest_bidder_id and item.highest_bidder_id != user_id:
-            stmt = update(User).where(User.id == item.highest_bidder_id).values(
-                balance_eur=User.balance_eur + item.current_bid_sol
+            await LedgerService.post(
+                session,
+                item.highest_bidder_id,
+                item.current_bid_cents,
+                LedgerService.SYSTEM_AUCTION_ESCROW,
+                'auction_refund',
+                description=f"Outbid on item #{image_id}"
             )
-            await session.execute(stmt)
         
         # Reserve new bidder's money
-        stmt = update(User).where(User.id == user_id).values(
-            balance_eur=User.balance_eur - bid_amount_sol
+        await LedgerService.post(
+            session,
+            user_id,
+            -bid_cents,
+            LedgerService.SYSTEM_AUCTION_ESCROW,
+            'auction_bid',
+            description=f"Bid on item #{image_id}"
         )
-        await session.execute(stmt)
         
         # Update auction
-        item.current_bid_sol = bid_amount_sol
+        item.current_bid_cents = bid_cents
         item.highest_bidder_id = user_id
         
         # Record bid
         bid = AuctionBid(
             image_id=image_id,
             user_id=user_id,
-            bid_amount_sol=bid_amount_sol
+            bid_cents=bid_cents
         )
         session.add(bid)
         
         await session.commit()
-        logger.info(f"User {user_id} placed bid {bid_amount_sol} SOL on item {image_id}")
+        logger.info(f"User {user_id} placed bid {format_eur(bid_cents)} on item {image_id}")
         
-        return True, f"✅ Ставка принята: {bid_amount_sol} SOL"
+        return True, f"✅ Ставка принята: {format_eur(bid_cents)}"
     
     @staticmethod
     async def complete_auction(session: AsyncSession, image_id: int) -> bool:
@@ -102,7 +112,7 @@ class AuctionService:
         item.sold_at = datetime.now(timezone.utc)
         
         # Money already reserved, just log it
-        logger.info(f"Auction completed: item {image_id} won by user {item.highest_bidder_id} for {item.current_bid_sol} SOL")
+        logger.info(f"Auction completed: item {image_id} won by user {item.highest_bidder_id} for {format_eur(item.current_bid_cents)}")
         
         await session.commit()
         return True
@@ -127,7 +137,7 @@ class AuctionService:
         
         return {
             'item': item,
-            'current_bid': item.current_bid_sol or item.starting_price_sol,
+            'current_bid_cents': item.current_bid_cents or item.starting_price_cents,
             'highest_bidder_id': item.highest_bidder_id,
             'time_left_seconds': time_left,
             'recent_bids': recent_bids,
@@ -3,7 +3,9 @@ from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.models import User
 from services.user_service import UserService
+from services.ledger_service import LedgerService
 from services.price_service import price_service
+from utils.money import cents_to_eur, format_eur
 import logging
 
 logger = logging.getLogger(__name__)
@@ -34,15 +36,14 @@ class BalanceAPI:
             logger.info(f"User {telegram_id} not found in database")
             return None
         
-        # Get balance in EUR
-        balance_eur = await price_service.sol_to_eur(user.balance_eur)
         rate = await price_service.get_sol_eur_rate()
         
         return {
             'telegram_id': user.id,
             'username': user.username,
             'first_name': user.first_name,
-            'balance_eur': user.balance_eur,
+            'balance_cents': user.balance_cents,
+            'balance_eur': cents_to_eur(user.balance_cents),
             'wallet_address': user.wallet_address,
             'current_rate': rate,
             'is_blocked': user.is_blocked
@@ -52,7 +53,7 @@ class BalanceAPI:
     async def update_balance(
         session: AsyncSession,
         telegram_id: int,
-        amount_sol: float,
+        amount_cents: int,
         description: str = "Balance update from external bot"
     ) -> bool:
         """
@@ -61,7 +62,7 @@ class BalanceAPI:
         Args:
             session: Database session
             telegram_id: User's Telegram ID
-            amount_sol: Amount to add (can be negative)
+            amount_cents: Amount in EUR cents to add (can be negative)
             description: Transaction description
             
         Returns:
@@ -69,7 +70,14 @@ class BalanceAPI:
         """
         try:
             # Update balance
-            success = await UserService.update_balance(session, telegram_id, amount_sol)
+            success = await UserService.update_balance(
+                session,
+                telegram_id,
+                amount_cents,
+                entry_type='external_update',
+                counter_account=LedgerService.SYSTEM_EXTERNAL,
+                description=description
+            )
             
             if success:
                 # Create transaction record
@@ -79,14 +87,14 @@ class BalanceAPI:
                     session=session,
                     user_id=telegram_id,
                     tx_type='external_update',
-                    amount_sol=abs(amount_sol),
+                    amount_cents=abs(amount_cents),
                     description=description,
                     status='completed'
                 )
                 
                 logger.info(
                     f"Balance updated for user {telegram_id}: "
-                    f"{amount_sol:+.6f} SOL via external bot"
+                    f"{'+' if amount_cents >= 0 else ''}{format_eur(amount_cents)} via external bot"
                 )
             
             return success
@@ -0,0 +1,91 @@
+"""Shared recent blockhash cache for signing outgoing transactions."""
+import asyncio
+import logging
+import time
+from typing import Optional
+from solana.rpc.commitment import Confirmed
+from solders.hash import Hash
+
+logger = logging.getLogger(__name__)
+
+
+class BlockhashCache:
+    """
+    Recent blockhash refreshed in the background.
+    
+    A blockhash stays valid for ~150 blocks (about a minute), so one value
+    can sign every transaction for a few seconds. get() serves the cached
+    blockhash with its last valid block height and only goes to the RPC
+    when the value is older than MAX_AGE_SECONDS. Concurrent refreshes
+    share a single request.
+    """
+    
+    REFRESH_SECONDS = 5  # Background refresh interval
+    MAX_AGE_SECONDS = 20  # Older values are refreshed before use
+    
+    def __init__(self, rpc_client):
+        self.rpc_client = rpc_client
+        self._blockhash: Optional[Hash] = None
+        self._last_valid_block_height = 0
+        self._fetched_at = 0.0
+        self._inflight: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+        self.metrics = {'hits': 0, 'refreshes': 0, 'errors': 0}
+    
+    @property
+    def age(self) -> float:
+        """Seconds since the cached blockhash was fetched."""
+        return time.monotonic() - self._fetched_at
+    
+    async def _fetch(self):
+        try:
+            response = await self.rpc_client.get_latest_blockhash(commitment=Confirmed)
+        except Exception:
+            self.metrics['errors'] += 1
+            raise
+        self._blockhash = response.value.blockhash
+        self._last_valid_block_height = response.value.last_valid_block_height
+        self._fetched_at = time.monotonic()
+        self.metrics['refreshes'] += 1
+    
+    async def refresh(self):
+        """Fetch a new blockhash; callers arriving during a fetch wait for the same one."""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._fetch())
+        # Shielded: a cancelled caller must not cancel the fetch others wait on
+        await asyncio.shield(self._inflight)
+    
+    async def get(self) -> tuple[Hash, int]:
+        """
+        Get a recent blockhash and the last block height it is valid for.
+        
+        Raises:
+            RpcError: If a refresh was needed and failed
+        """
+        if self._blockhash is None or self.age > self.MAX_AGE_SECONDS:
+            await self.refresh()
+        else:
+            self.metrics['hits'] += 1
+        return self._blockhash, self._last_valid_block_height
+    
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Blockhash refresh failed: {e}")
+            await asyncio.sleep(self.REFRESH_SECONDS)
+    
+    def start(self):
+        """Start background refresh (without it, get() refreshes on demand)."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+    
+    async def stop(self):
+        """Stop background refresh."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -61,10 +61,10 @@ class CartService:
         return list(result.scalars().all())
     
     @staticmethod
-    async def get_cart_total(session: AsyncSession, user_id: int) -> float:
-        """Get total price of cart."""
+    async def get_cart_total(session: AsyncSession, user_id: int) -> int:
+        """Get total price of cart in cents."""
         items = await CartService.get_cart(session, user_id)
-        return sum(item.price_sol for item in items)
+        return sum(item.price_cents for item in items)
     
     @staticmethod
     async def clear_cart(session: AsyncSession, user_id: int):
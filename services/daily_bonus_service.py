@@ -4,6 +4,7 @@ from datetime import datetime, timedelta, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 from database.models import User
+from services.achievement_service import achievement_service
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +46,7 @@ class DailyBonusService:
             }
         
         # Check streak
+        streak_before = user.daily_streak
         if last_claim:
             days_since = (now - last_claim).days
             if days_since == 1:
@@ -66,6 +68,9 @@ class DailyBonusService:
         user.achievement_points += points
         user.last_daily_bonus = now
         
+        await achievement_service.unlock_crossed(
+            session, user_id, {'streak': (streak_before, user.daily_streak)}
+        )
         await session.commit()
         logger.info(f"User {user_id} claimed daily bonus: {points} points, streak: {user.daily_streak}")
         
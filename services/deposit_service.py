@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 from database.models import DepositRequest, User
 from services.price_service import price_service
+from utils.money import cents_to_lamports, format_eur, format_sol
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,11 +14,21 @@ logger = logging.getLogger(__name__)
 class DepositService:
     """Service for deposit operations with EUR."""
     
+    # Requested SOL amounts are shown with 6 decimals, so round to 1000 lamports;
+    # deposits are matched on the exact amount
+    LAMPORTS_STEP = 1_000
+    SOL_DECIMALS = 6
+    
+    @staticmethod
+    def format_amount(lamports: int) -> str:
+        """Requested SOL amount as the user must send it (every significant decimal)."""
+        return format_sol(lamports, DepositService.SOL_DECIMALS)
+    
     @staticmethod
     async def create_deposit_request(
         session: AsyncSession,
         user_id: int,
-        eur_amount: float
+        eur_cents: int
     ) -> DepositRequest:
         """
         Create deposit request with reserved exchange rate.
@@ -25,23 +36,23 @@ class DepositService:
         Args:
             session: Database session
             user_id: User ID
-            eur_amount: Amount in EUR
+            eur_cents: Amount in EUR cents
             
         Returns:
             Created deposit request
         """
         # Get current SOL/EUR rate
-        rate = await price_service.get_sol_eur_rate()
+        rate_cents = await price_service.get_rate_cents()
         
         # Calculate required SOL amount
-        sol_amount = eur_amount / rate
+        lamports = cents_to_lamports(eur_cents, rate_cents, step=DepositService.LAMPORTS_STEP)
         
         # Create deposit request
         deposit = DepositRequest(
             user_id=user_id,
-            eur_amount=eur_amount,
-            sol_amount=sol_amount,
-            reserved_rate=rate,
+            eur_cents=eur_cents,
+            lamports=lamports,
+            reserved_rate_cents=rate_cents,
             status='pending',
             expires_at=datetime.now(timezone.utc) + timedelta(minutes=30)
         )
@@ -51,8 +62,8 @@ class DepositService:
         await session.refresh(deposit)
         
         logger.info(
-            f"Created deposit request: {eur_amount} EUR = {sol_amount} SOL "
-            f"(rate: {rate}) for user {user_id}"
+            f"Created deposit request: {format_eur(eur_cents)} = {DepositService.format_amount(lamports)} "
+            f"(rate: {format_eur(rate_cents)}) for user {user_id}"
         )
         
         return deposit
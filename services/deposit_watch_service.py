@@ -0,0 +1,206 @@
+"""Deposit watch scheduler: decides which wallets to poll and when."""
+import heapq
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import User, DepositRequest
+
+logger = logging.getLogger(__name__)
+
+
+class DepositWatchService:
+    """
+    Priority queue of wallets keyed by next check time.
+    
+    Hot wallets (active deposit request or deposit screen opened recently)
+    are polled every few seconds, warm wallets (recent deposit) every
+    minute. All other wallets start on a slow schedule whose interval
+    doubles after every quiet check, so RPC spend follows active
+    depositors rather than registered users.
+    """
+    
+    HOT_INTERVAL = 10  # Active request / deposit screen
+    STREAMED_INTERVAL = 60  # Hot wallets with a live websocket subscription (safety net)
+    WARM_INTERVAL = 60  # Deposited recently
+    COLD_MIN_INTERVAL = 300  # First interval for everyone else
+    COLD_MAX_INTERVAL = 6 * 3600  # Decay cap
+    
+    DEPOSIT_SCREEN_WINDOW = timedelta(minutes=30)
+    RECENT_DEPOSIT_WINDOW = timedelta(days=7)
+    NEW_USER_OVERLAP = timedelta(minutes=5)  # created_at is set at insert, visible only after commit
+    
+    def __init__(self):
+        self._heap: list[tuple[float, int]] = []  # (next_check, user_id), stale entries skipped
+        self._next_check: dict[int, float] = {}
+        self._interval: dict[int, float] = {}
+        self._active: dict[int, float] = {}  # Hot/warm users -> their interval
+        self._registered_since: Optional[datetime] = None  # None: next load scans all users
+        self._shard_count = 1
+        self._shards: set[int] = {0}  # Shards (user_id % shard count) this process watches
+    
+    def __len__(self) -> int:
+        return len(self._next_check)
+    
+    def owns(self, user_id: int) -> bool:
+        """True if user's shard is watched by this process."""
+        return user_id % self._shard_count in self._shards
+    
+    def _shard_filter(self, column):
+        return (column % self._shard_count).in_(self._shards)
+    
+    def set_shards(self, shards: set[int], shard_count: int):
+        """
+        Watch only users in `shards` (from the lease service).
+        Users of lost shards are dropped; gained shards are loaded on the next load_new_users.
+        """
+        if shards == self._shards and shard_count == self._shard_count:
+            return
+        gained = shard_count != self._shard_count or bool(shards - self._shards)
+        self._shards = set(shards)
+        self._shard_count = shard_count
+        for user_id in [user_id for user_id in self._interval if not self.owns(user_id)]:
+            self.forget(user_id)
+        if gained:
+            self._registered_since = None  # Rescan; already scheduled users are kept
+        logger.info(f"Watching deposit shards {sorted(shards)} of {shard_count}")
+    
+    def schedule(self, user_id: int, interval: float, now: float = None):
+        """Set user's interval and schedule the next check after it."""
+        now = time.monotonic() if now is None else now
+        self._interval[user_id] = interval
+        self._next_check[user_id] = now + interval
+        heapq.heappush(self._heap, (now + interval, user_id))
+    
+    def promote(self, user_id: int, interval: float, now: float = None):
+        """Poll user at least every `interval` seconds (never slows a user down)."""
+        now = time.monotonic() if now is None else now
+        if self._interval.get(user_id, float('inf')) <= interval:
+            return
+        self._interval[user_id] = interval
+        next_check = min(self._next_check.get(user_id, float('inf')), now)
+        self._next_check[user_id] = next_check
+        heapq.heappush(self._heap, (next_check, user_id))
+    
+    def pop_due(self, limit: int, now: float = None) -> list[int]:
+        """Pop up to `limit` users whose check is due."""
+        now = time.monotonic() if now is None else now
+        due = []
+        while self._heap and len(due) < limit:
+            next_check, user_id = self._heap[0]
+            if next_check > now:
+                break
+            heapq.heappop(self._heap)
+            if self._next_check.get(user_id) != next_check:
+                continue  # Rescheduled since
+            del self._next_check[user_id]
+            due.append(user_id)
+        return due
+    
+    def checked(self, user_id: int, deposit_found: bool, now: float = None):
+        """Reschedule user after a check."""
+        if user_id in self._active:
+            interval = self._active[user_id]
+            if deposit_found:
+                interval = min(interval, self.WARM_INTERVAL)
+        elif deposit_found:
+            interval = self.WARM_INTERVAL
+        else:
+            interval = self._interval.get(user_id, self.COLD_MIN_INTERVAL)
+            if interval >= self.COLD_MIN_INTERVAL:
+                interval = min(interval * 2, self.COLD_MAX_INTERVAL)
+            else:
+                interval = self.COLD_MIN_INTERVAL  # Cools down unless promoted again
+        self.schedule(user_id, interval, now)
+    
+    def forget(self, user_id: int):
+        """Stop watching user."""
+        self._next_check.pop(user_id, None)
+        self._interval.pop(user_id, None)
+        self._active.pop(user_id, None)
+    
+    async def load_new_users(self, session: AsyncSession, chunk: int = 10000) -> int:
+        """
+        Add users registered since the last call on the cold schedule.
+        User ids are Telegram ids and not monotonic, so new users are found
+        by created_at, looking NEW_USER_OVERLAP back for late commits;
+        already scheduled users are skipped.
+        First checks are spread over COLD_MIN_INTERVAL to avoid bursts.
+        """
+        now = time.monotonic()
+        criteria = [User.is_blocked == False, self._shard_filter(User.id)]
+        if self._registered_since is not None:
+            criteria.append(User.created_at >= self._registered_since - self.NEW_USER_OVERLAP)
+        newest = self._registered_since
+        last_user_id = None
+        count = 0
+        while True:
+            query = select(User.id, User.created_at).where(*criteria).order_by(User.id).limit(chunk)
+            if last_user_id is not None:
+                query = query.where(User.id > last_user_id)
+            rows = (await session.execute(query)).all()
+            if not rows:
+                break
+            for user_id, created_at in rows:
+                if created_at is not None and (newest is None or created_at > newest):
+                    newest = created_at
+                if user_id not in self._interval:
+                    self.schedule(user_id, random.uniform(0, self.COLD_MIN_INTERVAL), now)
+                    count += 1
+            last_user_id = rows[-1][0]
+        self._registered_since = newest
+        return count
+    
+    def active_user_ids(self) -> set[int]:
+        """Hot and warm users as of the last refresh."""
+        return set(self._active)
+    
+    async def refresh_active(self, session: AsyncSession, streamed: set[int] = frozenset()) -> int:
+        """
+        Promote users with pending requests, recent deposit screen visits or recent deposits.
+        Hot users in `streamed` get pushed updates and are only polled as a safety net.
+        """
+        now = datetime.now(timezone.utc)
+        
+        result = await session.execute(
+            select(DepositRequest.user_id)
+            .where(
+                DepositRequest.status == 'pending',
+                DepositRequest.expires_at > now
+            )
+            .union(
+                select(User.id).where(User.deposit_screen_at > now - self.DEPOSIT_SCREEN_WINDOW)
+            )
+        )
+        hot = {user_id for user_id in result.scalars().all() if self.owns(user_id)}
+        
+        result = await session.execute(
+            select(User.id).where(
+                User.last_deposit_at > now - self.RECENT_DEPOSIT_WINDOW,
+                self._shard_filter(User.id)
+            )
+        )
+        warm = set(result.scalars().all()) - hot
+        
+        self._active = {
+            user_id: self.STREAMED_INTERVAL if user_id in streamed else self.HOT_INTERVAL
+            for user_id in hot
+        }
+        self._active.update({user_id: self.WARM_INTERVAL for user_id in warm})
+        for user_id, interval in self._active.items():
+            self.promote(user_id, interval)
+        
+        return len(hot)
+    
+    @staticmethod
+    async def mark_deposit_screen(session: AsyncSession, user: User):
+        """Record that user opened the deposit screen (polled often for a while)."""
+        user.deposit_screen_at = datetime.now(timezone.utc)
+        await session.commit()
+
+
+# Global deposit watch service instance
+deposit_watch_service = DepositWatchService()
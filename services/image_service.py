@@ -14,7 +14,7 @@ class ImageService:
         session: AsyncSession,
         file_id: str,
         file_path: str,
-        price_sol: float,
+        price_cents: int,
         region_id: int,
         city_id: int,
         uploaded_by: int,
@@ -25,10 +25,10 @@ class ImageService:
     ) -> Image:
         """Add new image to database."""
         # Note: file_path and uploaded_by are not in Image model
-        # Image model only has: file_id, price_sol, region_id, city_id, district_id, description, preview_file_id, category
+        # Image model only has: file_id, price_cents, region_id, city_id, district_id, description, preview_file_id, category
         image = Image(
             file_id=file_id,
-            price_sol=price_sol,
+            price_cents=price_cents,
             region_id=region_id,
             city_id=city_id,
             district_id=district_id,
@@ -75,7 +75,7 @@ class ImageService:
         session: AsyncSession,
         image_id: int,
         user_id: int,
-        price_paid: float
+        price_paid_cents: int
     ) -> bool:
         """Mark image as sold and create purchase record."""
         image = await ImageService.get_image_by_id(session, image_id)
@@ -91,7 +91,7 @@ class ImageService:
         purchase = Purchase(
             user_id=user_id,
             image_id=image_id,
-            price_sol=price_paid
+            price_cents=price_paid_cents
         )
         session.add(purchase)
         
@@ -199,14 +199,14 @@ class ImageService:
         
         # Total revenue
         result = await session.execute(
-            select(func.sum(Purchase.price_sol))
+            select(func.sum(Purchase.price_cents))
         )
-        total_revenue = result.scalar() or 0.0
+        total_revenue_cents = result.scalar() or 0
         
         return {
             'total_images': total_images,
             'sold_images': sold_images,
             'available_images': available_images,
-            'total_revenue': total_revenue
+            'total_revenue_cents': total_revenue_cents
         }
 
@@ -0,0 +1,248 @@
+"""Leaderboards from in-memory ranked snapshots of user stats."""
+import asyncio
+import bisect
+import heapq
+import logging
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.database import db
+from database.models import User
+
+logger = logging.getLogger(__name__)
+
+
+class Leaderboard:
+    """
+    Ranking of users by one score.
+    
+    `scores` is a sorted snapshot of all positive scores: the rank of any
+    score is one bisection. `top` holds every user scoring above `cutoff`
+    (at least the best TOP_BUFFER at snapshot time) sorted by
+    (-score, user_id) and is kept exact between snapshots by update().
+    Users with no positive score are not ranked.
+    """
+    
+    def __init__(self, name: str, top_buffer: int):
+        self.name = name
+        self.top_buffer = top_buffer
+        self.scores = array('d')
+        self.top: list[tuple[float, int]] = []
+        self.top_scores: dict[int, float] = {}
+        self.cutoff = 0.0
+        self.snapshot_at: Optional[datetime] = None
+    
+    def load(self, scores: array, top: list[tuple[float, int]]):
+        """Replace the snapshot: ascending positive scores and the best (score, user_id) pairs."""
+        self.scores = scores
+        self.top = sorted((-score, user_id) for score, user_id in top)
+        self.top_scores = {user_id: score for score, user_id in top}
+        # Everyone above the weakest buffered score is in the buffer
+        self.cutoff = -self.top[-1][0] if len(self.top) >= self.top_buffer else 0.0
+        self.snapshot_at = datetime.now(timezone.utc)
+    
+    def update(self, user_id: int, score: float):
+        """Apply a user's new score to the top list. O(log K) search, O(K) list shift."""
+        old = self.top_scores.pop(user_id, None)
+        if old is not None:
+            del self.top[bisect.bisect_left(self.top, (-old, user_id))]
+        # Users at the cutoff may be outside the buffer: only buffered ones stay
+        if score < self.cutoff or (score == self.cutoff and old is None) or score <= 0:
+            return
+        bisect.insort(self.top, (-score, user_id))
+        self.top_scores[user_id] = score
+        if len(self.top) > self.top_buffer:
+            score, dropped = self.top.pop()
+            del self.top_scores[dropped]
+            self.cutoff = max(self.cutoff, -score)
+    
+    def leaders(self, limit: int) -> list[tuple[int, int, float]]:
+        """Best users as (rank, user_id, score); equal scores share a rank."""
+        leaders = []
+        rank = 0
+        previous = None
+        for position, (negative, user_id) in enumerate(self.top[:limit], 1):
+            if negative != previous:
+                rank, previous = position, negative
+            leaders.append((rank, user_id, -negative))
+        return leaders
+    
+    def rank(self, score: float) -> Optional[int]:
+        """Rank of a score (1 = best), None if not ranked. O(log n)."""
+        if score <= 0:
+            return None
+        if score > self.cutoff:
+            # Exact: every user above the cutoff is in the top list
+            return bisect.bisect_left(self.top, (-score, -1)) + 1
+        return len(self.scores) - bisect.bisect_right(self.scores, score) + 1
+    
+    @property
+    def depleted(self) -> bool:
+        """Too many buffered users dropped below the cutoff; the top needs a new snapshot."""
+        return self.cutoff > 0 and len(self.top) < self.top_buffer // 2
+    
+    @property
+    def size(self) -> int:
+        """Number of ranked users in the snapshot."""
+        return len(self.scores)
+
+
+class LeaderboardService:
+    """
+    Leaderboards for rating, achievement points, spending, referrals and
+    daily streaks.
+    
+    Every SNAPSHOT_SECONDS one streaming scan per board rebuilds its
+    sorted snapshot (rank lookups) and its top buffer. Between snapshots,
+    users changed since the last poll (users.updated_at, every
+    POLL_SECONDS) update the top lists, so the public top is current
+    while "your rank" outside it is as of the last snapshot. Requests
+    never sort the users table.
+    """
+    
+    BOARDS = {
+        'rating': User.rating,
+        'points': User.achievement_points,
+        'spending': User.total_spent_cents,
+        'referrals': User.total_referrals,
+        'streak': User.daily_streak,
+    }
+    SNAPSHOT_SECONDS = 600
+    POLL_SECONDS = 10
+    POLL_OVERLAP = timedelta(seconds=5)  # updated_at has second resolution on some backends
+    TOP_BUFFER = 100
+    SCAN_CHUNK = 50_000
+    
+    def __init__(self):
+        self.boards = {name: Leaderboard(name, self.TOP_BUFFER) for name in self.BOARDS}
+        self._polled_at: Optional[datetime] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+        self.metrics = {'snapshots': 0, 'snapshot_seconds': 0.0, 'polls': 0, 'updates': 0}
+    
+    @property
+    def loaded(self) -> bool:
+        return self._polled_at is not None
+    
+    async def _scan(self, session: AsyncSession, column) -> tuple[array, list[tuple[float, int]]]:
+        """Positive scores of a column (sorted) and its TOP_BUFFER best (score, user_id)."""
+        values = []
+        top: list[tuple[float, int]] = []  # Min-heap of (score, -user_id)
+        result = await session.stream(
+            select(column, User.id)
+            .where(column > 0)
+            .execution_options(yield_per=self.SCAN_CHUNK)
+        )
+        async for rows in result.partitions():
+            for score, user_id in rows:
+                values.append(score)
+                entry = (score, -user_id)  # Lower id wins ties
+                if len(top) < self.TOP_BUFFER:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+        values.sort()
+        return array('d', values), [(score, -negative_id) for score, negative_id in top]
+    
+    async def refresh(self, session: AsyncSession):
+        """Rebuild all snapshots."""
+        started = time.monotonic()
+        polled_at = datetime.now(timezone.utc) - self.POLL_OVERLAP
+        for name, column in self.BOARDS.items():
+            scores, top = await self._scan(session, column)
+            self.boards[name].load(scores, top)
+        await session.rollback()  # End the read transaction
+        self._polled_at = polled_at
+        
+        elapsed = time.monotonic() - started
+        self.metrics['snapshots'] += 1
+        self.metrics['snapshot_seconds'] = elapsed
+        logger.info(
+            f"Leaderboards rebuilt in {elapsed:.2f}s "
+            f"({', '.join(f'{name} {board.size}' for name, board in self.boards.items())})"
+        )
+    
+    async def poll_changes(self, session: AsyncSession) -> int:
+        """Apply scores of users changed since the last poll to the top lists."""
+        since = self._polled_at
+        polled_at = datetime.now(timezone.utc) - self.POLL_OVERLAP
+        result = await session.execute(
+            select(User.id, *self.BOARDS.values()).where(User.updated_at >= since)
+        )
+        rows = result.all()
+        await session.rollback()
+        for user_id, *scores in rows:
+            self.apply(user_id, dict(zip(self.BOARDS, scores)))
+        self._polled_at = polled_at
+        self.metrics['polls'] += 1
+        return len(rows)
+    
+    def apply(self, user_id: int, scores: dict[str, float]):
+        """Apply a user's current scores (board name -> score)."""
+        for name, score in scores.items():
+            self.boards[name].update(user_id, score or 0)
+        self.metrics['updates'] += 1
+    
+    async def _load(self):
+        async for session in db.get_session():
+            await self.refresh(session)
+    
+    async def ensure_loaded(self):
+        """Build the snapshots if this process has none yet (concurrent callers share one build)."""
+        if self.loaded:
+            return
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._load())
+        await asyncio.shield(self._inflight)
+    
+    async def get_top(self, board: str, limit: int = 10) -> list[tuple[int, int, float]]:
+        """Best users of a board as (rank, user_id, score)."""
+        await self.ensure_loaded()
+        return self.boards[board].leaders(limit)
+    
+    async def get_rank(self, board: str, score: float) -> tuple[Optional[int], int]:
+        """
+        Rank for a score on a board.
+        
+        Returns:
+            (rank or None if not ranked, number of ranked users)
+        """
+        await self.ensure_loaded()
+        leaderboard = self.boards[board]
+        return leaderboard.rank(score), max(leaderboard.size, len(leaderboard.top))
+    
+    async def _run(self):
+        next_snapshot = 0.0
+        while True:
+            try:
+                depleted = any(board.depleted for board in self.boards.values())
+                if time.monotonic() >= next_snapshot or not self.loaded or depleted:
+                    await self._load()
+                    next_snapshot = time.monotonic() + self.SNAPSHOT_SECONDS
+                else:
+                    async for session in db.get_session():
+                        await self.poll_changes(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Leaderboard update failed: {e}")
+            await asyncio.sleep(self.POLL_SECONDS)
+    
+    def start(self):
+        """Start background snapshots and polling."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+    
+    async def stop(self):
+        """Stop background updates."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+# Global leaderboard service instance
+leaderboard_service = LeaderboardService()
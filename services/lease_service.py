@@ -0,0 +1,140 @@
+"""Expiring DB leases that partition monitor work between processes."""
+import logging
+import math
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.database import db
+from database.models import MonitorLease
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseService:
+    """
+    Leases in the monitor_leases table.
+    
+    A lease is taken with a conditional UPDATE (expired or already ours)
+    or an INSERT ... ON CONFLICT DO NOTHING for a new name, so only one
+    process can hold it on any backend. Holders renew before LEASE_SECONDS
+    pass; a crashed process's leases expire and a standby picks them up.
+    
+    Deposit wallets are split into shards by user id. Every worker keeps a
+    heartbeat lease and claims an equal share of the shards, releasing
+    extras when another worker joins. Postgres claims free shards with
+    FOR UPDATE SKIP LOCKED so workers do not block each other; SQLite
+    serializes writers and relies on the conditional UPDATE alone.
+    """
+    
+    LEASE_SECONDS = 30
+    
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    
+    async def _take(self, session: AsyncSession, name: str, seconds: float) -> bool:
+        """Take or renew lease `name`. Does not commit."""
+        now = datetime.now(timezone.utc)
+        result = await session.execute(
+            update(MonitorLease)
+            .where(
+                MonitorLease.name == name,
+                (MonitorLease.owner == self.owner) | (MonitorLease.expires_at < now)
+            )
+            .values(owner=self.owner, expires_at=now + timedelta(seconds=seconds), updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            return True
+        
+        result = await session.execute(
+            db.insert(MonitorLease)
+            .values(name=name, owner=self.owner, expires_at=now + timedelta(seconds=seconds), updated_at=now)
+            .on_conflict_do_nothing(index_elements=['name'])
+        )
+        return result.rowcount == 1  # 0: held by another worker
+    
+    async def acquire(self, session: AsyncSession, name: str, seconds: float = LEASE_SECONDS) -> bool:
+        """Take or renew lease `name` for `seconds`. Commits."""
+        taken = await self._take(session, name, seconds)
+        await session.commit()
+        return taken
+    
+    async def release_all(self, session: AsyncSession):
+        """Give up all our leases (graceful shutdown). Commits."""
+        await session.execute(
+            delete(MonitorLease)
+            .where(MonitorLease.owner == self.owner)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+    
+    async def claim_shards(self, session: AsyncSession, total: int) -> set[int]:
+        """
+        Renew our shards and balance them against live workers. Commits.
+        
+        Returns:
+            Shard numbers (0..total-1) owned by this worker
+        """
+        now = datetime.now(timezone.utc)
+        await self._take(session, f"worker:{self.owner}", self.LEASE_SECONDS)
+        
+        result = await session.execute(
+            select(func.count())
+            .select_from(MonitorLease)
+            .where(MonitorLease.name.like('worker:%'), MonitorLease.expires_at >= now)
+        )
+        target = math.ceil(total / max(result.scalar(), 1))
+        
+        result = await session.execute(
+            select(MonitorLease.name, MonitorLease.owner)
+            .where(MonitorLease.name.like('shard:%'), MonitorLease.expires_at >= now)
+        )
+        held = dict(result.all())
+        owned = sorted(
+            int(name.split(':')[1]) for name, owner in held.items()
+            if owner == self.owner and int(name.split(':')[1]) < total
+        )
+        
+        # Give shards back when over our share (a worker joined)
+        for shard in owned[target:]:
+            await session.execute(
+                delete(MonitorLease)
+                .where(MonitorLease.name == f"shard:{shard}", MonitorLease.owner == self.owner)
+                .execution_options(synchronize_session=False)
+            )
+        owned = owned[:target]
+        for shard in owned:
+            await self._take(session, f"shard:{shard}", self.LEASE_SECONDS)
+        
+        # Claim never-leased or expired shards up to our share; expired rows
+        # another worker is claiming right now are skipped (Postgres)
+        if len(owned) < target:
+            result = await session.execute(
+                select(MonitorLease.name).where(MonitorLease.name.like('shard:%'))
+            )
+            existing = set(result.scalars().all())
+            result = await session.execute(
+                select(MonitorLease.name)
+                .where(MonitorLease.name.like('shard:%'), MonitorLease.expires_at < now)
+                .with_for_update(skip_locked=True)
+            )
+            expired = set(result.scalars().all())
+            free = [
+                shard for shard in range(total)
+                if f"shard:{shard}" not in existing or f"shard:{shard}" in expired
+            ]
+            for shard in free:
+                if len(owned) >= target:
+                    break
+                if await self._take(session, f"shard:{shard}", self.LEASE_SECONDS):
+                    owned.append(shard)
+        
+        await session.commit()
+        return set(owned)
+
+
+# Global lease service instance
+lease_service = LeaseService()
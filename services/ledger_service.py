@@ -0,0 +1,329 @@
+"""Double-entry ledger service for user balances."""
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import event, select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.database import db
+from database.models import LedgerAccount, LedgerEntry, LedgerCheckpoint, User
+
+logger = logging.getLogger(__name__)
+
+
+@event.listens_for(LedgerEntry, 'before_update')
+@event.listens_for(LedgerEntry, 'before_delete')
+def _reject_entry_mutation(mapper, connection, target):
+    """Ledger entries are append-only; corrections are new postings."""
+    raise ValueError(f"Ledger entry {target.id} is append-only")
+
+
+class LedgerService:
+    """
+    Append-only double-entry ledger.
+    
+    Every posting writes two entries that sum to zero: the user account
+    side and a system counter account. User balances are materialized
+    in ledger_accounts (and mirrored into User.balance_cents) in the same
+    transaction, so balance reads never aggregate entries. System account
+    balances are derived from their entries: every posting touches one,
+    and a shared materialized row would serialize all postings on its lock.
+    """
+    
+    # System counter accounts
+    SYSTEM_DEPOSITS = 'system:deposits'
+    SYSTEM_WITHDRAWALS = 'system:withdrawals'
+    SYSTEM_SALES = 'system:sales'
+    SYSTEM_REWARDS = 'system:rewards'
+    SYSTEM_REFERRALS = 'system:referrals'
+    SYSTEM_AUCTION_ESCROW = 'system:auction_escrow'
+    SYSTEM_ADJUSTMENTS = 'system:adjustments'
+    SYSTEM_EXTERNAL = 'system:external'
+    SYSTEM_OPENING = 'system:opening'
+    
+    RECONCILE_SETTLE_SECONDS = 60  # Skip entries younger than this (in-flight transactions)
+    
+    @staticmethod
+    def user_account(user_id: int) -> str:
+        """Get ledger account code for user."""
+        return f"user:{user_id}"
+    
+    @staticmethod
+    async def _apply(
+        session: AsyncSession,
+        code: str,
+        user_id: Optional[int],
+        delta: int,
+        entry_id: int
+    ):
+        """
+        Apply delta to materialized account balance, creating the account if needed.
+        One upsert, so concurrent first postings to an account cannot both insert it.
+        """
+        stmt = db.insert(LedgerAccount).values(
+            code=code,
+            user_id=user_id,
+            balance_minor=delta,
+            verified_balance_minor=0,
+            last_entry_id=entry_id
+        )
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=['code'],
+                set_={
+                    'balance_minor': LedgerAccount.balance_minor + delta,
+                    'last_entry_id': entry_id,
+                    'updated_at': func.now()
+                }
+            )
+        )
+    
+    @staticmethod
+    async def post(
+        session: AsyncSession,
+        user_id: int,
+        amount_minor: int,
+        counter_account: str,
+        entry_type: str,
+        description: Optional[str] = None,
+        mirror: bool = True
+    ) -> str:
+        """
+        Post a balanced pair of entries and update materialized balances.
+        Does not commit; the caller owns the transaction.
+        
+        Args:
+            session: Database session
+            user_id: User whose account is credited (positive) or debited (negative)
+            amount_minor: Signed amount in cents
+            counter_account: System account taking the opposite side
+            entry_type: Entry type (deposit, purchase, reward, ...)
+            description: Optional description
+            mirror: Also update User.balance_cents
+        
+        Returns:
+            Journal ID of the posting
+        """
+        journal_id = uuid.uuid4().hex
+        user_code = LedgerService.user_account(user_id)
+        
+        user_entry = LedgerEntry(
+            journal_id=journal_id,
+            account_code=user_code,
+            user_id=user_id,
+            amount_minor=amount_minor,
+            entry_type=entry_type,
+            description=description
+        )
+        counter_entry = LedgerEntry(
+            journal_id=journal_id,
+            account_code=counter_account,
+            user_id=user_id,
+            amount_minor=-amount_minor,
+            entry_type=entry_type,
+            description=description
+        )
+        session.add_all([user_entry, counter_entry])
+        await session.flush()
+        
+        await LedgerService._apply(session, user_code, user_id, amount_minor, user_entry.id)
+        
+        if mirror:
+            await session.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(balance_cents=User.balance_cents + amount_minor)
+            )
+        
+        return journal_id
+    
+    @staticmethod
+    async def get_balance_minor(session: AsyncSession, user_id: int) -> int:
+        """Get user's materialized ledger balance in cents."""
+        result = await session.execute(
+            select(LedgerAccount.balance_minor)
+            .where(LedgerAccount.code == LedgerService.user_account(user_id))
+        )
+        return result.scalar_one_or_none() or 0
+    
+    @staticmethod
+    async def get_system_balance_minor(session: AsyncSession, code: str) -> int:
+        """Get system account balance in cents, aggregated from its entries."""
+        result = await session.execute(
+            select(func.coalesce(func.sum(LedgerEntry.amount_minor), 0))
+            .where(LedgerEntry.account_code == code)
+        )
+        return result.scalar()
+    
+    @staticmethod
+    async def get_user_entries(
+        session: AsyncSession,
+        user_id: int,
+        limit: int = 50
+    ) -> list[LedgerEntry]:
+        """Get user's latest ledger entries."""
+        result = await session.execute(
+            select(LedgerEntry)
+            .where(LedgerEntry.account_code == LedgerService.user_account(user_id))
+            .order_by(LedgerEntry.id.desc())
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+    
+    @staticmethod
+    async def open_user_balances(session: AsyncSession) -> int:
+        """
+        Create opening postings for users that have a balance but no ledger account.
+        Used once when migrating existing data. Returns count of opened accounts.
+        """
+        result = await session.execute(
+            select(User.id, User.balance_cents)
+            .outerjoin(LedgerAccount, LedgerAccount.user_id == User.id)
+            .where(LedgerAccount.id.is_(None))
+        )
+        
+        count = 0
+        for user_id, balance_cents in result.all():
+            await LedgerService.post(
+                session,
+                user_id,
+                balance_cents or 0,
+                LedgerService.SYSTEM_OPENING,
+                'opening',
+                description="Opening balance",
+                mirror=False
+            )
+            count += 1
+        
+        await session.commit()
+        logger.info(f"Opened {count} ledger accounts")
+        return count
+    
+    @staticmethod
+    async def verify_account(session: AsyncSession, code: str) -> bool:
+        """Verify a single user account against its entries (indexed by account)."""
+        result = await session.execute(
+            select(func.coalesce(func.sum(LedgerEntry.amount_minor), 0))
+            .where(LedgerEntry.account_code == code)
+        )
+        entries_sum = result.scalar()
+        
+        result = await session.execute(
+            select(LedgerAccount.balance_minor).where(LedgerAccount.code == code)
+        )
+        balance = result.scalar_one_or_none() or 0
+        
+        if entries_sum != balance:
+            logger.error(f"Ledger mismatch on {code}: entries={entries_sum}, balance={balance}")
+            return False
+        return True
+    
+    @staticmethod
+    async def reconcile(session: AsyncSession) -> dict:
+        """
+        Incrementally verify materialized user balances against new entries.
+        
+        Only entries after the last checkpoint are aggregated. Each touched
+        account's verified balance is advanced by its delta and compared with
+        the materialized balance. Accounts written after the window are locked
+        and re-read, and their later entries are added before comparing.
+        
+        Returns:
+            Dict with checked window, accounts checked and mismatches
+        """
+        result = await session.execute(select(func.max(LedgerCheckpoint.last_entry_id)))
+        last_id = result.scalar() or 0
+        
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=LedgerService.RECONCILE_SETTLE_SECONDS)
+        result = await session.execute(
+            select(func.max(LedgerEntry.id))
+            .where(LedgerEntry.id > last_id, LedgerEntry.created_at < cutoff)
+        )
+        upper_id = result.scalar()
+        
+        if not upper_id:
+            return {'from_id': last_id, 'to_id': last_id, 'accounts_checked': 0, 'mismatches': []}
+        
+        result = await session.execute(
+            select(LedgerEntry.account_code, func.sum(LedgerEntry.amount_minor))
+            .where(LedgerEntry.id > last_id, LedgerEntry.id <= upper_id)
+            .group_by(LedgerEntry.account_code)
+        )
+        deltas = dict(result.all())
+        
+        result = await session.execute(
+            select(LedgerAccount).where(
+                LedgerAccount.code.in_(deltas.keys()),
+                LedgerAccount.user_id.is_not(None)
+            )
+        )
+        accounts = {account.code: account for account in result.scalars().all()}
+        
+        # Accounts written after the window: lock them so no posting is in flight,
+        # then compare against the balance including their later entries
+        busy = [code for code, account in accounts.items() if account.last_entry_id > upper_id]
+        later = {}
+        if busy:
+            result = await session.execute(
+                select(LedgerAccount)
+                .where(LedgerAccount.code.in_(busy))
+                .with_for_update()
+                .execution_options(populate_existing=True)
+            )
+            for account in result.scalars().all():
+                accounts[account.code] = account
+            result = await session.execute(
+                select(LedgerEntry.account_code, func.sum(LedgerEntry.amount_minor))
+                .where(LedgerEntry.account_code.in_(busy), LedgerEntry.id > upper_id)
+                .group_by(LedgerEntry.account_code)
+            )
+            later = dict(result.all())
+        
+        mismatches = []
+        checked = 0
+        for account in accounts.values():
+            account.verified_balance_minor += deltas[account.code]
+            checked += 1
+            expected = account.verified_balance_minor + later.get(account.code, 0)
+            if expected != account.balance_minor:
+                mismatches.append(account.code)
+                logger.error(
+                    f"Ledger mismatch on {account.code}: "
+                    f"verified={expected}, balance={account.balance_minor}"
+                )
+        
+        # Mirror check: User.balance_cents must match the user account
+        result = await session.execute(
+            select(User.id)
+            .join(LedgerAccount, LedgerAccount.user_id == User.id)
+            .where(
+                LedgerAccount.code.in_(deltas.keys()),
+                User.balance_cents != LedgerAccount.balance_minor
+            )
+        )
+        for user_id in result.scalars().all():
+            mismatches.append(f"mirror:{user_id}")
+            logger.error(f"User {user_id} balance_cents drifted from ledger")
+        
+        session.add(LedgerCheckpoint(
+            last_entry_id=upper_id,
+            accounts_checked=checked,
+            mismatches=len(mismatches)
+        ))
+        await session.commit()
+        
+        logger.info(
+            f"Ledger reconciled entries {last_id + 1}..{upper_id}: "
+            f"{checked} accounts, {len(mismatches)} mismatches"
+        )
+        
+        return {
+            'from_id': last_id,
+            'to_id': upper_id,
+            'accounts_checked': checked,
+            'mismatches': mismatches
+        }
+
+
+# Global ledger service instance
+ledger_service = LedgerService()
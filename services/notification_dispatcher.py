@@ -0,0 +1,251 @@
+"""Broadcast of queued notifications within Telegram flood limits."""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest,
+    TelegramNetworkError, TelegramServerError
+)
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.database import db
+from database.models import Notification, User
+from services.lease_service import lease_service
+from services.notification_service import notification_service
+from services.rpc_pool import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationDispatcher:
+    """
+    Sends pending notifications to their recipients.
+    
+    Recipients are loaded in user id order, CHUNK_SIZE at a time, and sent
+    in batches; after every batch the notification's cursor (last_user_id)
+    and delivery counters are committed, so a restart resumes the
+    broadcast where it stopped (re-sending at most one batch). The lease is
+    renewed after every batch too, and the broadcast stops if it was lost.
+    
+    Sends go through a token bucket at Telegram's global limit (~30
+    messages/second) and keep PER_CHAT_INTERVAL between messages to the
+    same chat. A 429 pauses all sending for its retry_after and the
+    message is retried. Users who blocked the bot are marked
+    (bot_blocked_at) and skipped by later broadcasts until they write to
+    the bot again.
+    
+    Before sending, new_product events are merged into digests: instant
+    ones once a burst of uploads goes quiet for DIGEST_QUIET (at most
+    DIGEST_MAX_DELAY after its first event), hourly and daily ones after
+    every clock hour / UTC day.
+    
+    Only the process holding the job:notifications lease dispatches.
+    """
+    
+    GLOBAL_RATE = 30  # Messages per second for the whole bot
+    PER_CHAT_INTERVAL = 1.0  # Seconds between messages to one chat
+    CHUNK_SIZE = 1000  # Recipients per query
+    BATCH_SIZE = 30  # Recipients sent between progress commits
+    MAX_ATTEMPTS = 5
+    POLL_SECONDS = 5
+    LEASE_NAME = 'job:notifications'
+    LEASE_SECONDS = 120
+    DIGEST_QUIET = timedelta(minutes=2)
+    DIGEST_MAX_DELAY = timedelta(minutes=10)
+    DIGEST_PERIODS = {'hourly': timedelta(hours=1), 'daily': timedelta(days=1)}
+    
+    def __init__(self):
+        self.bucket = TokenBucket(self.GLOBAL_RATE)
+        self._chat_ready: dict[int, float] = {}  # chat id -> monotonic time of next allowed send
+        self._resume_at = 0.0  # Flood control pause
+        self._task: Optional[asyncio.Task] = None
+        self._digested: dict[str, datetime] = {}  # frequency -> end of the last period digested
+        self.metrics = {'delivered': 0, 'blocked': 0, 'failed': 0, 'retries': 0, 'notifications': 0, 'digests': 0}
+    
+    def _pause(self, seconds: float):
+        """Stop all sending for `seconds` (Telegram flood control)."""
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+        self.bucket.drain()
+    
+    async def _wait_turn(self, chat_id: int):
+        """Wait for the flood pause, the chat's interval and a global token."""
+        while True:
+            now = time.monotonic()
+            delay = max(self._resume_at, self._chat_ready.get(chat_id, 0.0)) - now
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        await self.bucket.acquire()
+        self._chat_ready[chat_id] = time.monotonic() + self.PER_CHAT_INTERVAL
+    
+    def _forget_idle_chats(self):
+        now = time.monotonic()
+        self._chat_ready = {chat_id: ready for chat_id, ready in self._chat_ready.items() if ready > now}
+    
+    async def send(self, bot: Bot, chat_id: int, text: str) -> str:
+        """
+        Send one message within the flood limits, retrying on 429 and network errors.
+        
+        Returns:
+            'delivered', 'blocked' (user blocked the bot or is gone) or 'failed'
+        """
+        for attempt in range(self.MAX_ATTEMPTS):
+            await self._wait_turn(chat_id)
+            try:
+                await bot.send_message(chat_id, text)
+                return 'delivered'
+            except TelegramRetryAfter as e:
+                self.metrics['retries'] += 1
+                logger.warning(f"Telegram flood control, pausing notifications for {e.retry_after}s")
+                self._pause(e.retry_after)
+            except TelegramForbiddenError:
+                return 'blocked'
+            except TelegramBadRequest as e:
+                if 'chat not found' in str(e).lower():
+                    return 'blocked'
+                logger.warning(f"Notification to {chat_id} rejected: {e}")
+                return 'failed'
+            except (TelegramNetworkError, TelegramServerError) as e:
+                self.metrics['retries'] += 1
+                logger.warning(f"Notification to {chat_id} failed (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(2 ** attempt)
+        return 'failed'
+    
+    async def dispatch(self, session: AsyncSession, bot: Bot, notification: Notification) -> bool:
+        """
+        Send a notification to its remaining recipients. Commits progress and
+        renews the lease after every batch.
+        
+        Returns:
+            True if the broadcast finished, False if the lease was lost
+        """
+        if notification.started_at is None:
+            notification.started_at = datetime.now(timezone.utc)
+            await session.commit()
+        
+        started = time.monotonic()
+        sent_before = notification.delivered_count + notification.blocked_count + notification.failed_count
+        
+        async for user_ids in notification_service.get_users_to_notify(
+            session, notification, after_id=notification.last_user_id, chunk_size=self.CHUNK_SIZE
+        ):
+            for i in range(0, len(user_ids), self.BATCH_SIZE):
+                batch = user_ids[i:i + self.BATCH_SIZE]
+                results = await asyncio.gather(*(
+                    self.send(bot, user_id, notification.message) for user_id in batch
+                ))
+                
+                blocked = [user_id for user_id, result in zip(batch, results) if result == 'blocked']
+                if blocked:
+                    await session.execute(
+                        update(User)
+                        .where(User.id.in_(blocked))
+                        .values(bot_blocked_at=datetime.now(timezone.utc))
+                        .execution_options(synchronize_session=False)
+                    )
+                delivered = results.count('delivered')
+                failed = results.count('failed')
+                notification.last_user_id = batch[-1]
+                notification.delivered_count += delivered
+                notification.blocked_count += len(blocked)
+                notification.failed_count += failed
+                await session.commit()
+                
+                self.metrics['delivered'] += delivered
+                self.metrics['blocked'] += len(blocked)
+                self.metrics['failed'] += failed
+                self._forget_idle_chats()
+                
+                # A batch can outlast flood pauses; renew so another process never sends it twice
+                if not await lease_service.acquire(session, self.LEASE_NAME, self.LEASE_SECONDS):
+                    logger.warning(f"Lost notifications lease, stopping notification {notification.id}")
+                    return False
+            
+            done = notification.delivered_count + notification.blocked_count + notification.failed_count
+            elapsed = time.monotonic() - started
+            logger.info(
+                f"📨 Notification {notification.id}: {done} recipients done "
+                f"({(done - sent_before) / max(elapsed, 1e-9):.1f} msg/s)"
+            )
+        
+        await notification_service.mark_as_sent(session, notification.id)
+        notification.sent = True
+        self.metrics['notifications'] += 1
+        
+        elapsed = time.monotonic() - started
+        sent = notification.delivered_count + notification.blocked_count + notification.failed_count - sent_before
+        logger.info(
+            f"✅ Notification {notification.id} ({notification.notification_type}) sent: "
+            f"{notification.delivered_count} delivered, {notification.blocked_count} blocked, "
+            f"{notification.failed_count} failed; {sent} messages in {elapsed:.1f}s "
+            f"({sent / max(elapsed, 1e-9):.1f} msg/s)"
+        )
+        return True
+    
+    async def prepare_digests(self, session: AsyncSession):
+        """Merge due new_product events into instant and periodic digests. Commits."""
+        self.metrics['digests'] += await notification_service.coalesce_pending(
+            session, self.DIGEST_QUIET, self.DIGEST_MAX_DELAY
+        )
+        
+        now = datetime.now(timezone.utc)
+        for frequency, period in self.DIGEST_PERIODS.items():
+            epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+            period_end = epoch + (now - epoch) // period * period
+            if self._digested.get(frequency) == period_end:
+                continue
+            created = await notification_service.create_period_digests(
+                session, frequency, period_end - period, period_end
+            )
+            self._digested[frequency] = period_end
+            self.metrics['digests'] += created or 0
+    
+    async def dispatch_pending(self, session: AsyncSession, bot: Bot) -> int:
+        """
+        Send all pending notifications if this process holds the lease.
+        
+        Returns:
+            Number of notifications finished
+        """
+        if not await lease_service.acquire(session, self.LEASE_NAME, self.LEASE_SECONDS):
+            return 0
+        await self.prepare_digests(session)
+        
+        finished = 0
+        for notification in await notification_service.get_pending_notifications(session):
+            if not await lease_service.acquire(session, self.LEASE_NAME, self.LEASE_SECONDS):
+                break
+            if not await self.dispatch(session, bot, notification):
+                break
+            finished += 1
+        return finished
+    
+    async def _run(self, bot: Bot):
+        while True:
+            try:
+                async for session in db.get_session():
+                    await self.dispatch_pending(session, bot)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification dispatch error: {e}", exc_info=True)
+            await asyncio.sleep(self.POLL_SECONDS)
+    
+    def start(self, bot: Bot):
+        """Start sending queued notifications in the background."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run(bot))
+    
+    async def stop(self):
+        """Stop sending; progress up to the last finished batch is kept."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+# Global notification dispatcher instance
+notification_dispatcher = NotificationDispatcher()
@@ -1,15 +1,28 @@
 """Notification service."""
 import logging
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
-from database.models import Notification, User
+from sqlalchemy import select, update, func
+from database.models import Notification, User, Region
+from utils.helpers import as_utc, plural_ru
+from utils.money import format_eur
 
 logger = logging.getLogger(__name__)
 
 
 class NotificationService:
-    """Service for managing notifications."""
+    """
+    Service for managing notifications.
+    
+    new_product notifications are events, not sent as they are: the
+    dispatcher merges them per (type, region, user) into digests. Users
+    with the 'instant' digest setting get one digest per burst of uploads,
+    'hourly' and 'daily' users one per clock hour / UTC day.
+    """
+    
+    COALESCED_TYPES = ('new_product',)
+    DIGEST_FREQUENCIES = ('instant', 'hourly', 'daily')
     
     @staticmethod
     async def create_notification(
@@ -17,14 +30,16 @@ class NotificationService:
         message: str,
         notification_type: str,  # new_product, news, promo
         user_id: int = None,  # None = all users
-        region_id: int = None  # None = all regions
+        region_id: int = None,  # None = all regions
+        audience: Optional[dict] = None  # Extra recipient filters, see audience_conditions
     ) -> Notification:
         """Create a notification."""
         notification = Notification(
             user_id=user_id,
             region_id=region_id,
             message=message,
-            notification_type=notification_type
+            notification_type=notification_type,
+            audience=audience
         )
         session.add(notification)
         await session.commit()
@@ -34,33 +49,111 @@ class NotificationService:
     
     @staticmethod
     async def get_pending_notifications(session: AsyncSession) -> list[Notification]:
-        """Get all pending notifications."""
-        stmt = select(Notification).where(Notification.sent == False)
+        """Get all pending notifications (oldest first), except events waiting for a digest."""
+        stmt = select(Notification).where(
+            Notification.sent == False,
+            ~(Notification.notification_type.in_(NotificationService.COALESCED_TYPES) & Notification.digest.is_(None))
+        ).order_by(Notification.id)
         result = await session.execute(stmt)
         return list(result.scalars().all())
     
     @staticmethod
-    async def get_users_to_notify(
-        session: AsyncSession,
-        notification: Notification
-    ) -> list[int]:
-        """Get list of user IDs to notify."""
-        # Build query
-        stmt = select(User.id).where(
-            User.notifications_enabled == True,
-            User.is_blocked == False
-        )
+    def audience_conditions(audience: Optional[dict]) -> list:
+        """
+        WHERE conditions on User for an audience.
         
-        # Filter by specific user
-        if notification.user_id:
-            stmt = stmt.where(User.id == notification.user_id)
+        Audience keys (all optional):
+            user_id: int - one user
+            region_ids: list[int] - users in these regions
+            languages: list[str] - users with these languages
+            notifications_enabled: bool | None - default True, None = ignore the setting
+            active_days: int - seen in the bot within this many days
+            purchased: bool - with (True) or without (False) purchases
+            digest: list[str] - users with these digest frequencies
+        
+        Blocked users and users who blocked the bot are never included.
+        """
+        audience = audience or {}
+        conditions = [
+            User.is_blocked == False,
+            User.bot_blocked_at.is_(None)
+        ]
         
-        # Filter by region
+        notifications_enabled = audience.get('notifications_enabled', True)
+        if notifications_enabled is not None:
+            conditions.append(User.notifications_enabled == notifications_enabled)
+        if audience.get('user_id'):
+            conditions.append(User.id == audience['user_id'])
+        if audience.get('region_ids'):
+            conditions.append(User.region_id.in_(audience['region_ids']))
+        if audience.get('languages'):
+            conditions.append(User.language.in_(audience['languages']))
+        if audience.get('active_days'):
+            since = datetime.now(timezone.utc) - timedelta(days=audience['active_days'])
+            conditions.append(User.last_seen_at >= since)
+        if audience.get('purchased') is not None:
+            conditions.append(User.total_purchases > 0 if audience['purchased'] else User.total_purchases == 0)
+        if audience.get('digest'):
+            conditions.append(User.notification_digest.in_(audience['digest']))
+        return conditions
+    
+    @staticmethod
+    def notification_audience(notification: Notification) -> dict:
+        """Audience of a notification: its stored filters plus user and region."""
+        audience = dict(notification.audience or {})
+        if notification.user_id:
+            audience['user_id'] = notification.user_id
         if notification.region_id:
-            stmt = stmt.where(User.region_id == notification.region_id)
+            audience['region_ids'] = [notification.region_id]
+        return audience
+    
+    @staticmethod
+    async def count_audience(session: AsyncSession, audience: Optional[dict]) -> int:
+        """Number of users an audience reaches (for a preview before sending)."""
+        result = await session.execute(
+            select(func.count(User.id)).where(*NotificationService.audience_conditions(audience))
+        )
+        return result.scalar() or 0
+    
+    @staticmethod
+    async def iter_audience(
+        session: AsyncSession,
+        audience: Optional[dict],
+        after_id: int = 0,
+        chunk_size: int = 1000
+    ) -> AsyncIterator[list[int]]:
+        """
+        Yield user IDs of an audience in ascending chunks, starting after `after_id`.
         
-        result = await session.execute(stmt)
-        return list(result.scalars().all())
+        Every chunk is its own keyset query (id > last id, primary key order),
+        so memory stays at one chunk, no cursor stays open and the caller may
+        commit between chunks.
+        """
+        stmt = select(User.id).where(*NotificationService.audience_conditions(audience))
+        while True:
+            result = await session.execute(
+                stmt.where(User.id > after_id).order_by(User.id).limit(chunk_size)
+            )
+            user_ids = list(result.scalars().all())
+            if not user_ids:
+                return
+            yield user_ids
+            after_id = user_ids[-1]
+    
+    @staticmethod
+    def get_users_to_notify(
+        session: AsyncSession,
+        notification: Notification,
+        after_id: int = 0,
+        chunk_size: int = 1000
+    ) -> AsyncIterator[list[int]]:
+        """Yield IDs of users to notify in ascending chunks, starting after `after_id`."""
+        return NotificationService.iter_audience(
+            session,
+            NotificationService.notification_audience(notification),
+            after_id=after_id,
+            chunk_size=chunk_size
+        )
     
     @staticmethod
     async def mark_as_sent(session: AsyncSession, notification_id: int):
@@ -72,16 +165,146 @@ class NotificationService:
         await session.execute(stmt)
         await session.commit()
     
+    @staticmethod
+    def digest_message(count: int, place: Optional[str], frequency: str) -> str:
+        """Text of a new product digest."""
+        products = f"{count} {plural_ru(count, 'новый товар', 'новых товара', 'новых товаров')}"
+        where = f" в {place}" if place else ""
+        if frequency == 'hourly':
+            headline = f"🆕 За последний час{where}: {products}"
+        elif frequency == 'daily':
+            headline = f"🆕 За сутки{where}: {products}"
+        else:
+            headline = f"🆕 {products.capitalize()}{where}!"
+        return f"{headline}\n\n📍 Перейдите в каталог чтобы купить!"
+    
+    @staticmethod
+    async def _region_names(session: AsyncSession, region_ids: set) -> dict[int, str]:
+        region_ids = {region_id for region_id in region_ids if region_id}
+        if not region_ids:
+            return {}
+        result = await session.execute(select(Region.id, Region.name).where(Region.id.in_(region_ids)))
+        return dict(result.all())
+    
+    @staticmethod
+    async def coalesce_pending(session: AsyncSession, quiet: timedelta, max_delay: timedelta) -> int:
+        """
+        Merge pending events into instant digests. Commits.
+        
+        A group of events (same type, region and user) is merged once no new
+        event arrived for `quiet`, or when its oldest event waited `max_delay`
+        (continuous uploads). A group of one keeps its own text.
+        
+        Returns:
+            Number of digests created
+        """
+        result = await session.execute(
+            select(Notification)
+            .where(
+                Notification.sent == False,
+                Notification.notification_type.in_(NotificationService.COALESCED_TYPES),
+                Notification.digest.is_(None)
+            )
+            .order_by(Notification.id)
+        )
+        groups: dict[tuple, list[Notification]] = {}
+        for event in result.scalars().all():
+            groups.setdefault((event.notification_type, event.region_id, event.user_id), []).append(event)
+        
+        now = datetime.now(timezone.utc)
+        ready = {
+            key: events for key, events in groups.items()
+            if now - as_utc(events[-1].created_at) >= quiet or now - as_utc(events[0].created_at) >= max_delay
+        }
+        if not ready:
+            return 0
+        
+        names = await NotificationService._region_names(session, {region_id for _, region_id, _ in ready})
+        for (notification_type, region_id, user_id), events in ready.items():
+            count = sum(event.item_count for event in events)
+            session.add(Notification(
+                user_id=user_id,
+                region_id=region_id,
+                notification_type=notification_type,
+                message=events[0].message if count == 1 else NotificationService.digest_message(
+                    count, names.get(region_id), 'instant'
+                ),
+                audience={'digest': ['instant']},
+                digest='instant',
+                item_count=count
+            ))
+            for event in events:
+                event.sent = True
+                event.sent_at = now
+        await session.commit()
+        logger.info(
+            f"Merged {sum(len(events) for events in ready.values())} notification events "
+            f"into {len(ready)} digests"
+        )
+        return len(ready)
+    
+    @staticmethod
+    async def create_period_digests(
+        session: AsyncSession,
+        frequency: str,
+        period_start: datetime,
+        period_end: datetime
+    ) -> Optional[int]:
+        """
+        Create `frequency` digests of the events in [period_start, period_end). Commits.
+        
+        Returns:
+            Number of digests created, or None if this period's digests already exist
+        """
+        result = await session.execute(
+            select(Notification.id)
+            .where(Notification.digest == frequency, Notification.created_at >= period_end)
+            .limit(1)
+        )
+        if result.scalar_one_or_none() is not None:
+            return None
+        
+        result = await session.execute(
+            select(
+                Notification.notification_type,
+                Notification.region_id,
+                Notification.user_id,
+                func.sum(Notification.item_count)
+            )
+            .where(
+                Notification.notification_type.in_(NotificationService.COALESCED_TYPES),
+                Notification.digest.is_(None),
+                Notification.created_at >= period_start,
+                Notification.created_at < period_end
+            )
+            .group_by(Notification.notification_type, Notification.region_id, Notification.user_id)
+        )
+        groups = result.all()
+        names = await NotificationService._region_names(session, {region_id for _, region_id, _, _ in groups})
+        for notification_type, region_id, user_id, count in groups:
+            session.add(Notification(
+                user_id=user_id,
+                region_id=region_id,
+                notification_type=notification_type,
+                message=NotificationService.digest_message(count, names.get(region_id), frequency),
+                audience={'digest': [frequency]},
+                digest=frequency,
+                item_count=count,
+                created_at=datetime.now(timezone.utc)
+            ))
+        await session.commit()
+        return len(groups)
+    
     @staticmethod
     async def send_new_product_notification(
         session: AsyncSession,
         image_id: int,
         region_id: int,
         city_name: str,
-        price_sol: float
+        price_cents: int
     ):
-        """Send notification about new product."""
-        message = f"🆕 Новый товар в {city_name}!\n💰 Цена: {price_sol} SOL\n\n📍 Перейдите в каталог чтобы купить!"
+        """Queue a new product event (sent merged into digests)."""
+        message = f"🆕 Новый товар в {city_name}!\n💰 Цена: {format_eur(price_cents)}\n\n📍 Перейдите в каталог чтобы купить!"
         await NotificationService.create_notification(
             session,
             message,
@@ -1,22 +1,169 @@
 """Price service for getting SOL/EUR rate."""
 import asyncio
 import logging
-from datetime import datetime, timedelta, timezone
+import statistics
+from datetime import datetime, timezone
 from typing import Optional
 import aiohttp
-from pycoingecko import CoinGeckoAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from database.database import db
+from database.models import ExchangeRate
+from services.lease_service import lease_service
+from services.rate_providers import RateProvider, build_providers
+from utils.helpers import as_utc
+from utils.money import (
+    eur_to_cents, cents_to_eur, lamports_to_cents, cents_to_lamports,
+    format_eur as format_cents, format_sol as format_lamports
+)
 
 logger = logging.getLogger(__name__)
 
 
+class RateUnavailableError(Exception):
+    """No price source returned a rate."""
+
+
 class PriceService:
-    """Service for managing cryptocurrency prices."""
+    """
+    SOL/EUR rate shared by the bot and the monitor through the
+    exchange_rates table.
+    
+    Every REFRESH_SECONDS the process holding the job:rates lease asks
+    all price sources (RATE_SOURCES) in parallel and stores their median;
+    every process loads the newest stored rate into memory. So
+    get_sol_eur_rate() is a memory read, both processes convert at the
+    same rate, and a restart starts with the last stored rate. A rate
+    older than FRESH_SECONDS is served while a refresh runs in the
+    background (stale-while-revalidate); past MAX_STALENESS_SECONDS
+    callers wait for the refresh instead. Concurrent refreshes share a
+    single run.
+    
+    Conversions at a past moment (a deposit's block time) look the rate
+    up in the stored history.
+    """
+    
+    REFRESH_SECONDS = 30  # Background refresh interval
+    FRESH_SECONDS = 60  # Served without triggering a refresh
+    MAX_STALENESS_SECONDS = 600  # Older rates are not served without a refresh attempt
+    REQUEST_TIMEOUT = 10
+    DEFAULT_RATE = 150.0  # 1 SOL ≈ 150 EUR, used only if no rate was ever stored
+    LEASE_NAME = 'job:rates'
     
-    def __init__(self):
-        self.cg = CoinGeckoAPI()
+    def __init__(self, providers: Optional[list[RateProvider]] = None):
+        self.providers = providers if providers is not None else build_providers(settings.rate_sources)
         self.current_rate: Optional[float] = None
         self.last_update: Optional[datetime] = None
-        self.update_interval = 60  # Update every 60 seconds
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+        self.metrics = {'hits': 0, 'stale': 0, 'waits': 0, 'refreshes': 0, 'fetches': 0, 'errors': 0}
+    
+    @property
+    def age(self) -> float:
+        """Seconds since the rate was fetched (infinite if never)."""
+        if self.last_update is None:
+            return float('inf')
+        return (datetime.now(timezone.utc) - self.last_update).total_seconds()
+    
+    async def fetch_rate(self) -> tuple[float, dict[str, float]]:
+        """
+        Ask all price sources in parallel.
+        
+        Returns:
+            (median rate, rate per source that answered)
+        
+        Raises:
+            RateUnavailableError: If no source answered
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.REQUEST_TIMEOUT))
+        
+        results = await asyncio.gather(
+            *(provider.fetch(self._session) for provider in self.providers),
+            return_exceptions=True
+        )
+        rates = {}
+        for provider, result in zip(self.providers, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Rate source {provider.name} failed: {result!r}")
+            elif result > 0:
+                rates[provider.name] = result
+        
+        if not rates:
+            raise RateUnavailableError("No SOL/EUR rate source answered")
+        return statistics.median(rates.values()), rates
+    
+    @staticmethod
+    async def get_latest(session: AsyncSession) -> Optional[ExchangeRate]:
+        """Newest stored rate."""
+        result = await session.execute(
+            select(ExchangeRate).order_by(ExchangeRate.created_at.desc()).limit(1)
+        )
+        return result.scalar_one_or_none()
+    
+    @staticmethod
+    async def get_rate_at(session: AsyncSession, when: datetime) -> Optional[ExchangeRate]:
+        """Rate in effect at `when` (newest stored at or before it)."""
+        result = await session.execute(
+            select(ExchangeRate)
+            .where(ExchangeRate.created_at <= when)
+            .order_by(ExchangeRate.created_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+    
+    async def _record(self, session: AsyncSession) -> ExchangeRate:
+        """Fetch the rate from the sources and store it. Commits."""
+        self.metrics['fetches'] += 1
+        rate, sources = await self.fetch_rate()
+        row = ExchangeRate(
+            rate_cents=eur_to_cents(rate),
+            sources=sources,
+            created_at=datetime.now(timezone.utc)
+        )
+        session.add(row)
+        await session.commit()
+        logger.info(f"Updated SOL/EUR rate: {rate} ({', '.join(f'{k} {v}' for k, v in sources.items())})")
+        return row
+    
+    def _apply(self, row: ExchangeRate):
+        self.current_rate = cents_to_eur(row.rate_cents)
+        self.last_update = as_utc(row.created_at)
+    
+    async def _refresh(self):
+        try:
+            async for session in db.get_session():
+                row = await self.get_latest(session)
+                due = row is None or (
+                    datetime.now(timezone.utc) - as_utc(row.created_at)
+                ).total_seconds() >= self.REFRESH_SECONDS
+                if due and await lease_service.acquire(session, self.LEASE_NAME, self.REFRESH_SECONDS * 3):
+                    try:
+                        row = await self._record(session)
+                    except RateUnavailableError:
+                        if row is None:
+                            raise
+                        logger.warning("SOL/EUR rate sources unavailable, keeping the stored rate")
+                if row is not None:
+                    self._apply(row)
+        except Exception:
+            self.metrics['errors'] += 1
+            raise
+        self.metrics['refreshes'] += 1
+    
+    def _start_refresh(self) -> asyncio.Future:
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._refresh())
+            # Errors are logged by whoever awaits; background refreshes must not warn "never retrieved"
+            self._inflight.add_done_callback(lambda future: future.cancelled() or future.exception())
+        return self._inflight
+    
+    async def refresh(self):
+        """Load (and if due, fetch) the rate; callers arriving during a refresh wait for the same one."""
+        # Shielded: a cancelled caller must not cancel the refresh others wait on
+        await asyncio.shield(self._start_refresh())
     
     async def get_sol_eur_rate(self) -> float:
         """
@@ -25,55 +172,88 @@ class PriceService:
         Returns:
             Current rate (1 SOL = X EUR)
         """
-        # Check if we have cached rate (less than 60 seconds old)
-        if self.current_rate and self.last_update:
-            if datetime.now(timezone.utc) - self.last_update < timedelta(seconds=self.update_interval):
-                return self.current_rate
+        age = self.age
+        if age <= self.FRESH_SECONDS:
+            self.metrics['hits'] += 1
+            return self.current_rate
         
+        if age <= self.MAX_STALENESS_SECONDS:
+            # Serve the recent rate now, refresh for the next callers
+            self.metrics['stale'] += 1
+            self._start_refresh()
+            return self.current_rate
+        
+        self.metrics['waits'] += 1
         try:
-            # Get price from CoinGecko
-            price_data = await asyncio.to_thread(
-                self.cg.get_price,
-                ids='solana',
-                vs_currencies='eur'
-            )
-            
-            rate = price_data['solana']['eur']
-            self.current_rate = rate
-            self.last_update = datetime.now(timezone.utc)
-            
-            logger.info(f"Updated SOL/EUR rate: {rate}")
-            return rate
-            
+            await self.refresh()
         except Exception as e:
             logger.error(f"Error getting SOL/EUR rate: {e}")
-            
-            # Fallback to default rate if API fails
-            if self.current_rate:
-                return self.current_rate
-            
-            # Default fallback (примерный курс)
-            return 150.0  # 1 SOL ≈ 150 EUR (примерно)
-    
-    async def sol_to_eur(self, sol_amount: float) -> float:
-        """Convert SOL to EUR."""
-        rate = await self.get_sol_eur_rate()
-        return sol_amount * rate
-    
-    async def eur_to_sol(self, eur_amount: float) -> float:
-        """Convert EUR to SOL."""
-        rate = await self.get_sol_eur_rate()
-        return eur_amount / rate
-    
-    def format_eur(self, amount: float) -> str:
-        """Format EUR amount for display."""
-        return f"€{amount:.2f}"
-    
-    def format_sol(self, amount: float) -> str:
-        """Format SOL amount for display."""
-        return f"{amount:.4f} SOL"
+        
+        # Fallback to the last known rate if all sources fail
+        if self.current_rate:
+            return self.current_rate
+        return self.DEFAULT_RATE
+    
+    async def get_rate_cents(self) -> int:
+        """Get current rate as EUR cents per 1 SOL."""
+        return eur_to_cents(await self.get_sol_eur_rate())
+    
+    async def get_rate_cents_at(self, session: AsyncSession, when: Optional[datetime]) -> int:
+        """
+        Get rate as EUR cents per 1 SOL at a past moment.
+        Uses the current rate if `when` is unknown or no stored rate was fresh then.
+        """
+        if when is not None:
+            row = await self.get_rate_at(session, when)
+            if row is not None and (when - as_utc(row.created_at)).total_seconds() <= self.MAX_STALENESS_SECONDS:
+                return row.rate_cents
+        return await self.get_rate_cents()
+    
+    async def lamports_to_cents(self, lamports: int) -> int:
+        """Convert lamports to EUR cents at current rate."""
+        return lamports_to_cents(lamports, await self.get_rate_cents())
+    
+    async def lamports_to_cents_at(self, session: AsyncSession, lamports: int, when: Optional[datetime]) -> int:
+        """Convert lamports to EUR cents at the rate in effect at `when`."""
+        return lamports_to_cents(lamports, await self.get_rate_cents_at(session, when))
+    
+    async def cents_to_lamports(self, cents: int) -> int:
+        """Convert EUR cents to lamports at current rate."""
+        return cents_to_lamports(cents, await self.get_rate_cents())
+    
+    def format_eur(self, cents: int) -> str:
+        """Format EUR cents for display."""
+        return format_cents(cents)
+    
+    def format_sol(self, lamports: int) -> str:
+        """Format lamports for display."""
+        return format_lamports(lamports)
+    
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"SOL/EUR rate refresh failed: {e}")
+            await asyncio.sleep(self.REFRESH_SECONDS)
+    
+    def start(self):
+        """Start background refresh."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+    
+    async def stop(self):
+        """Stop background refresh and close the HTTP session."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
 
 
 # Global price service instance
 price_service = PriceService()
-
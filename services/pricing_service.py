@@ -0,0 +1,65 @@
+"""Checkout pricing with the user's discounts."""
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import update
+from database.models import UserCoupon
+from services.seasonal_service import seasonal_service
+from services.promocode_service import promocode_service
+from services.roulette_service import RouletteService
+from utils.pricing import quote_prices
+
+logger = logging.getLogger(__name__)
+
+
+class PricingService:
+    """
+    Prices for checkout.
+    
+    Loads what the pure pipeline in utils.pricing needs (cached seasonal
+    parameters, the user's promocode and roulette coupon), and after
+    payment marks the promocode and coupon that applied as used.
+    """
+    
+    async def get_checkout_quote(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        prices_cents: list[int],
+        promocode_code: Optional[str] = None
+    ) -> dict:
+        """Quote items for a user (see utils.pricing.quote_prices)."""
+        seasonal = await seasonal_service.get_pricing(session)
+        promocode = None
+        if promocode_code:
+            is_valid, _, promocode = await promocode_service.validate_promocode(session, promocode_code, user_id)
+            if not is_valid:
+                promocode = None
+        coupon = await RouletteService.get_user_active_coupon(session, user_id)
+        return quote_prices(prices_cents, seasonal, promocode, coupon)
+    
+    async def redeem(self, session: AsyncSession, user_id: int, quote: dict) -> bool:
+        """
+        Mark the quote's promocode and coupon as used. Does not commit.
+        
+        Returns:
+            False if the coupon was used in the meantime (quote is stale)
+        """
+        if quote['coupon'] is not None:
+            result = await session.execute(
+                update(UserCoupon)
+                .where(UserCoupon.id == quote['coupon'].id, UserCoupon.is_used == False)
+                .values(is_used=True, used_at=datetime.now(timezone.utc))
+            )
+            if not result.rowcount:
+                return False
+            logger.info(f"Coupon {quote['coupon'].id} used by user {user_id}: {quote['coupon_cents']} cents")
+        if quote['promocode'] is not None:
+            await promocode_service.mark_used(session, quote['promocode'].id, user_id)
+            logger.info(f"Promocode {quote['promocode'].code} used by user {user_id}: {quote['promocode_cents']} cents")
+        return True
+
+
+# Global pricing service instance
+pricing_service = PricingService()
@@ -113,21 +113,22 @@ class PromocodeService:
         else:
             final_price = original_price
         
-        # Mark as used
-        usage = PromocodeUsage(promocode_id=promocode_id, user_id=user_id)
-        session.add(usage)
-        
-        # Increment usage count
-        stmt = update(Promocode).where(Promocode.id == promocode_id).values(
-            used_count=Promocode.used_count + 1
-        )
-        await session.execute(stmt)
-        
+        await PromocodeService.mark_used(session, promocode_id, user_id)
         await session.commit()
         logger.info(f"Promocode {promocode.code} applied by user {user_id}, discount: {original_price - final_price} SOL")
         
         return final_price
     
+    @staticmethod
+    async def mark_used(session: AsyncSession, promocode_id: int, user_id: int):
+        """Record a use of the promocode by the user. Does not commit."""
+        session.add(PromocodeUsage(promocode_id=promocode_id, user_id=user_id))
+        await session.execute(
+            update(Promocode)
+            .where(Promocode.id == promocode_id)
+            .values(used_count=Promocode.used_count + 1)
+        )
+    
     @staticmethod
     async def deactivate_promocode(session: AsyncSession, promocode_id: int) -> bool:
         """Deactivate promocode."""
@@ -1,32 +1,76 @@
 """Quest and challenge service."""
 import logging
+import time
 from datetime import datetime, timezone
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, case
+from database.database import db
 from database.models import Quest, UserQuest, User
+from services.ledger_service import LedgerService
+from utils.helpers import as_utc
+from utils.money import eur_to_cents
 
 logger = logging.getLogger(__name__)
 
 
 class QuestService:
-    """Service for managing quests and challenges."""
+    """
+    Service for managing quests and challenges.
     
-    @staticmethod
-    async def get_active_quests(session: AsyncSession) -> list[Quest]:
-        """Get all active quests."""
+    Active quests are kept in memory per condition_type. The registry is
+    reloaded after admin changes, at the next starts_at/ends_at boundary
+    and at least every REFRESH_SECONDS. Progress for all quests a sale
+    touches is one INSERT ... ON CONFLICT DO UPDATE; quests it completes
+    come back through RETURNING and are rewarded in the same transaction.
+    """
+    
+    REFRESH_SECONDS = 300
+    
+    def __init__(self):
+        self._active: dict[str, list[Quest]] = {}
+        self._valid_until: Optional[float] = None  # Monotonic time the registry must be reloaded
+    
+    def invalidate(self):
+        """Reload active quests on next use (after a quest was changed)."""
+        self._valid_until = None
+    
+    async def _get_registry(self, session: AsyncSession) -> dict[str, list[Quest]]:
+        """Active quests per condition_type."""
+        if self._valid_until is not None and time.monotonic() < self._valid_until:
+            return self._active
+        
         now = datetime.now(timezone.utc)
-        stmt = select(Quest).where(
-            Quest.is_active == True,
-            Quest.starts_at <= now,
-            Quest.ends_at > now
+        result = await session.execute(
+            select(Quest)
+            .where(Quest.is_active == True, Quest.ends_at > now)
+            .order_by(Quest.id)
         )
-        result = await session.execute(stmt)
-        return list(result.scalars().all())
+        quests = list(result.scalars().all())
+        
+        active: dict[str, list[Quest]] = {}
+        next_boundary = now.timestamp() + self.REFRESH_SECONDS
+        for quest in quests:
+            session.expunge(quest)  # Cached across sessions
+            starts_at, ends_at = as_utc(quest.starts_at), as_utc(quest.ends_at)
+            if starts_at <= now:
+                active.setdefault(quest.condition_type, []).append(quest)
+                next_boundary = min(next_boundary, ends_at.timestamp())
+            else:
+                next_boundary = min(next_boundary, starts_at.timestamp())
+        
+        self._active = active
+        self._valid_until = time.monotonic() + max(next_boundary - now.timestamp(), 0)
+        return active
     
-    @staticmethod
-    async def get_user_quests(session: AsyncSession, user_id: int) -> list[dict]:
+    async def get_active_quests(self, session: AsyncSession) -> list[Quest]:
+        """Get all active quests."""
+        registry = await self._get_registry(session)
+        return sorted((quest for quests in registry.values() for quest in quests), key=lambda quest: quest.id)
+    
+    async def get_user_quests(self, session: AsyncSession, user_id: int) -> list[dict]:
         """Get user's quest progress."""
-        active_quests = await QuestService.get_active_quests(session)
+        active_quests = await self.get_active_quests(session)
         
         # Get user quest progress
         stmt = select(UserQuest).where(UserQuest.user_id == user_id)
@@ -44,72 +88,99 @@ class QuestService:
         
         return result_list
     
-    @staticmethod
+    async def update_quests_progress(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        deltas: dict[str, float]  # condition_type (purchases, spending, items) -> increment
+    ) -> list[Quest]:
+        """
+        Add progress to the user's active quests of the given condition types,
+        rewarding quests that got completed. Commits.
+        
+        Returns:
+            Quests completed by this update
+        """
+        registry = await self._get_registry(session)
+        quests = {
+            quest.id: (quest, int(value))
+            for condition_type, value in deltas.items() if int(value) > 0
+            for quest in registry.get(condition_type, [])
+        }
+        if not quests:
+            return []
+        
+        now = datetime.now(timezone.utc)
+        stmt = db.insert(UserQuest).values([
+            {
+                'user_id': user_id,
+                'quest_id': quest.id,
+                'progress': value,
+                'completed': value >= quest.condition_value,
+                'completed_at': now if value >= quest.condition_value else None
+            }
+            for quest, value in quests.values()
+        ])
+        goal = case(
+            {quest.id: quest.condition_value for quest, _ in quests.values()},
+            value=UserQuest.quest_id
+        )
+        progress = UserQuest.progress + stmt.excluded.progress
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'quest_id'],
+            set_={
+                'progress': progress,
+                'completed': progress >= goal,
+                'completed_at': case((progress >= goal, now), else_=None)
+            },
+            where=UserQuest.completed == False
+        ).returning(UserQuest.quest_id, UserQuest.completed)
+        result = await session.execute(stmt)
+        
+        completed = [quests[quest_id][0] for quest_id, done in result.all() if done]
+        if completed:
+            await self._give_rewards(session, user_id, completed)
+        await session.commit()
+        return completed
+    
     async def update_quest_progress(
+        self,
         session: AsyncSession,
         user_id: int,
         condition_type: str,  # purchases, spending, items
         value: float
-    ):
+    ) -> list[Quest]:
         """Update user's quest progress."""
-        active_quests = await QuestService.get_active_quests(session)
-        
-        for quest in active_quests:
-            if quest.condition_type != condition_type:
-                continue
-            
-            # Get or create user quest
-            stmt = select(UserQuest).where(
-                UserQuest.user_id == user_id,
-                UserQuest.quest_id == quest.id
-            )
-            result = await session.execute(stmt)
-            user_quest = result.scalars().first()
-            
-            if not user_quest:
-                user_quest = UserQuest(
-                    user_id=user_id,
-                    quest_id=quest.id,
-                    progress=0
-                )
-                session.add(user_quest)
-            
-            if user_quest.completed:
-                continue  # Already completed
-            
-            # Update progress
-            user_quest.progress += int(value)
-            
-            # Check completion
-            if user_quest.progress >= quest.condition_value:
-                user_quest.completed = True
-                user_quest.completed_at = datetime.now(timezone.utc)
-                
-                # Give reward
-                await QuestService._give_reward(session, user_id, quest)
-                logger.info(f"User {user_id} completed quest {quest.id}")
-        
-        await session.commit()
+        return await self.update_quests_progress(session, user_id, {condition_type: value})
     
     @staticmethod
-    async def _give_reward(session: AsyncSession, user_id: int, quest: Quest):
-        """Give quest reward to user."""
-        stmt = select(User).where(User.id == user_id)
-        result = await session.execute(stmt)
-        user = result.scalars().first()
-        
-        if not user:
-            return
-        
-        if quest.reward_type == 'sol':
-            user.balance_eur += quest.reward_value
-        elif quest.reward_type == 'points':
-            user.achievement_points += int(quest.reward_value)
-        elif quest.reward_type == 'promocode':
-            # Create personal promocode for user
-            pass  # Can implement later
+    async def _give_rewards(session: AsyncSession, user_id: int, quests: list[Quest]):
+        """Give rewards of completed quests to user. Does not commit."""
+        points = 0
+        for quest in quests:
+            logger.info(f"User {user_id} completed quest {quest.id}")
+            if quest.reward_type == 'sol':
+                await LedgerService.post(
+                    session,
+                    user_id,
+                    eur_to_cents(quest.reward_value),
+                    LedgerService.SYSTEM_REWARDS,
+                    'quest_reward',
+                    description=f"Quest reward #{quest.id}"
+                )
+            elif quest.reward_type == 'points':
+                points += int(quest.reward_value)
+            elif quest.reward_type == 'promocode':
+                # Create personal promocode for user
+                pass  # Can implement later
+            logger.info(f"Quest reward given to user {user_id}: {quest.reward_type} = {quest.reward_value}")
         
-        logger.info(f"Quest reward given to user {user_id}: {quest.reward_type} = {quest.reward_value}")
+        if points:
+            await session.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(achievement_points=User.achievement_points + points)
+            )
     
     # === ADMIN METHODS ===
     
@@ -160,6 +231,7 @@ class QuestService:
         session.add(quest)
         await session.commit()
         await session.refresh(quest)
+        quest_service.invalidate()
         logger.info(f"Quest created: {quest.name_ru} (ID: {quest.id})")
         return quest
     
@@ -173,6 +245,7 @@ class QuestService:
         stmt = update(Quest).where(Quest.id == quest_id).values(**kwargs)
         await session.execute(stmt)
         await session.commit()
+        quest_service.invalidate()
         logger.info(f"Quest {quest_id} updated: {kwargs}")
         return True
     
@@ -183,6 +256,7 @@ class QuestService:
         if quest:
             await session.delete(quest)
             await session.commit()
+            quest_service.invalidate()
             logger.info(f"Quest {quest_id} deleted")
             return True
         return False
@@ -194,6 +268,7 @@ class QuestService:
         if quest:
             quest.is_active = not quest.is_active
             await session.commit()
+            quest_service.invalidate()
             logger.info(f"Quest {quest_id} status toggled to {quest.is_active}")
             return True
         return False
@@ -1,39 +1,75 @@
 """Quiz and riddle service."""
 import logging
 import random
+import time
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, case, exists
+from database.database import db
 from database.models import Quiz, UserQuiz, User
+from services.ledger_service import LedgerService
+from utils.money import eur_to_cents
 
 logger = logging.getLogger(__name__)
 
 
 class QuizService:
-    """Service for managing quizzes and riddles."""
+    """
+    Service for managing quizzes and riddles.
     
-    @staticmethod
-    async def get_random_quiz(session: AsyncSession, user_id: int) -> Quiz | None:
+    Active quiz ids are cached for REFRESH_SECONDS (and reloaded after a
+    quiz is created). A random unanswered quiz is picked in the database:
+    the user's answers to active quizzes are counted, then a random
+    offset into the active quizzes without an answer (NOT EXISTS) loads
+    exactly one row, however many attempts the user has.
+    """
+    
+    REFRESH_SECONDS = 300
+    
+    def __init__(self):
+        self._active_ids: list[int] = []
+        self._valid_until: Optional[float] = None  # Monotonic time the ids must be reloaded
+    
+    def invalidate(self):
+        """Reload active quiz ids on next use."""
+        self._valid_until = None
+    
+    async def _get_active_ids(self, session: AsyncSession) -> list[int]:
+        if self._valid_until is None or time.monotonic() >= self._valid_until:
+            result = await session.execute(
+                select(Quiz.id).where(Quiz.is_active == True).order_by(Quiz.id)
+            )
+            self._active_ids = list(result.scalars().all())
+            self._valid_until = time.monotonic() + self.REFRESH_SECONDS
+        return self._active_ids
+    
+    async def get_random_quiz(self, session: AsyncSession, user_id: int) -> Quiz | None:
         """Get a random quiz that user hasn't answered yet."""
-        # Get all active quizzes
-        stmt = select(Quiz).where(Quiz.is_active == True)
-        result = await session.execute(stmt)
-        all_quizzes = list(result.scalars().all())
-        
-        if not all_quizzes:
+        active_ids = await self._get_active_ids(session)
+        if not active_ids:
             return None
         
-        # Get quizzes user already answered
-        stmt = select(UserQuiz.quiz_id).where(UserQuiz.user_id == user_id)
-        result = await session.execute(stmt)
-        answered_ids = set(result.scalars().all())
-        
-        # Filter unanswered
-        unanswered = [q for q in all_quizzes if q.id not in answered_ids]
-        
-        if not unanswered:
+        result = await session.execute(
+            select(func.count(func.distinct(UserQuiz.quiz_id))).where(
+                UserQuiz.user_id == user_id,
+                UserQuiz.quiz_id.in_(active_ids)
+            )
+        )
+        remaining = len(active_ids) - result.scalar()
+        if remaining <= 0:
             return None  # User answered all quizzes
         
-        return random.choice(unanswered)
+        unanswered = (
+            select(Quiz)
+            .where(
+                Quiz.id.in_(active_ids),
+                ~exists().where(UserQuiz.user_id == user_id, UserQuiz.quiz_id == Quiz.id)
+            )
+            .order_by(Quiz.id)
+            .limit(1)
+        )
+        result = await session.execute(unanswered.offset(random.randrange(remaining)))
+        return result.scalars().first()
     
     @staticmethod
     async def submit_answer(
@@ -54,27 +90,18 @@ class QuizService:
         if not quiz:
             return False, "❌ Квиз не найден", 0.0
         
-        # Check if already answered
-        stmt = select(UserQuiz).where(
-            UserQuiz.user_id == user_id,
-            UserQuiz.quiz_id == quiz_id
-        )
-        result = await session.execute(stmt)
-        existing = result.scalars().first()
-        
-        if existing:
-            return False, "❌ Вы уже отвечали на этот вопрос", 0.0
-        
         # Check answer
         is_correct = answer_index == quiz.correct_answer_index
         
-        # Record attempt
-        user_quiz = UserQuiz(
-            user_id=user_id,
-            quiz_id=quiz_id,
-            is_correct=is_correct
+        # Record attempt; a repeated (e.g. double-tapped) answer inserts nothing
+        result = await session.execute(
+            db.insert(UserQuiz)
+            .values(user_id=user_id, quiz_id=quiz_id, is_correct=is_correct)
+            .on_conflict_do_nothing(index_elements=['user_id', 'quiz_id'])
         )
-        session.add(user_quiz)
+        if result.rowcount == 0:
+            await session.rollback()
+            return False, "❌ Вы уже отвечали на этот вопрос", 0.0
         
         reward = 0.0
         if is_correct:
@@ -85,7 +112,14 @@ class QuizService:
             
             if user:
                 if quiz.reward_type == 'sol':
-                    user.balance_eur += quiz.reward_value
+                    await LedgerService.post(
+                        session,
+                        user_id,
+                        eur_to_cents(quiz.reward_value),
+                        LedgerService.SYSTEM_REWARDS,
+                        'quiz_reward',
+                        description=f"Quiz reward #{quiz_id}"
+                    )
                     reward = quiz.reward_value
                 elif quiz.reward_type == 'points':
                     user.achievement_points += int(quiz.reward_value)
@@ -124,18 +158,20 @@ class QuizService:
         session.add(quiz)
         await session.commit()
         await session.refresh(quiz)
+        quiz_service.invalidate()
         logger.info(f"Quiz created: {question_ru[:50]}")
         return quiz
     
     @staticmethod
     async def get_user_quiz_stats(session: AsyncSession, user_id: int) -> dict:
         """Get user's quiz statistics."""
-        stmt = select(UserQuiz).where(UserQuiz.user_id == user_id)
-        result = await session.execute(stmt)
-        all_attempts = list(result.scalars().all())
-        
-        total = len(all_attempts)
-        correct = sum(1 for a in all_attempts if a.is_correct)
+        result = await session.execute(
+            select(
+                func.count(UserQuiz.id),
+                func.coalesce(func.sum(case((UserQuiz.is_correct == True, 1), else_=0)), 0)
+            ).where(UserQuiz.user_id == user_id)
+        )
+        total, correct = result.one()
         
         return {
             'total_answered': total,
@@ -0,0 +1,94 @@
+"""SOL/EUR price sources aggregated by the price service."""
+import aiohttp
+
+
+class RateProvider:
+    """
+    Source of the SOL/EUR rate.
+    
+    Subclasses set `name` and implement fetch(); register them in
+    PROVIDERS to make them selectable with RATE_SOURCES.
+    """
+    
+    name = ''
+    
+    async def fetch(self, session: aiohttp.ClientSession) -> float:
+        """Get 1 SOL in EUR. Raises on any failure."""
+        raise NotImplementedError
+
+
+class CoinGeckoProvider(RateProvider):
+    name = 'coingecko'
+    URL = 'https://api.coingecko.com/api/v3/simple/price'
+    
+    async def fetch(self, session: aiohttp.ClientSession) -> float:
+        async with session.get(self.URL, params={'ids': 'solana', 'vs_currencies': 'eur'}) as response:
+            response.raise_for_status()
+            data = await response.json()
+        return float(data['solana']['eur'])
+
+
+class KrakenProvider(RateProvider):
+    name = 'kraken'
+    URL = 'https://api.kraken.com/0/public/Ticker'
+    
+    async def fetch(self, session: aiohttp.ClientSession) -> float:
+        async with session.get(self.URL, params={'pair': 'SOLEUR'}) as response:
+            response.raise_for_status()
+            data = await response.json()
+        if data.get('error'):
+            raise ValueError(f"Kraken error: {data['error']}")
+        ticker = next(iter(data['result'].values()))
+        return float(ticker['c'][0])  # Last trade price
+
+
+class BinanceProvider(RateProvider):
+    name = 'binance'
+    URL = 'https://api.binance.com/api/v3/ticker/price'
+    
+    async def fetch(self, session: aiohttp.ClientSession) -> float:
+        async with session.get(self.URL, params={'symbol': 'SOLEUR'}) as response:
+            response.raise_for_status()
+            data = await response.json()
+        return float(data['price'])
+
+
+class FixtureProvider(RateProvider):
+    """Fixed rate, for tests and local runs without network access."""
+    
+    name = 'fixture'
+    
+    def __init__(self, rate: float):
+        self.rate = rate
+    
+    async def fetch(self, session: aiohttp.ClientSession) -> float:
+        return self.rate
+
+
+PROVIDERS = {
+    provider.name: provider
+    for provider in (CoinGeckoProvider, KrakenProvider, BinanceProvider)
+}
+
+
+def build_providers(spec: str) -> list[RateProvider]:
+    """
+    Create providers from a comma-separated list of names,
+    e.g. "coingecko,kraken,binance" or "fixture:150.5".
+    
+    Raises:
+        ValueError: Unknown provider name
+    """
+    providers = []
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, argument = entry.partition(':')
+        if name == FixtureProvider.name:
+            providers.append(FixtureProvider(float(argument)))
+        elif name in PROVIDERS:
+            providers.append(PROVIDERS[name]())
+        else:
+            raise ValueError(f"Unknown rate source: {name}")
+    return providers
@@ -11,7 +11,7 @@ class RatingService:
     @staticmethod
     def calculate_rating(
         total_purchases: int,
-        total_spent_sol: float,
+        total_spent_cents: int,
         refunds_count: int
     ) -> float:
         """
@@ -19,7 +19,7 @@ class RatingService:
         
         Formula:
         - Base: purchases * 10
-        - Bonus: total_spent * 20
+        - Bonus: total_spent (EUR) * 20
         - Penalty: refunds * -50
         - Range: -100 to +100
         
@@ -30,7 +30,7 @@ class RatingService:
         purchase_score = min(total_purchases * 10, 50)
         
         # Bonus for spending
-        spending_score = min(total_spent_sol * 20, 50)
+        spending_score = min(total_spent_cents * 20 / 100, 50)
         
         # Penalty for refunds
         refund_penalty = refunds_count * 50
@@ -101,7 +101,7 @@ class RatingService:
     async def update_rating_after_purchase(
         session: AsyncSession,
         user_id: int,
-        amount_sol: float
+        amount_cents: int
     ) -> float:
         """
         Update user rating after successful purchase.
@@ -116,12 +116,12 @@ class RatingService:
         
         # Update stats
         user.total_purchases += 1
-        user.total_spent_sol += amount_sol
+        user.total_spent_cents += amount_cents
         
         # Recalculate rating
         user.rating = RatingService.calculate_rating(
             user.total_purchases,
-            user.total_spent_sol,
+            user.total_spent_cents,
             user.refunds_count
         )
         
@@ -151,7 +151,7 @@ class RatingService:
         # Recalculate rating
         user.rating = RatingService.calculate_rating(
             user.total_purchases,
-            user.total_spent_sol,
+            user.total_spent_cents,
             user.refunds_count
         )
         
@@ -176,7 +176,7 @@ class RatingService:
             'bar': RatingService.get_rating_bar(user.rating),
             'emoji': RatingService.get_rating_emoji(user.rating),
             'total_purchases': user.total_purchases,
-            'total_spent_sol': user.total_spent_sol,
+            'total_spent_cents': user.total_spent_cents,
             'refunds_count': user.refunds_count
         }
 
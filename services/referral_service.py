@@ -5,6 +5,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 from database.models import User, Transaction
 from services.transaction_service import TransactionService
+from services.ledger_service import LedgerService
+from services.achievement_service import achievement_service
+from utils.money import percent_of, format_eur
 
 logger = logging.getLogger(__name__)
 
@@ -60,9 +63,13 @@ class ReferralService:
         # Update referrer stats
         stmt = update(User).where(User.id == referrer_id).values(
             total_referrals=User.total_referrals + 1
-        )
-        await session.execute(stmt)
+        ).returning(User.total_referrals)
+        result = await session.execute(stmt)
+        total_referrals = result.scalar_one()
         
+        await achievement_service.unlock_crossed(
+            session, referrer_id, {'referrals': (total_referrals - 1, total_referrals)}
+        )
         await session.commit()
         logger.info(f"User {new_user_id} registered as referral of {referrer_id}")
         return True
@@ -71,11 +78,11 @@ class ReferralService:
     async def process_referral_bonus(
         session: AsyncSession,
         user_id: int,
-        purchase_amount_sol: float
-    ) -> float:
+        purchase_cents: int
+    ) -> int:
         """
         Process referral bonus after user's first purchase.
-        Returns bonus amount given to referrer.
+        Returns bonus amount (cents) given to referrer.
         """
         # Check if user was referred
         stmt = select(User.referred_by, User.total_purchases).where(User.id == user_id)
@@ -83,15 +90,22 @@ class ReferralService:
         row = result.one_or_none()
         
         if not row or not row[0] or row[1] > 1:  # Not referred or not first purchase
-            return 0.0
+            return 0
         
         referrer_id = row[0]
-        bonus_amount = purchase_amount_sol * (ReferralService.REFERRAL_BONUS_PERCENT / 100)
+        bonus_cents = percent_of(purchase_cents, ReferralService.REFERRAL_BONUS_PERCENT)
         
         # Give bonus to referrer
+        await LedgerService.post(
+            session,
+            referrer_id,
+            bonus_cents,
+            LedgerService.SYSTEM_REFERRALS,
+            'referral_bonus',
+            description=f"Referral bonus for user #{user_id}"
+        )
         stmt = update(User).where(User.id == referrer_id).values(
-            balance_eur=User.balance_eur + bonus_amount,
-            referral_earnings_sol=User.referral_earnings_sol + bonus_amount
+            referral_earnings_cents=User.referral_earnings_cents + bonus_cents
         )
         await session.execute(stmt)
         
@@ -100,21 +114,21 @@ class ReferralService:
             session=session,
             user_id=referrer_id,
             tx_type='referral_bonus',
-            amount_sol=bonus_amount,
+            amount_cents=bonus_cents,
             description=f"Реферальный бонус за покупку друга (User #{user_id})",
             status='completed'
         )
         
         await session.commit()
-        logger.info(f"Referral bonus {bonus_amount} SOL given to user {referrer_id}")
-        return bonus_amount
+        logger.info(f"Referral bonus {format_eur(bonus_cents)} given to user {referrer_id}")
+        return bonus_cents
     
     @staticmethod
     async def get_referral_stats(session: AsyncSession, user_id: int) -> dict:
         """Get user's referral statistics."""
         stmt = select(
             User.total_referrals,
-            User.referral_earnings_sol
+            User.referral_earnings_cents
         ).where(User.id == user_id)
         result = await session.execute(stmt)
         row = result.one_or_none()
@@ -122,12 +136,12 @@ class ReferralService:
         if not row:
             return {
                 'total_referrals': 0,
-                'total_earnings_sol': 0.0
+                'total_earnings_cents': 0
             }
         
         return {
             'total_referrals': row[0],
-            'total_earnings_sol': row[1]
+            'total_earnings_cents': row[1]
         }
 
 
@@ -1,30 +1,108 @@
 """Roulette service for daily wheel spin."""
 import logging
 import random
+import time
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, func
+from sqlalchemy import select, update
+from database.database import db
 from database.models import RoulettePrize, UserRouletteSpin, User, UserCoupon
+from services.ledger_service import LedgerService
+from utils.money import eur_to_cents
 
 logger = logging.getLogger(__name__)
 
 
+class AliasSampler:
+    """
+    Weighted random choice in O(1) per draw (Walker's alias method).
+    
+    Every slot i is picked uniformly and then resolves to items[i] with
+    probability prob[i], otherwise to items[alias[i]].
+    """
+    
+    def __init__(self, items: list, weights: list[float]):
+        count = len(items)
+        total = sum(weights)
+        scaled = [weight * count / total for weight in weights]
+        self.items = items
+        self.prob = [1.0] * count
+        self.alias = list(range(count))
+        
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left is 1.0 up to rounding and keeps prob 1.0
+    
+    def sample(self):
+        i = random.randrange(len(self.items))
+        return self.items[i] if random.random() < self.prob[i] else self.items[self.alias[i]]
+
+
 class RouletteService:
-    """Service for managing roulette wheel."""
+    """
+    Service for managing roulette wheel.
+    
+    Active prizes are kept in memory as two alias samplers, with and
+    without discount_coupon, rebuilt after admin changes and at least
+    every REFRESH_SECONDS. A spin draws from the full wheel; only when it
+    lands on a coupon is the user's coupon checked, and a user who
+    already holds one gets a redraw from the wheel without coupons (the
+    same odds as excluding coupons up front). The spin itself is one
+    insert guarded by the unique (user_id, spin_date) index.
+    """
+    
+    REFRESH_SECONDS = 300
+    
+    def __init__(self):
+        self._samplers: dict[str, Optional[AliasSampler]] = {}
+        self._valid_until: Optional[float] = None  # Monotonic time the samplers must be rebuilt
+    
+    def invalidate(self):
+        """Rebuild the samplers on next spin (after a prize was changed)."""
+        self._valid_until = None
+    
+    async def _get_samplers(self, session: AsyncSession) -> dict[str, Optional[AliasSampler]]:
+        """Samplers 'all' and 'no_coupon' (None when no prize can be won)."""
+        if self._valid_until is not None and time.monotonic() < self._valid_until:
+            return self._samplers
+        
+        result = await session.execute(
+            select(RoulettePrize)
+            .where(RoulettePrize.is_active == True, RoulettePrize.probability > 0)
+            .order_by(RoulettePrize.id)
+        )
+        prizes = list(result.scalars().all())
+        for prize in prizes:
+            session.expunge(prize)  # Cached across sessions
+        
+        variants = {
+            'all': prizes,
+            'no_coupon': [prize for prize in prizes if prize.prize_type != 'discount_coupon'],
+        }
+        self._samplers = {
+            name: AliasSampler(items, [prize.probability for prize in items]) if items else None
+            for name, items in variants.items()
+        }
+        self._valid_until = time.monotonic() + self.REFRESH_SECONDS
+        return self._samplers
     
     @staticmethod
     async def can_spin_today(session: AsyncSession, user_id: int) -> bool:
         """Check if user can spin today."""
-        today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        stmt = select(UserRouletteSpin).where(
-            UserRouletteSpin.user_id == user_id,
-            UserRouletteSpin.created_at >= today_start
+        result = await session.execute(
+            select(UserRouletteSpin.id).where(
+                UserRouletteSpin.user_id == user_id,
+                UserRouletteSpin.spin_date == datetime.now(timezone.utc).date()
+            )
         )
-        result = await session.execute(stmt)
-        spin = result.scalars().first()
-        
-        return spin is None
+        return result.first() is None
     
     @staticmethod
     async def get_active_prizes(session: AsyncSession, user_id: int = None) -> list[RoulettePrize]:
@@ -41,49 +119,36 @@ class RouletteService:
         
         return prizes
     
-    @staticmethod
-    async def spin_wheel(session: AsyncSession, user_id: int) -> dict:
+    async def spin_wheel(self, session: AsyncSession, user_id: int) -> dict:
         """Spin the wheel and get a prize."""
-        # Check if user can spin
-        if not await RouletteService.can_spin_today(session, user_id):
-            return {'success': False, 'error': 'already_spun_today'}
-        
-        # Get active prizes (excluding discount_coupon if user has active one)
-        prizes = await RouletteService.get_active_prizes(session, user_id)
-        
-        if not prizes:
-            return {'success': False, 'error': 'no_prizes'}
-        
-        # Normalize probabilities if needed (ensure they sum to 1.0)
-        total_prob = sum(p.probability for p in prizes)
-        if total_prob == 0:
+        samplers = await self._get_samplers(session)
+        if samplers['all'] is None:
             return {'success': False, 'error': 'no_prizes'}
         
-        # Select prize based on probability
-        rand = random.uniform(0, total_prob)
-        
-        current_prob = 0
-        selected_prize = None
-        
-        for prize in prizes:
-            current_prob += prize.probability
-            if rand <= current_prob:
-                selected_prize = prize
-                break
-        
-        if not selected_prize:
-            selected_prize = prizes[-1]  # Fallback to last prize
+        selected_prize = samplers['all'].sample()
+        # One coupon at a time: redraw among the other prizes
+        if selected_prize.prize_type == 'discount_coupon' and await self.has_active_coupon(session, user_id):
+            if samplers['no_coupon'] is None:
+                return {'success': False, 'error': 'no_prizes'}
+            selected_prize = samplers['no_coupon'].sample()
         
-        # Record spin
-        spin = UserRouletteSpin(
-            user_id=user_id,
-            prize_id=selected_prize.id,
-            prize_won=selected_prize.name
+        # Record spin; the unique (user_id, spin_date) index allows one per day
+        result = await session.execute(
+            db.insert(UserRouletteSpin)
+            .values(
+                user_id=user_id,
+                prize_id=selected_prize.id,
+                prize_won=selected_prize.name,
+                spin_date=datetime.now(timezone.utc).date()
+            )
+            .on_conflict_do_nothing(index_elements=['user_id', 'spin_date'])
+            .returning(UserRouletteSpin.id)
         )
-        session.add(spin)
+        if result.scalar() is None:
+            return {'success': False, 'error': 'already_spun_today'}
         
         # Give prize to user
-        await RouletteService._give_prize(session, user_id, selected_prize)
+        await self._give_prize(session, user_id, selected_prize)
         
         await session.commit()
         
@@ -100,23 +165,27 @@ class RouletteService:
     @staticmethod
     async def _give_prize(session: AsyncSession, user_id: int, prize: RoulettePrize):
         """Give prize to user."""
-        stmt = select(User).where(User.id == user_id)
-        result = await session.execute(stmt)
-        user = result.scalars().first()
-        
-        if not user:
-            return
-        
         if prize.prize_type == 'eur':
-            user.balance_eur += prize.prize_value
+            await LedgerService.post(
+                session,
+                user_id,
+                eur_to_cents(prize.prize_value),
+                LedgerService.SYSTEM_REWARDS,
+                'roulette_prize',
+                description=f"Roulette prize: {prize.name}"
+            )
         elif prize.prize_type == 'points':
-            user.achievement_points += int(prize.prize_value)
+            await session.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(achievement_points=User.achievement_points + int(prize.prize_value))
+            )
         elif prize.prize_type == 'discount_coupon':
             # Create coupon with 10 days expiration
             expires_at = datetime.now(timezone.utc) + timedelta(days=10)
             coupon = UserCoupon(
                 user_id=user_id,
-                max_discount=prize.prize_value,  # 30.00 EUR
+                max_discount_cents=eur_to_cents(prize.prize_value),  # 30.00 EUR -> 3000
                 expires_at=expires_at
             )
             session.add(coupon)
@@ -170,6 +239,7 @@ class RouletteService:
         session.add(prize)
         await session.commit()
         await session.refresh(prize)
+        roulette_service.invalidate()
         logger.info(f"Roulette prize created: {name} (ID: {prize.id})")
         return prize
     
@@ -183,6 +253,7 @@ class RouletteService:
         stmt = update(RoulettePrize).where(RoulettePrize.id == prize_id).values(**kwargs)
         await session.execute(stmt)
         await session.commit()
+        roulette_service.invalidate()
         logger.info(f"Roulette prize {prize_id} updated: {kwargs}")
         return True
     
@@ -193,6 +264,7 @@ class RouletteService:
         if prize:
             await session.delete(prize)
             await session.commit()
+            roulette_service.invalidate()
             logger.info(f"Roulette prize {prize_id} deleted")
             return True
         return False
@@ -204,6 +276,7 @@ class RouletteService:
         if prize:
             prize.is_active = not prize.is_active
             await session.commit()
+            roulette_service.invalidate()
             logger.info(f"Roulette prize {prize_id} status toggled to {prize.is_active}")
             return True
         return False
@@ -0,0 +1,222 @@
+"""Solana RPC endpoint pool with rate limiting, retries and failover."""
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+import httpx
+from solana.exceptions import SolanaRpcException
+from solana.rpc.async_api import AsyncClient
+
+logger = logging.getLogger(__name__)
+
+
+class RpcError(Exception):
+    """RPC request failed."""
+
+
+class RpcRequestError(RpcError):
+    """The node returned an error for the request."""
+
+
+class RpcUnavailableError(RpcError):
+    """All retries against all endpoints failed."""
+
+
+class TokenBucket:
+    """Token bucket limiting requests per second."""
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self) -> float:
+        """Seconds until a token is available."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+    
+    async def acquire(self):
+        """Take one token, waiting if needed."""
+        while True:
+            delay = self.wait_time()
+            if delay == 0.0:
+                self.tokens -= 1
+                return
+            await asyncio.sleep(delay)
+    
+    def drain(self):
+        """Drop all tokens (server told us to slow down)."""
+        self._refill()
+        self.tokens = 0
+
+
+class RpcEndpoint:
+    """One RPC endpoint with its client, limiter and health stats."""
+    
+    EWMA_ALPHA = 0.2
+    
+    def __init__(self, url: str, rate: float):
+        self.url = url
+        self.client = AsyncClient(url)
+        self.bucket = TokenBucket(rate)
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.latency_total = 0.0
+        self.latency_ewma = 0.1  # Seconds
+        self.success_ewma = 1.0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+    
+    @property
+    def name(self) -> str:
+        """URL without path/query (may contain API tokens)."""
+        parts = urlsplit(self.url)
+        return f"{parts.scheme}://{parts.hostname}"
+    
+    @property
+    def score(self) -> float:
+        """Higher is better: success rate per second of latency."""
+        return self.success_ewma / max(self.latency_ewma, 0.001)
+    
+    def available_in(self) -> float:
+        """Seconds until endpoint is out of cooldown and has a token."""
+        return max(self.cooldown_until - time.monotonic(), self.bucket.wait_time())
+    
+    def record_success(self, latency: float):
+        self.latency_total += latency
+        self.latency_ewma += self.EWMA_ALPHA * (latency - self.latency_ewma)
+        self.success_ewma += self.EWMA_ALPHA * (1 - self.success_ewma)
+        self.consecutive_failures = 0
+    
+    def record_failure(self, cooldown: float, rate_limited: bool = False):
+        self.errors += 1
+        if rate_limited:
+            self.rate_limited += 1
+            self.bucket.drain()
+        self.success_ewma += self.EWMA_ALPHA * (0 - self.success_ewma)
+        self.consecutive_failures += 1
+        self.cooldown_until = time.monotonic() + cooldown
+    
+    def stats(self) -> dict:
+        return {
+            'endpoint': self.name,
+            'requests': self.requests,
+            'errors': self.errors,
+            'rate_limited': self.rate_limited,
+            'avg_latency_ms': round(self.latency_total / max(self.requests - self.errors, 1) * 1000, 1),
+            'ewma_latency_ms': round(self.latency_ewma * 1000, 1),
+            'score': round(self.score, 2),
+            'healthy': self.cooldown_until <= time.monotonic(),
+        }
+
+
+class RpcPool:
+    """
+    Pool of RPC endpoints used like a single AsyncClient.
+    
+    Every call goes to the best available endpoint (health score =
+    recent success rate / latency) after taking a token from that
+    endpoint's bucket. Transport errors, timeouts and HTTP 429/5xx put the
+    endpoint in a cooldown and the call is retried on the next best
+    endpoint with exponential backoff and jitter. When all attempts fail,
+    RpcUnavailableError is raised instead of a default value. Error
+    responses from the node are final: they raise RpcRequestError at once
+    and do not count against the endpoint's health.
+    """
+    
+    MAX_ATTEMPTS = 4
+    BACKOFF_BASE = 0.25
+    BACKOFF_MAX = 5.0
+    COOLDOWN_BASE = 1.0
+    COOLDOWN_MAX = 60.0
+    
+    def __init__(self, urls: list[str], rate_per_endpoint: float = 10.0):
+        if not urls:
+            raise ValueError("At least one RPC endpoint is required")
+        self.endpoints = [RpcEndpoint(url, rate_per_endpoint) for url in urls]
+    
+    def _pick(self) -> RpcEndpoint:
+        ready = [e for e in self.endpoints if e.available_in() == 0.0]
+        if ready:
+            return max(ready, key=lambda e: e.score)
+        return min(self.endpoints, key=lambda e: e.available_in())
+    
+    @staticmethod
+    def _is_rate_limit(error: Exception) -> bool:
+        cause = error.__cause__ if isinstance(error, SolanaRpcException) else error
+        return isinstance(cause, httpx.HTTPStatusError) and cause.response.status_code == 429
+    
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        cause = error.__cause__ if isinstance(error, SolanaRpcException) else error
+        if isinstance(cause, httpx.HTTPStatusError):
+            status = cause.response.status_code
+            return status == 429 or status >= 500
+        return isinstance(cause, (httpx.TransportError, asyncio.TimeoutError))
+    
+    async def call(self, method: str, *args, **kwargs):
+        """Call AsyncClient `method` on the best endpoint, retrying on failures."""
+        last_error = None
+        for attempt in range(self.MAX_ATTEMPTS):
+            endpoint = self._pick()
+            cooldown = endpoint.cooldown_until - time.monotonic()
+            if cooldown > 0:
+                await asyncio.sleep(cooldown)
+            await endpoint.bucket.acquire()
+            
+            endpoint.requests += 1
+            started = time.monotonic()
+            try:
+                response = await getattr(endpoint.client, method)(*args, **kwargs)
+            except Exception as e:
+                if not self._is_retryable(e):
+                    # The node answered (e.g. failed preflight): the request is wrong, not the endpoint
+                    endpoint.record_success(time.monotonic() - started)
+                    raise RpcRequestError(f"{method} failed on {endpoint.name}: {e}") from e
+                last_error = e
+                rate_limited = self._is_rate_limit(e)
+                endpoint.record_failure(
+                    min(self.COOLDOWN_BASE * 2 ** endpoint.consecutive_failures, self.COOLDOWN_MAX),
+                    rate_limited=rate_limited
+                )
+                logger.warning(
+                    f"RPC {method} failed on {endpoint.name} "
+                    f"({'rate limited' if rate_limited else type(e).__name__}), "
+                    f"attempt {attempt + 1}/{self.MAX_ATTEMPTS}"
+                )
+                backoff = min(self.BACKOFF_BASE * 2 ** attempt, self.BACKOFF_MAX)
+                await asyncio.sleep(random.uniform(0, backoff))
+                continue
+            
+            endpoint.record_success(time.monotonic() - started)
+            if not hasattr(response, 'value'):
+                raise RpcRequestError(f"{method} returned error: {response}")
+            return response
+        
+        raise RpcUnavailableError(f"{method} failed on all RPC endpoints: {last_error}") from last_error
+    
+    def __getattr__(self, method: str):
+        """Client-like interface: pool.get_balance(...) == pool.call('get_balance', ...)."""
+        if method.startswith('_'):
+            raise AttributeError(method)
+        
+        async def call(*args, **kwargs):
+            return await self.call(method, *args, **kwargs)
+        return call
+    
+    def stats(self) -> list[dict]:
+        """Per-endpoint request, error and latency counters."""
+        return [endpoint.stats() for endpoint in self.endpoints]
+    
+    async def close(self):
+        """Close all clients."""
+        await asyncio.gather(*(endpoint.client.close() for endpoint in self.endpoints))
@@ -1,30 +1,88 @@
 """Seasonal events service."""
 import logging
+import time
 from datetime import datetime, timezone
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from database.models import SeasonalEvent
+from utils.helpers import as_utc
 
 logger = logging.getLogger(__name__)
 
 
 class SeasonalService:
-    """Service for managing seasonal events."""
+    """
+    Service for managing seasonal events.
     
-    @staticmethod
-    async def get_active_events(session: AsyncSession) -> list[SeasonalEvent]:
-        """Get all active seasonal events."""
+    Active events and the parameters derived from them (best sale
+    discount, best bonus multiplier) are kept in memory until the next
+    starts_at/ends_at boundary, at most REFRESH_SECONDS, or until an
+    event is created. Prices go through utils.pricing with these
+    parameters, so pricing a page of products runs no queries.
+    """
+    
+    REFRESH_SECONDS = 300
+    
+    def __init__(self):
+        self._pricing: dict = {}
+        self._valid_until: Optional[float] = None  # Monotonic time the events must be reloaded
+    
+    def invalidate(self):
+        """Reload events on next use (after an event was changed)."""
+        self._valid_until = None
+    
+    async def get_pricing(self, session: AsyncSession) -> dict:
+        """
+        Active events and their precomputed parameters.
+        
+        Returns:
+            dict with 'events', 'discount_percent' and 'sale_event' (best
+            sale), 'bonus_multiplier' and 'bonus_event' (best bonus)
+        """
+        if self._valid_until is not None and time.monotonic() < self._valid_until:
+            return self._pricing
+        
         now = datetime.now(timezone.utc)
-        stmt = select(SeasonalEvent).where(
-            SeasonalEvent.is_active == True,
-            SeasonalEvent.starts_at <= now,
-            SeasonalEvent.ends_at > now
+        result = await session.execute(
+            select(SeasonalEvent)
+            .where(SeasonalEvent.is_active == True, SeasonalEvent.ends_at > now)
+            .order_by(SeasonalEvent.id)
         )
-        result = await session.execute(stmt)
-        return list(result.scalars().all())
+        
+        pricing = {
+            'events': [],
+            'discount_percent': 0.0,
+            'sale_event': None,
+            'bonus_multiplier': 1.0,
+            'bonus_event': None,
+        }
+        next_boundary = now.timestamp() + self.REFRESH_SECONDS
+        for event in result.scalars().all():
+            session.expunge(event)  # Cached across sessions
+            starts_at, ends_at = as_utc(event.starts_at), as_utc(event.ends_at)
+            if starts_at > now:
+                next_boundary = min(next_boundary, starts_at.timestamp())
+                continue
+            next_boundary = min(next_boundary, ends_at.timestamp())
+            pricing['events'].append(event)
+            if event.event_type == 'sale' and (event.discount_percent or 0) > pricing['discount_percent']:
+                pricing['discount_percent'] = event.discount_percent
+                pricing['sale_event'] = event
+            if event.event_type == 'bonus' and (event.bonus_multiplier or 0) > pricing['bonus_multiplier']:
+                pricing['bonus_multiplier'] = event.bonus_multiplier
+                pricing['bonus_event'] = event
+        
+        self._pricing = pricing
+        self._valid_until = time.monotonic() + max(next_boundary - now.timestamp(), 0)
+        return pricing
+    
+    async def get_active_events(self, session: AsyncSession) -> list[SeasonalEvent]:
+        """Get all active seasonal events."""
+        return (await self.get_pricing(session))['events']
     
-    @staticmethod
     async def apply_event_discount(
+        self,
         session: AsyncSession,
         original_price: float
     ) -> tuple[float, SeasonalEvent | None]:
@@ -32,42 +90,18 @@ class SeasonalService:
         Apply seasonal event discount to price.
         Returns: (final_price, applied_event)
         """
-        events = await SeasonalService.get_active_events(session)
-        
-        best_discount = 0
-        best_event = None
-        
-        for event in events:
-            if event.event_type == 'sale' and event.discount_percent:
-                if event.discount_percent > best_discount:
-                    best_discount = event.discount_percent
-                    best_event = event
-        
-        if best_event:
-            discount = original_price * (best_discount / 100)
-            final_price = original_price - discount
-            return final_price, best_event
-        
+        pricing = await self.get_pricing(session)
+        if pricing['sale_event']:
+            return original_price * (1 - pricing['discount_percent'] / 100), pricing['sale_event']
         return original_price, None
     
-    @staticmethod
-    async def get_bonus_multiplier(session: AsyncSession) -> tuple[float, SeasonalEvent | None]:
+    async def get_bonus_multiplier(self, session: AsyncSession) -> tuple[float, SeasonalEvent | None]:
         """
         Get bonus multiplier from active events.
         Returns: (multiplier, event)
         """
-        events = await SeasonalService.get_active_events(session)
-        
-        best_multiplier = 1.0
-        best_event = None
-        
-        for event in events:
-            if event.event_type == 'bonus' and event.bonus_multiplier:
-                if event.bonus_multiplier > best_multiplier:
-                    best_multiplier = event.bonus_multiplier
-                    best_event = event
-        
-        return best_multiplier, best_event
+        pricing = await self.get_pricing(session)
+        return pricing['bonus_multiplier'], pricing['bonus_event']
     
     @staticmethod
     async def create_seasonal_event(
@@ -98,6 +132,7 @@ class SeasonalService:
         session.add(event)
         await session.commit()
         await session.refresh(event)
+        seasonal_service.invalidate()
         logger.info(f"Seasonal event created: {name_ru}")
         return event
 
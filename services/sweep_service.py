@@ -0,0 +1,194 @@
+"""Consolidation of user deposit wallets into the master wallet."""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from solders.transaction_status import TransactionConfirmationStatus
+from config import settings
+from database.models import User, WalletSweep
+from services.wallet_service import wallet_service
+from services.rpc_pool import RpcError
+from utils.money import sol_to_lamports, format_sol
+
+logger = logging.getLogger(__name__)
+
+
+class SweepService:
+    """
+    Moves deposit wallet balances above a threshold to the master wallet.
+    
+    Candidates come from the balance tracked by the deposit monitor
+    (User.wallet_balance_lamports), so wallets below the threshold cost no
+    RPC calls. Live balances of candidates are batch-fetched; a wallet
+    whose live balance differs from the tracked one still has a deposit
+    being processed and waits for the next run. Each wallet sends its
+    whole balance minus the network fee. Sweeps are signed with the
+    shared blockhash, recorded before sending and tracked until
+    finalized; wallets with an open sweep are skipped.
+    """
+    
+    MAX_SWEEPS_PER_RUN = 500
+    SEND_CONCURRENCY = 4
+    
+    @property
+    def threshold_lamports(self) -> int:
+        """Minimum wallet balance worth sweeping (0 = sweeping disabled)."""
+        return sol_to_lamports(settings.sweep_min_sol)
+    
+    async def get_candidates(self, session: AsyncSession) -> list[User]:
+        """Users whose tracked wallet balance reaches the threshold and have no open sweep."""
+        open_sweeps = select(WalletSweep.user_id).where(WalletSweep.status == 'submitted')
+        result = await session.execute(
+            select(User)
+            .where(
+                User.wallet_balance_lamports >= self.threshold_lamports,
+                User.id.not_in(open_sweeps)
+            )
+            .order_by(User.wallet_balance_lamports.desc())
+            .limit(self.MAX_SWEEPS_PER_RUN)
+        )
+        return list(result.scalars().all())
+    
+    async def sweep(self, session: AsyncSession) -> dict:
+        """
+        Sweep eligible wallets. Commits.
+        
+        Returns:
+            Dict with counts of candidates, sweeps sent and lamports swept
+        """
+        stats = {'candidates': 0, 'sent': 0, 'unsent': 0, 'lamports': 0, 'fees': 0}
+        if self.threshold_lamports <= 0:
+            return stats
+        
+        users = await self.get_candidates(session)
+        stats['candidates'] = len(users)
+        if not users:
+            return stats
+        
+        balances = await wallet_service.get_balances([user.wallet_address for user in users])
+        users = [
+            user for user in users
+            if balances.get(user.wallet_address) == user.wallet_balance_lamports
+        ]
+        if not users:
+            return stats
+        
+        try:
+            blockhash, last_valid_block_height = await wallet_service.get_latest_blockhash()
+        except RpcError as e:
+            logger.error(f"Cannot get blockhash for sweeps: {e}")
+            return stats
+        
+        master = str(wallet_service.master_keypair.pubkey())
+        fee = None
+        transactions = []
+        for user in users:
+            keypair = wallet_service.get_keypair(user.wallet_private_key)
+            balance = balances[user.wallet_address]
+            if fee is None:
+                # Same shape for every sweep (one signer, one transfer)
+                fee = await wallet_service.get_fee(
+                    wallet_service.build_transfer_transaction(keypair, [(master, balance)], blockhash)
+                )
+            amount = balance - fee
+            if amount <= 0:
+                continue
+            
+            transaction = wallet_service.build_transfer_transaction(keypair, [(master, amount)], blockhash)
+            session.add(WalletSweep(
+                user_id=user.id,
+                wallet_address=user.wallet_address,
+                signature=str(transaction.signatures[0]),
+                balance_lamports=balance,
+                amount_lamports=amount,
+                fee_lamports=fee,
+                last_valid_block_height=last_valid_block_height
+            ))
+            transactions.append((transaction, amount))
+        await session.commit()
+        
+        semaphore = asyncio.Semaphore(self.SEND_CONCURRENCY)
+        
+        async def send(transaction):
+            async with semaphore:
+                return await wallet_service.send_signed(transaction)
+        
+        results = await asyncio.gather(*(send(transaction) for transaction, _ in transactions))
+        
+        for (transaction, amount), sent in zip(transactions, results):
+            if not sent:
+                # Expires and is retried on a later run
+                stats['unsent'] += 1
+                continue
+            stats['sent'] += 1
+            stats['lamports'] += amount
+            stats['fees'] += fee
+        
+        if stats['sent']:
+            logger.info(
+                f"🧹 Swept {stats['sent']} wallets: {format_sol(stats['lamports'], 9)} "
+                f"to master wallet (fees {format_sol(stats['fees'], 9)})"
+            )
+        return stats
+    
+    async def track(self, session: AsyncSession) -> dict:
+        """
+        Move open sweeps to finalized, failed or expired. Commits.
+        
+        A finalized sweep lowers the user's tracked wallet balance by the
+        swept balance if the deposit monitor has not seen it yet, so the
+        wallet is not rescanned for the sweep itself.
+        
+        Returns:
+            Dict with counts of tracked, finalized, failed and expired sweeps
+        """
+        stats = {'tracked': 0, 'finalized': 0, 'failed': 0, 'expired': 0}
+        
+        result = await session.execute(
+            select(WalletSweep)
+            .where(WalletSweep.status == 'submitted')
+            .order_by(WalletSweep.id)
+        )
+        sweeps = list(result.scalars().all())
+        if not sweeps:
+            return stats
+        stats['tracked'] = len(sweeps)
+        
+        statuses, expired = await wallet_service.get_sent_statuses(
+            {sweep.signature: sweep.last_valid_block_height for sweep in sweeps}
+        )
+        
+        now = datetime.now(timezone.utc)
+        for sweep in sweeps:
+            status = statuses.get(sweep.signature)
+            if sweep.signature in expired:
+                sweep.status = 'expired'
+            elif status is None:
+                continue
+            elif status.err is not None:
+                sweep.status = 'failed'
+                sweep.error = str(status.err)
+                logger.error(f"Sweep {sweep.signature} of user {sweep.user_id} failed: {status.err}")
+            elif status.confirmation_status == TransactionConfirmationStatus.Finalized:
+                sweep.status = 'finalized'
+                await session.execute(
+                    update(User)
+                    .where(
+                        User.id == sweep.user_id,
+                        User.wallet_balance_lamports == sweep.balance_lamports
+                    )
+                    .values(wallet_balance_lamports=User.wallet_balance_lamports - sweep.balance_lamports)
+                    .execution_options(synchronize_session=False)
+                )
+            else:
+                continue
+            sweep.updated_at = now
+            stats[sweep.status] += 1
+        
+        await session.commit()
+        return stats
+
+
+# Global sweep service instance
+sweep_service = SweepService()
@@ -14,16 +14,22 @@ class TransactionService:
         session: AsyncSession,
         user_id: int,
         tx_type: str,
-        amount_sol: float,
+        amount_cents: int,
         tx_hash: Optional[str] = None,
         description: Optional[str] = None,
-        status: str = 'pending'
+        status: str = 'pending',
+        fee_cents: int = 0,
+        amount_lamports: Optional[int] = None,
+        to_address: Optional[str] = None
     ) -> Transaction:
-        """Create new transaction record."""
+        """Create new transaction record (amounts in minor units)."""
         transaction = Transaction(
             user_id=user_id,
             tx_type=tx_type,
-            amount_sol=amount_sol,
+            amount_cents=amount_cents,
+            fee_cents=fee_cents,
+            amount_lamports=amount_lamports,
+            to_address=to_address,
             tx_hash=tx_hash,
             description=description,
             status=status
@@ -1,10 +1,14 @@
 """User service for managing users."""
 import logging
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from database.models import User, Region, City
-from services.wallet_service import wallet_service
+from services.wallet_pool_service import wallet_pool_service
+from services.ledger_service import LedgerService
+from utils.helpers import as_utc
+from utils.money import format_eur
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +16,8 @@ logger = logging.getLogger(__name__)
 class UserService:
     """Service for user operations."""
     
+    LAST_SEEN_RESOLUTION = timedelta(hours=1)  # last_seen_at is written at most this often
+    
     @staticmethod
     async def get_or_create_user(
         session: AsyncSession,
@@ -32,11 +38,15 @@ class UserService:
             user.username = username
             user.first_name = first_name
             user.last_name = last_name
+            user.bot_blocked_at = None  # Writing to the bot means it is not blocked
+            now = datetime.now(timezone.utc)
+            if user.last_seen_at is None or now - as_utc(user.last_seen_at) >= UserService.LAST_SEEN_RESOLUTION:
+                user.last_seen_at = now
             await session.commit()
             return user
         
-        # Create new wallet for user
-        public_key, encrypted_private_key = wallet_service.create_wallet()
+        # Take a pre-generated wallet (committed together with the user)
+        public_key, encrypted_private_key = await wallet_pool_service.take_wallet(session)
         
         # Create new user
         user = User(
@@ -46,7 +56,8 @@ class UserService:
             last_name=last_name,
             wallet_address=public_key,
             wallet_private_key=encrypted_private_key,
-            balance_eur=0.0
+            balance_cents=0,
+            last_seen_at=datetime.now(timezone.utc)
         )
         session.add(user)
         await session.commit()
@@ -63,16 +74,33 @@ class UserService:
         return result.scalar_one_or_none()
     
     @staticmethod
-    async def update_balance(session: AsyncSession, user_id: int, amount: float) -> bool:
-        """Update user balance."""
+    async def update_balance(
+        session: AsyncSession,
+        user_id: int,
+        amount_cents: int,
+        entry_type: str = 'adjustment',
+        counter_account: str = LedgerService.SYSTEM_ADJUSTMENTS,
+        description: Optional[str] = None
+    ) -> bool:
+        """Update user balance (in cents) through the ledger."""
         user = await UserService.get_user(session, user_id)
         if not user:
             return False
         
-        user.balance_eur += amount
+        await LedgerService.post(
+            session,
+            user_id,
+            amount_cents,
+            counter_account,
+            entry_type,
+            description=description
+        )
         await session.commit()
         await session.refresh(user)  # Refresh to ensure changes are saved
-        logger.info(f"User {user_id} balance updated: {amount:+.2f}, new balance: {user.balance_eur:.2f}")
+        logger.info(
+            f"User {user_id} balance updated: {'+' if amount_cents >= 0 else ''}{format_eur(amount_cents)}, "
+            f"new balance: {format_eur(user.balance_cents)}"
+        )
         return True
     
     @staticmethod
@@ -0,0 +1,131 @@
+"""Pool of pre-generated wallets for new users."""
+import asyncio
+import logging
+from typing import Optional
+from sqlalchemy import select, delete, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.database import db
+from database.models import PooledWallet
+from services.wallet_service import wallet_service
+
+logger = logging.getLogger(__name__)
+
+
+class WalletPoolService:
+    """
+    Encrypted keypairs generated ahead of registration.
+    
+    A background task tops the wallet_pool table up to TARGET_SIZE
+    whenever it drops below LOW_WATERMARK. Keygen and encryption run in a
+    worker thread, so the event loop only does the bulk insert. A new
+    user takes the oldest pooled wallet in the same transaction that
+    creates the user row.
+    """
+    
+    TARGET_SIZE = 500
+    LOW_WATERMARK = 200
+    REFILL_BATCH = 100  # Wallets generated per executor call / insert
+    CHECK_SECONDS = 10
+    
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.metrics = {'popped': 0, 'misses': 0, 'generated': 0}
+    
+    @staticmethod
+    def _generate(count: int) -> list[dict]:
+        """Generate encrypted wallets (runs in a worker thread)."""
+        wallets = []
+        for _ in range(count):
+            public_key, encrypted_private_key = wallet_service.create_wallet()
+            wallets.append({'wallet_address': public_key, 'wallet_private_key': encrypted_private_key})
+        return wallets
+    
+    async def create_wallet(self) -> tuple[str, str]:
+        """Generate one wallet off the event loop (pool is empty)."""
+        self.metrics['misses'] += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, wallet_service.create_wallet)
+    
+    async def pop(self, session: AsyncSession) -> Optional[tuple[str, str]]:
+        """
+        Take a pooled wallet. Does not commit, so the wallet is only consumed
+        if the caller's transaction (creating the user) commits.
+        
+        Returns:
+            Tuple of (public_key, encrypted_private_key), or None if the pool is empty
+        """
+        while True:
+            result = await session.execute(
+                select(PooledWallet)
+                .order_by(PooledWallet.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            wallet = result.scalar_one_or_none()
+            if wallet is None:
+                return None
+            result = await session.execute(
+                delete(PooledWallet)
+                .where(PooledWallet.id == wallet.id)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                self.metrics['popped'] += 1
+                return wallet.wallet_address, wallet.wallet_private_key
+            # Taken by a concurrent registration, try the next one
+    
+    async def take_wallet(self, session: AsyncSession) -> tuple[str, str]:
+        """Pooled wallet, or a freshly generated one if the pool is empty."""
+        return await self.pop(session) or await self.create_wallet()
+    
+    @staticmethod
+    async def size(session: AsyncSession) -> int:
+        """Number of pooled wallets."""
+        result = await session.execute(select(func.count(PooledWallet.id)))
+        return result.scalar()
+    
+    async def refill(self, session: AsyncSession) -> int:
+        """Top the pool up to TARGET_SIZE if it is below LOW_WATERMARK. Returns wallets added."""
+        size = await self.size(session)
+        if size >= self.LOW_WATERMARK:
+            return 0
+        missing = self.TARGET_SIZE - size
+        
+        loop = asyncio.get_running_loop()
+        added = 0
+        while added < missing:
+            wallets = await loop.run_in_executor(None, self._generate, min(self.REFILL_BATCH, missing - added))
+            await session.execute(insert(PooledWallet), wallets)
+            await session.commit()
+            added += len(wallets)
+        
+        self.metrics['generated'] += added
+        logger.info(f"Wallet pool refilled with {added} wallets")
+        return added
+    
+    async def _run(self):
+        while True:
+            try:
+                async for session in db.get_session():
+                    await self.refill(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error refilling wallet pool: {e}", exc_info=True)
+            await asyncio.sleep(self.CHECK_SECONDS)
+    
+    def start(self):
+        """Start background refill."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+    
+    async def stop(self):
+        """Stop background refill."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+# Global wallet pool service instance
+wallet_pool_service = WalletPoolService()
@@ -1,23 +1,44 @@
 """Solana wallet service."""
+import asyncio
+import logging
 import base58
 from typing import Optional, Tuple
-from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Confirmed, Finalized
+from solana.rpc.types import DataSliceOpts, TxOpts
 from solana.transaction import Transaction
+from solders.hash import Hash
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
+from solders.signature import Signature
 from solders.system_program import TransferParams, transfer
 from solders.transaction import Transaction as SoldersTransaction
+from solders.transaction_status import TransactionStatus
 from cryptography.fernet import Fernet
 import os
 from config import settings
+from services.rpc_pool import RpcPool, RpcError
+from services.blockhash_cache import BlockhashCache
+
+logger = logging.getLogger(__name__)
 
 
 class WalletService:
     """Service for managing Solana wallets."""
     
+    BALANCE_BATCH_SIZE = 100  # getMultipleAccounts limit
+    BALANCE_CONCURRENCY = 4  # Parallel getMultipleAccounts requests
+    SIGNATURE_PAGE_LIMIT = 1000  # getSignaturesForAddress limit
+    SIGNATURE_STATUS_BATCH_SIZE = 256  # getSignatureStatuses limit
+    TX_FETCH_CONCURRENCY = 8  # Parallel getTransaction requests
+    MAX_TRANSACTION_SIZE = 1232  # Serialized transaction packet limit (bytes)
+    MAX_TRANSFERS_PER_TRANSACTION = 20  # Distinct recipients fit ~21 transfers
+    DEFAULT_SIGNATURE_FEE_LAMPORTS = 5000  # Base fee per signature
+    
     def __init__(self):
-        self.rpc_client = AsyncClient(settings.solana_rpc_url)
+        self.rpc_client = RpcPool(settings.rpc_url_list, settings.solana_rpc_rate_limit)
+        self.blockhash_cache = BlockhashCache(self.rpc_client)
         self.master_keypair = Keypair.from_base58_string(settings.master_wallet_private_key)
+        self._tx_semaphore = asyncio.Semaphore(self.TX_FETCH_CONCURRENCY)
         
         # Generate or load encryption key for wallet private keys
         self.encryption_key = self._get_or_create_encryption_key()
@@ -60,134 +81,401 @@ class WalletService:
         private_key = self.decrypt_private_key(encrypted_private_key)
         return Keypair.from_base58_string(private_key)
     
-    async def get_balance(self, public_key: str) -> float:
+    async def get_balance(self, public_key: str) -> int:
         """
-        Get wallet balance in SOL.
+        Get wallet balance in lamports.
         
         Args:
             public_key: Wallet public key
             
         Returns:
-            Balance in SOL
+            Balance in lamports
+        
+        Raises:
+            RpcError: If no RPC endpoint answered (never reported as 0)
         """
-        try:
-            pubkey = Pubkey.from_string(public_key)
-            response = await self.rpc_client.get_balance(pubkey)
+        pubkey = Pubkey.from_string(public_key)
+        response = await self.rpc_client.get_balance(pubkey, commitment=Confirmed)
+        return response.value
+    
+    async def get_balances(self, public_keys: list[str]) -> dict[str, int]:
+        """
+        Get balances for many wallets with getMultipleAccounts.
+        
+        Keys are fetched in chunks of BALANCE_BATCH_SIZE with at most
+        BALANCE_CONCURRENCY requests in flight. Account data is not
+        downloaded, only lamports.
+        
+        Args:
+            public_keys: Wallet public keys
             
-            if response.value is not None:
-                # Convert lamports to SOL (1 SOL = 1_000_000_000 lamports)
-                return response.value / 1_000_000_000
-            return 0.0
-        except Exception as e:
-            print(f"Error getting balance: {e}")
-            return 0.0
+        Returns:
+            Dict of public key -> balance in lamports. Wallets from failed
+            chunks are missing (unknown), not reported as 0.
+        """
+        semaphore = asyncio.Semaphore(self.BALANCE_CONCURRENCY)
+        balances = {}
+        
+        async def fetch_chunk(chunk: list[str]):
+            async with semaphore:
+                try:
+                    response = await self.rpc_client.get_multiple_accounts(
+                        [Pubkey.from_string(key) for key in chunk],
+                        commitment=Confirmed,
+                        data_slice=DataSliceOpts(offset=0, length=0)
+                    )
+                except RpcError as e:
+                    logger.error(f"Error getting balances for {len(chunk)} wallets: {e}")
+                    return
+            
+            for key, account in zip(chunk, response.value):
+                # Missing account = never funded
+                balances[key] = account.lamports if account is not None else 0
+        
+        chunks = [
+            public_keys[i:i + self.BALANCE_BATCH_SIZE]
+            for i in range(0, len(public_keys), self.BALANCE_BATCH_SIZE)
+        ]
+        await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+        
+        return balances
     
-    async def transfer_sol(
+    async def get_latest_blockhash(self) -> tuple[Hash, int]:
+        """Get a recent blockhash and the last block height it is valid for (cached)."""
+        return await self.blockhash_cache.get()
+    
+    async def get_block_height(self) -> int:
+        """Get the finalized block height (transactions past their blockhash height cannot land)."""
+        response = await self.rpc_client.get_block_height(commitment=Finalized)
+        return response.value
+    
+    async def get_signature_statuses(
         self,
-        from_keypair: Keypair,
-        to_public_key: str,
-        amount_sol: float
-    ) -> Optional[str]:
+        signatures: list[str],
+        search_history: bool = False
+    ) -> dict[str, Optional[TransactionStatus]]:
         """
-        Transfer SOL from one wallet to another.
+        Get statuses for many signatures with getSignatureStatuses.
+        
+        Signatures are sent in chunks of SIGNATURE_STATUS_BATCH_SIZE.
         
         Args:
-            from_keypair: Sender's keypair
-            to_public_key: Recipient's public key
-            amount_sol: Amount in SOL
+            signatures: Transaction signatures
+            search_history: Also search the ledger, not only the recent status cache
             
         Returns:
-            Transaction hash if successful, None otherwise
+            Dict of signature -> status (None if unknown to the node). Signatures
+            from failed chunks are missing.
         """
-        try:
-            # Convert SOL to lamports
-            amount_lamports = int(amount_sol * 1_000_000_000)
+        semaphore = asyncio.Semaphore(self.BALANCE_CONCURRENCY)
+        statuses = {}
+        
+        async def fetch_chunk(chunk: list[str]):
+            async with semaphore:
+                try:
+                    response = await self.rpc_client.get_signature_statuses(
+                        [Signature.from_string(signature) for signature in chunk],
+                        search_transaction_history=search_history
+                    )
+                except RpcError as e:
+                    logger.error(f"Error getting statuses for {len(chunk)} signatures: {e}")
+                    return
+            statuses.update(zip(chunk, response.value))
+        
+        await asyncio.gather(*(
+            fetch_chunk(signatures[i:i + self.SIGNATURE_STATUS_BATCH_SIZE])
+            for i in range(0, len(signatures), self.SIGNATURE_STATUS_BATCH_SIZE)
+        ))
+        return statuses
+    
+    async def get_sent_statuses(
+        self,
+        last_valid_block_heights: dict[str, int]
+    ) -> tuple[dict[str, TransactionStatus], set[str]]:
+        """
+        Get statuses of sent transactions and find the expired ones.
+        
+        A transaction unknown to the node counts as expired only when the
+        finalized block height passed its blockhash's last valid height and
+        a history search does not find it either, so it can never land after
+        being reported expired.
+        
+        Args:
+            last_valid_block_heights: Signature -> last valid block height of its blockhash
             
-            # Create transfer instruction
-            to_pubkey = Pubkey.from_string(to_public_key)
-            transfer_ix = transfer(
+        Returns:
+            (signature -> status for transactions the node knows, expired signatures)
+        """
+        statuses = await self.get_signature_statuses(list(last_valid_block_heights))
+        unknown = [signature for signature, status in statuses.items() if status is None]
+        if not unknown:
+            return statuses, set()
+        
+        try:
+            block_height = await self.get_block_height()
+        except RpcError as e:
+            logger.error(f"Cannot get block height: {e}")
+            return statuses, set()
+        
+        candidates = [s for s in unknown if block_height > last_valid_block_heights[s]]
+        if not candidates:
+            return statuses, set()
+        
+        history = await self.get_signature_statuses(candidates, search_history=True)
+        statuses.update(history)
+        return statuses, {s for s in candidates if s in history and history[s] is None}
+    
+    async def get_fee(self, transaction: SoldersTransaction) -> int:
+        """Get the fee in lamports for a transaction's message."""
+        try:
+            response = await self.rpc_client.get_fee_for_message(transaction.message, commitment=Confirmed)
+            if response.value is not None:
+                return response.value
+        except RpcError as e:
+            logger.warning(f"Cannot get transaction fee, using default: {e}")
+        return self.DEFAULT_SIGNATURE_FEE_LAMPORTS * len(transaction.signatures)
+    
+    @staticmethod
+    def build_transfer_transaction(
+        from_keypair: Keypair,
+        transfers: list[tuple[str, int]],
+        recent_blockhash: Optional[Hash] = None
+    ) -> SoldersTransaction:
+        """
+        Build a transaction with one transfer instruction per (to_public_key, lamports).
+        Signed when recent_blockhash is given.
+        
+        Raises:
+            ValueError: If a recipient address is invalid
+        """
+        instructions = [
+            transfer(
                 TransferParams(
                     from_pubkey=from_keypair.pubkey(),
-                    to_pubkey=to_pubkey,
+                    to_pubkey=Pubkey.from_string(to_public_key),
                     lamports=amount_lamports
                 )
             )
-            
-            # Get recent blockhash
-            recent_blockhash_resp = await self.rpc_client.get_latest_blockhash()
-            recent_blockhash = recent_blockhash_resp.value.blockhash
-            
-            # Create and sign transaction
-            transaction = SoldersTransaction.new_with_payer(
-                [transfer_ix],
-                from_keypair.pubkey()
-            )
+            for to_public_key, amount_lamports in transfers
+        ]
+        transaction = SoldersTransaction.new_with_payer(instructions, from_keypair.pubkey())
+        if recent_blockhash is not None:
             transaction.partial_sign([from_keypair], recent_blockhash)
+        return transaction
+    
+    @classmethod
+    def fits_in_transaction(cls, from_keypair: Keypair, transfers: list[tuple[str, int]]) -> bool:
+        """Check that the transfers fit in one transaction packet."""
+        if len(transfers) > cls.MAX_TRANSFERS_PER_TRANSACTION:
+            return False
+        transaction = cls.build_transfer_transaction(from_keypair, transfers)
+        return len(bytes(transaction)) <= cls.MAX_TRANSACTION_SIZE
+    
+    async def _send(self, transaction: SoldersTransaction):
+        """
+        Submit a signed transaction as raw bytes (AsyncClient.send_transaction
+        would try to re-sign a solders Transaction as a legacy one).
+        """
+        return await self.rpc_client.send_raw_transaction(
+            bytes(transaction),
+            opts=TxOpts(preflight_commitment=Confirmed)
+        )
+    
+    async def send_signed(self, transaction: SoldersTransaction) -> bool:
+        """
+        Send an already signed transaction.
+        
+        Its signature (transaction.signatures[0]) is known before sending, so
+        callers can record it first. Retrying the same signed transaction
+        cannot execute it twice.
+        """
+        try:
+            await self._send(transaction)
+            return True
+        except RpcError as e:
+            logger.error(f"Error sending transaction {transaction.signatures[0]}: {e}")
+            return False
+    
+    async def send_transfers(
+        self,
+        from_keypair: Keypair,
+        transfers: list[tuple[str, int]],
+        recent_blockhash: Optional[Hash] = None
+    ) -> Optional[str]:
+        """
+        Send several transfers from one wallet in a single transaction.
+        
+        Args:
+            from_keypair: Sender's keypair (pays one fee for the whole batch)
+            transfers: List of (to_public_key, amount_lamports); must fit in one transaction
+            recent_blockhash: Blockhash shared by a batch of sends (fetched if not given)
             
-            # Send transaction
-            response = await self.rpc_client.send_transaction(transaction)
-            
+        Returns:
+            Transaction signature if sent, None otherwise
+        """
+        try:
+            if recent_blockhash is None:
+                recent_blockhash, _ = await self.get_latest_blockhash()
+            transaction = self.build_transfer_transaction(from_keypair, transfers, recent_blockhash)
+            response = await self._send(transaction)
             return str(response.value)
-        except Exception as e:
-            print(f"Error transferring SOL: {e}")
+        except (RpcError, ValueError) as e:
+            logger.error(f"Error sending {len(transfers)} transfers from {from_keypair.pubkey()}: {e}")
             return None
     
-    async def check_incoming_transactions(
+    async def transfer_sol(
         self,
-        wallet_public_key: str,
-        last_signature: Optional[str] = None
-    ) -> list:
+        from_keypair: Keypair,
+        to_public_key: str,
+        amount_lamports: int
+    ) -> Optional[str]:
         """
-        Check for incoming transactions to a wallet.
+        Transfer SOL from one wallet to another.
         
         Args:
-            wallet_public_key: Wallet to check
-            last_signature: Last processed signature
+            from_keypair: Sender's keypair
+            to_public_key: Recipient's public key
+            amount_lamports: Amount in lamports
             
         Returns:
-            List of new transactions
+            Transaction hash if successful, None otherwise
+        """
+        return await self.send_transfers(from_keypair, [(to_public_key, amount_lamports)])
+    
+    async def get_new_signatures(
+        self,
+        wallet_public_key: str,
+        last_signature: Optional[str] = None
+    ) -> Optional[list]:
+        """
+        Get signatures newer than the cursor, oldest first.
+        
+        Pages backwards with `before=` and stops at `until=last_signature`,
+        so only unseen signatures are returned.
+        
+        Returns:
+            List of signature infos, or None on RPC error (cursor must not move)
         """
         try:
             pubkey = Pubkey.from_string(wallet_public_key)
+            until = Signature.from_string(last_signature) if last_signature else None
             
-            # Get transaction signatures
-            signatures_resp = await self.rpc_client.get_signatures_for_address(
-                pubkey,
-                limit=10
-            )
-            
-            if not signatures_resp.value:
-                return []
-            
-            new_transactions = []
-            for sig_info in signatures_resp.value:
-                signature = str(sig_info.signature)
-                
-                # Stop if we reach the last processed signature
-                if last_signature and signature == last_signature:
+            signatures = []
+            before = None
+            while True:
+                response = await self.rpc_client.get_signatures_for_address(
+                    pubkey,
+                    before=before,
+                    until=until,
+                    limit=self.SIGNATURE_PAGE_LIMIT,
+                    commitment=Confirmed
+                )
+                page = response.value
+                signatures.extend(page)
+                if len(page) < self.SIGNATURE_PAGE_LIMIT:
                     break
-                
-                # Get transaction details
-                tx_resp = await self.rpc_client.get_transaction(
+                before = page[-1].signature
+            
+            signatures.reverse()
+            return signatures
+        except (RpcError, ValueError) as e:
+            logger.error(f"Error getting signatures for {wallet_public_key}: {e}")
+            return None
+    
+    @staticmethod
+    def parse_incoming_lamports(tx, wallet_public_key: str) -> int:
+        """
+        Sum lamports sent to the wallet by system transfers in a jsonParsed
+        transaction (top-level and inner instructions).
+        """
+        meta = tx.transaction.meta
+        if meta is None or meta.err is not None:
+            return 0
+        
+        instructions = list(tx.transaction.transaction.message.instructions)
+        for inner in meta.inner_instructions or []:
+            instructions.extend(inner.instructions)
+        
+        lamports = 0
+        for ix in instructions:
+            if getattr(ix, 'program', None) != 'system':
+                continue
+            parsed = ix.parsed
+            if not isinstance(parsed, dict):
+                continue
+            if parsed.get('type') not in ('transfer', 'transferWithSeed'):
+                continue
+            info = parsed.get('info', {})
+            if info.get('destination') == wallet_public_key:
+                lamports += int(info.get('lamports', 0))
+        
+        return lamports
+    
+    async def get_incoming_transfers(
+        self,
+        wallet_public_key: str,
+        signatures: list
+    ) -> Optional[list[dict]]:
+        """
+        Fetch transactions in parallel (bounded) and parse lamports received.
+        
+        Returns:
+            List of {'signature', 'slot', 'block_time', 'lamports'} in the given
+            order (lamports may be 0), or None if any fetch failed
+        """
+        async def fetch(sig_info):
+            if sig_info.err is not None:
+                return 0  # Failed transactions move no lamports
+            async with self._tx_semaphore:
+                response = await self.rpc_client.get_transaction(
                     sig_info.signature,
+                    encoding='jsonParsed',
+                    commitment=Confirmed,
                     max_supported_transaction_version=0
                 )
-                
-                if tx_resp.value:
-                    new_transactions.append({
-                        'signature': signature,
-                        'slot': sig_info.slot,
-                        'block_time': sig_info.block_time,
-                        'transaction': tx_resp.value
-                    })
+            if response.value is None:
+                raise ValueError(f"Transaction {sig_info.signature} not found")
+            return self.parse_incoming_lamports(response.value, wallet_public_key)
+        
+        try:
+            amounts = await asyncio.gather(*(fetch(sig_info) for sig_info in signatures))
+        except (RpcError, ValueError) as e:
+            logger.error(f"Error fetching transactions for {wallet_public_key}: {e}")
+            return None
+        
+        return [
+            {
+                'signature': str(sig_info.signature),
+                'slot': sig_info.slot,
+                'block_time': sig_info.block_time,
+                'lamports': lamports
+            }
+            for sig_info, lamports in zip(signatures, amounts)
+        ]
+    
+    async def check_incoming_transactions(
+        self,
+        wallet_public_key: str,
+        last_signature: Optional[str] = None
+    ) -> Optional[list[dict]]:
+        """
+        Check for incoming transfers to a wallet since the cursor.
+        
+        Args:
+            wallet_public_key: Wallet to check
+            last_signature: Last processed signature (cursor)
             
-            return new_transactions
-        except Exception as e:
-            print(f"Error checking transactions: {e}")
-            return []
+        Returns:
+            Transfers oldest first (see get_incoming_transfers), or None on error
+        """
+        signatures = await self.get_new_signatures(wallet_public_key, last_signature)
+        if signatures is None:
+            return None
+        return await self.get_incoming_transfers(wallet_public_key, signatures)
     
     async def close(self):
-        """Close RPC client."""
+        """Stop blockhash refresh and close RPC client."""
+        await self.blockhash_cache.stop()
         await self.rpc_client.close()
 
 
@@ -0,0 +1,282 @@
+"""Push-based wallet balance updates via Solana websocket account subscriptions."""
+import asyncio
+import json
+import logging
+import random
+from typing import Optional
+import aiohttp
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AiohttpWebsocketTransport:
+    """Default websocket transport (aiohttp)."""
+    
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    async def connect(self, url: str) -> 'AiohttpWebsocketConnection':
+        """Open a websocket connection."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        ws = await self._session.ws_connect(url, heartbeat=30)
+        return AiohttpWebsocketConnection(ws)
+    
+    async def close(self):
+        """Close underlying HTTP session."""
+        if self._session is not None:
+            await self._session.close()
+
+
+class AiohttpWebsocketConnection:
+    """
+    Websocket connection used by the stream service.
+    
+    Any transport works if its connect(url) returns an object with
+    async send(text), recv() -> text and close().
+    """
+    
+    def __init__(self, ws: aiohttp.ClientWebSocketResponse):
+        self._ws = ws
+    
+    async def send(self, text: str):
+        await self._ws.send_str(text)
+    
+    async def recv(self) -> str:
+        message = await self._ws.receive()
+        if message.type == aiohttp.WSMsgType.TEXT:
+            return message.data
+        raise ConnectionError(f"Websocket closed ({message.type.name})")
+    
+    async def close(self):
+        await self._ws.close()
+
+
+class _StreamConnection:
+    """One websocket multiplexing many accountSubscribe subscriptions."""
+    
+    def __init__(self, service: 'WalletStreamService', index: int):
+        self.service = service
+        self.index = index
+        self.wanted: set[str] = set()  # Wallets that should be subscribed
+        self.subscriptions: dict[int, str] = {}  # Subscription id -> wallet
+        self.subscribed: dict[str, int] = {}  # Wallet -> subscription id
+        self.pending: dict[int, tuple[str, str]] = {}  # Request id -> (method, wallet)
+        self.connection = None
+        self.task: Optional[asyncio.Task] = None
+        self._request_id = 0
+    
+    @property
+    def connected(self) -> bool:
+        return self.connection is not None
+    
+    async def _request(self, method: str, params: list, wallet: str):
+        self._request_id += 1
+        self.pending[self._request_id] = (method, wallet)
+        await self.connection.send(json.dumps({
+            'jsonrpc': '2.0',
+            'id': self._request_id,
+            'method': method,
+            'params': params
+        }))
+    
+    async def subscribe(self, wallet: str):
+        self.wanted.add(wallet)
+        if self.connected and wallet not in self.subscribed:
+            await self._request(
+                'accountSubscribe',
+                [wallet, {'encoding': 'base64', 'commitment': self.service.commitment}],
+                wallet
+            )
+    
+    async def unsubscribe(self, wallet: str):
+        self.wanted.discard(wallet)
+        subscription_id = self.subscribed.pop(wallet, None)
+        if subscription_id is None:
+            return
+        self.subscriptions.pop(subscription_id, None)
+        if self.connected:
+            await self._request('accountUnsubscribe', [subscription_id], wallet)
+    
+    async def run(self):
+        """Connect, resubscribe everything and read until disconnected; repeat."""
+        backoff = self.service.RECONNECT_MIN_SECONDS
+        while True:
+            try:
+                self.connection = await self.service.transport.connect(self.service.url)
+                logger.info(f"Stream connection {self.index} connected, subscribing {len(self.wanted)} wallets")
+                backoff = self.service.RECONNECT_MIN_SECONDS
+                for wallet in list(self.wanted):
+                    await self.subscribe(wallet)
+                while True:
+                    self._handle(json.loads(await self.connection.recv()))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Stream connection {self.index} lost: {e}")
+            finally:
+                connection = self.connection
+                self.connection = None
+                self.subscriptions.clear()
+                self.subscribed.clear()
+                self.pending.clear()
+                if connection is not None:
+                    try:
+                        await connection.close()
+                    except Exception:
+                        pass
+            
+            self.service.metrics['reconnects'] += 1
+            await asyncio.sleep(backoff * random.uniform(0.5, 1.5))
+            backoff = min(backoff * 2, self.service.RECONNECT_MAX_SECONDS)
+    
+    def _handle(self, message: dict):
+        if message.get('method') == 'accountNotification':
+            params = message['params']
+            wallet = self.subscriptions.get(params['subscription'])
+            if wallet is not None:
+                result = params['result']
+                self.service._notify(wallet, result['value']['lamports'], result['context']['slot'])
+            return
+        
+        request = self.pending.pop(message.get('id'), None)
+        if request is None:
+            return
+        method, wallet = request
+        if 'error' in message:
+            logger.error(f"{method} failed for {wallet}: {message['error']}")
+            return
+        if method == 'accountSubscribe':
+            subscription_id = message['result']
+            self.subscriptions[subscription_id] = wallet
+            self.subscribed[wallet] = subscription_id
+            if wallet not in self.wanted:
+                # Unwatched while the request was in flight
+                asyncio.ensure_future(self.unsubscribe(wallet))
+
+
+class WalletStreamService:
+    """
+    Account subscriptions for watched wallets.
+    
+    Wallets are spread over at most MAX_CONNECTIONS websockets. Every
+    connection reconnects with backoff and resubscribes its wallets.
+    Balance changes are collected per wallet (latest lamports wins) and
+    drained by the deposit monitor. Wallets that are not streamed (over
+    capacity or disconnected) stay on batched polling.
+    """
+    
+    MAX_CONNECTIONS = 4
+    MAX_SUBSCRIPTIONS_PER_CONNECTION = 5000
+    RECONNECT_MIN_SECONDS = 1
+    RECONNECT_MAX_SECONDS = 30
+    
+    def __init__(self, url: Optional[str] = None, transport=None, commitment: str = 'confirmed'):
+        self.url = url or settings.solana_ws_url or settings.solana_rpc_url.replace('http', 'ws', 1)
+        self.transport = transport or AiohttpWebsocketTransport()
+        self.commitment = commitment
+        self.metrics = {'notifications': 0, 'reconnects': 0}
+        self._connections: list[_StreamConnection] = []
+        self._assigned: dict[str, _StreamConnection] = {}
+        self._updates: dict[str, int] = {}  # Wallet -> latest lamports
+        self._update_event: Optional[asyncio.Event] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._update_event is not None
+    
+    async def start(self):
+        """Start the service (connections open lazily as wallets are watched)."""
+        if self._update_event is None:
+            self._update_event = asyncio.Event()
+    
+    async def stop(self):
+        """Close all connections."""
+        for connection in self._connections:
+            if connection.task:
+                connection.task.cancel()
+        await asyncio.gather(
+            *(c.task for c in self._connections if c.task),
+            return_exceptions=True
+        )
+        self._connections.clear()
+        self._assigned.clear()
+        self._update_event = None
+        if hasattr(self.transport, 'close'):
+            await self.transport.close()
+    
+    def _pick_connection(self) -> Optional[_StreamConnection]:
+        """Least loaded connection with room; opens a new one when all are full."""
+        open_connections = [
+            c for c in self._connections
+            if len(c.wanted) < self.MAX_SUBSCRIPTIONS_PER_CONNECTION
+        ]
+        if open_connections:
+            return min(open_connections, key=lambda c: len(c.wanted))
+        if len(self._connections) >= self.MAX_CONNECTIONS:
+            return None
+        
+        connection = _StreamConnection(self, len(self._connections))
+        connection.task = asyncio.ensure_future(connection.run())
+        self._connections.append(connection)
+        return connection
+    
+    async def watch(self, wallet: str) -> bool:
+        """Subscribe to wallet. Returns False if over capacity."""
+        if wallet in self._assigned:
+            return True
+        connection = self._pick_connection()
+        if connection is None:
+            return False
+        self._assigned[wallet] = connection
+        await connection.subscribe(wallet)
+        return True
+    
+    async def unwatch(self, wallet: str):
+        """Unsubscribe from wallet."""
+        connection = self._assigned.pop(wallet, None)
+        if connection is not None:
+            await connection.unsubscribe(wallet)
+    
+    async def sync(self, wallets: set[str]):
+        """Make the subscribed set equal to `wallets` (as capacity allows)."""
+        for wallet in list(self._assigned.keys() - wallets):
+            await self.unwatch(wallet)
+        for wallet in wallets - self._assigned.keys():
+            if not await self.watch(wallet):
+                break
+    
+    def is_streamed(self, wallet: str) -> bool:
+        """True if wallet has a live subscription."""
+        connection = self._assigned.get(wallet)
+        return connection is not None and connection.connected and wallet in connection.subscribed
+    
+    def _notify(self, wallet: str, lamports: int, slot: int):
+        self.metrics['notifications'] += 1
+        self._updates[wallet] = lamports
+        if self._update_event is not None:
+            self._update_event.set()
+    
+    def drain(self) -> dict[str, int]:
+        """Take pending balance updates (wallet -> lamports)."""
+        updates = self._updates
+        self._updates = {}
+        if self._update_event is not None:
+            self._update_event.clear()
+        return updates
+    
+    async def wait_for_update(self, timeout: float) -> bool:
+        """Wait until a balance update arrives or timeout. Returns True on update."""
+        if self._update_event is None:
+            await asyncio.sleep(timeout)
+            return False
+        try:
+            await asyncio.wait_for(self._update_event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+# Global wallet stream service instance
+wallet_stream_service = WalletStreamService()
@@ -0,0 +1,318 @@
+"""Batched execution and confirmation tracking of withdrawals."""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+from solders.transaction_status import TransactionConfirmationStatus
+from database.models import Transaction, WithdrawalSubmission
+from services.wallet_service import wallet_service
+from services.ledger_service import LedgerService
+from services.rpc_pool import RpcError
+from utils.money import format_sol
+
+logger = logging.getLogger(__name__)
+
+
+class WithdrawalService:
+    """
+    Sends pending withdrawals in as few transactions as possible and
+    tracks them until they are final.
+    
+    Withdrawals are paid from the master wallet (user deposit wallets are
+    swept into it) and packed into multi-transfer transactions up to the
+    packet size limit, so one fee covers a whole batch. All batches of a
+    run are signed with one blockhash.
+    
+    Every sent transaction is recorded as a WithdrawalSubmission and its
+    withdrawals move to 'submitted'. The tracker polls open submissions
+    with batched getSignatureStatuses: finalized ones complete their
+    withdrawals, failed ones fail them and refund the debited amount and
+    fee, and ones whose blockhash expired without landing are sent again
+    with a new blockhash.
+    """
+    
+    SEND_CONCURRENCY = 4  # Transactions sent in parallel
+    OPEN_STATUSES = ('submitted', 'confirmed')
+    
+    @staticmethod
+    async def _load(session: AsyncSession, *criteria) -> list[Transaction]:
+        """
+        Load withdrawals matching criteria (oldest first).
+        On Postgres the rows stay locked until commit; rows locked by another
+        monitor process are skipped.
+        """
+        result = await session.execute(
+            select(Transaction)
+            .where(Transaction.tx_type == 'withdrawal', *criteria)
+            .order_by(Transaction.created_at.asc(), Transaction.id.asc())
+            .with_for_update(skip_locked=True)
+        )
+        return list(result.scalars().all())
+    
+    @staticmethod
+    async def get_pending(session: AsyncSession) -> list[Transaction]:
+        """Get pending (not yet sent) withdrawals."""
+        return await WithdrawalService._load(session, Transaction.status == 'pending')
+    
+    @staticmethod
+    def is_valid_address(address: Optional[str]) -> bool:
+        """Check that address is a valid Solana public key."""
+        try:
+            Pubkey.from_string(address or '')
+            return True
+        except ValueError:
+            return False
+    
+    @staticmethod
+    def build_batches(
+        keypair: Keypair,
+        withdrawals: list[Transaction]
+    ) -> list[list[Transaction]]:
+        """Pack one wallet's withdrawals into batches that fit in a transaction."""
+        batches = []
+        batch = []
+        for tx in withdrawals:
+            candidate = batch + [tx]
+            if batch and not wallet_service.fits_in_transaction(
+                keypair,
+                [(t.to_address, t.amount_lamports) for t in candidate]
+            ):
+                batches.append(batch)
+                candidate = [tx]
+            batch = candidate
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    async def _submit(self, session: AsyncSession, withdrawals: list[Transaction]) -> dict:
+        """
+        Record and send withdrawals in batches. Commits.
+        
+        Withdrawals whose send failed stay 'submitted' and are sent again
+        when their blockhash expires. Withdrawals that can never be sent
+        (no amount, invalid destination) are failed and refunded.
+        
+        Returns:
+            Dict with counts of withdrawals sent, not sent (unsent), refunded
+            and transactions used
+        """
+        stats = {'withdrawals': len(withdrawals), 'sent': 0, 'unsent': 0, 'refunded': 0, 'transactions': 0}
+        
+        valid, invalid = [], []
+        for tx in withdrawals:
+            if tx.amount_lamports and self.is_valid_address(tx.to_address):
+                valid.append(tx)
+            else:
+                logger.error(f"Withdrawal {tx.id} has invalid destination or amount, refunding")
+                invalid.append(tx)
+        # Committed below together with the recorded submissions
+        await self._refund(session, invalid)
+        stats['refunded'] = len(invalid)
+        
+        # Deposits are swept into the master wallet, which pays all withdrawals
+        keypair = wallet_service.master_keypair
+        batches = [(keypair, batch) for batch in self.build_batches(keypair, valid)]
+        
+        try:
+            blockhash, last_valid_block_height = await wallet_service.get_latest_blockhash()
+        except RpcError as e:
+            logger.error(f"Cannot get blockhash for withdrawals: {e}")
+            stats['unsent'] += sum(len(batch) for _, batch in batches)
+            await session.commit()
+            return stats
+        
+        # Record signatures before sending: a crash after the send must not
+        # leave the withdrawals pending (and paid twice)
+        transactions = []
+        for keypair, batch in batches:
+            transaction = wallet_service.build_transfer_transaction(
+                keypair,
+                [(tx.to_address, tx.amount_lamports) for tx in batch],
+                blockhash
+            )
+            signature = str(transaction.signatures[0])
+            session.add(WithdrawalSubmission(
+                signature=signature,
+                source_wallet=str(keypair.pubkey()),
+                last_valid_block_height=last_valid_block_height
+            ))
+            await session.execute(
+                update(Transaction)
+                .where(Transaction.id.in_([tx.id for tx in batch]))
+                .values(status='submitted', tx_hash=signature)
+                .execution_options(synchronize_session=False)
+            )
+            transactions.append(transaction)
+        await session.commit()
+        
+        semaphore = asyncio.Semaphore(self.SEND_CONCURRENCY)
+        
+        async def send(transaction):
+            async with semaphore:
+                return await wallet_service.send_signed(transaction)
+        
+        results = await asyncio.gather(*(send(transaction) for transaction in transactions))
+        
+        for (keypair, batch), transaction, sent in zip(batches, transactions, results):
+            if not sent:
+                # Retried by the tracker once the blockhash expires
+                stats['unsent'] += len(batch)
+                continue
+            stats['sent'] += len(batch)
+            stats['transactions'] += 1
+            logger.info(
+                f"📤 Sent {len(batch)} withdrawals "
+                f"({format_sol(sum(tx.amount_lamports for tx in batch), 9)}) "
+                f"from {keypair.pubkey()} in {transaction.signatures[0]}"
+            )
+        
+        return stats
+    
+    async def process_pending(self, session: AsyncSession) -> dict:
+        """
+        Send all pending withdrawals.
+        
+        Returns:
+            Dict with counts of withdrawals sent, not sent (unsent), refunded
+            and transactions used
+        """
+        withdrawals = await self.get_pending(session)
+        if not withdrawals:
+            return {'withdrawals': 0, 'sent': 0, 'unsent': 0, 'refunded': 0, 'transactions': 0}
+        return await self._submit(session, withdrawals)
+    
+    @staticmethod
+    async def _set_withdrawals(session: AsyncSession, signatures: list[str], **values):
+        """Update submitted withdrawals of the given transactions."""
+        await session.execute(
+            update(Transaction)
+            .where(
+                Transaction.tx_type == 'withdrawal',
+                Transaction.status == 'submitted',
+                Transaction.tx_hash.in_(signatures)
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+    
+    @staticmethod
+    async def _refund(session: AsyncSession, withdrawals: list[Transaction]):
+        """
+        Fail withdrawals and credit back the amount and fee debited when
+        they were requested. Does not commit.
+        """
+        for tx in withdrawals:
+            tx.status = 'failed'
+            await LedgerService.post(
+                session,
+                tx.user_id,
+                tx.amount_cents + (tx.fee_cents or 0),
+                LedgerService.SYSTEM_WITHDRAWALS,
+                'withdrawal_refund',
+                description=f"Failed withdrawal #{tx.id}"
+            )
+    
+    @staticmethod
+    async def _refund_failed(session: AsyncSession, signatures: list[str]) -> int:
+        """Fail and refund submitted withdrawals of failed transactions. Does not commit."""
+        withdrawals = await WithdrawalService._load(
+            session,
+            Transaction.status == 'submitted',
+            Transaction.tx_hash.in_(signatures)
+        )
+        await WithdrawalService._refund(session, withdrawals)
+        return len(withdrawals)
+    
+    async def track_submissions(self, session: AsyncSession) -> dict:
+        """
+        Poll open submissions and move them (and their withdrawals) forward.
+        Failed submissions refund their withdrawals; expired ones never
+        landed and their withdrawals are sent again.
+        
+        Returns:
+            Dict with counts of tracked, confirmed, finalized, failed, expired
+            submissions and refunded and resubmitted withdrawals
+        """
+        stats = {
+            'tracked': 0, 'confirmed': 0, 'finalized': 0, 'failed': 0, 'expired': 0,
+            'refunded': 0, 'resubmitted': 0
+        }
+        
+        result = await session.execute(
+            select(WithdrawalSubmission)
+            .where(WithdrawalSubmission.status.in_(self.OPEN_STATUSES))
+            .order_by(WithdrawalSubmission.id)
+        )
+        submissions = list(result.scalars().all())
+        if not submissions:
+            return stats
+        stats['tracked'] = len(submissions)
+        
+        statuses, expired = await wallet_service.get_sent_statuses(
+            {s.signature: s.last_valid_block_height for s in submissions}
+        )
+        
+        now = datetime.now(timezone.utc)
+        finalized, failed = [], []
+        for submission in submissions:
+            status = statuses.get(submission.signature)
+            if submission.signature in expired:
+                submission.status = 'expired'
+            elif status is None:
+                continue  # Not seen yet (or RPC error) - checked next time
+            elif status.err is not None:
+                submission.status = 'failed'
+                submission.error = str(status.err)
+                submission.slot = status.slot
+                failed.append(submission.signature)
+                logger.error(f"Withdrawal transaction {submission.signature} failed: {status.err}")
+            elif status.confirmation_status == TransactionConfirmationStatus.Finalized:
+                submission.status = 'finalized'
+                submission.slot = status.slot
+                finalized.append(submission.signature)
+            elif (
+                status.confirmation_status == TransactionConfirmationStatus.Confirmed
+                and submission.status != 'confirmed'
+            ):
+                submission.status = 'confirmed'
+                submission.slot = status.slot
+                stats['confirmed'] += 1
+            else:
+                continue
+            submission.updated_at = now
+        
+        if finalized:
+            await self._set_withdrawals(session, finalized, status='completed', completed_at=now)
+        if failed:
+            # Refunded in the same commit that marks them failed
+            stats['refunded'] = await self._refund_failed(session, failed)
+        
+        stats['finalized'] = len(finalized)
+        stats['failed'] = len(failed)
+        stats['expired'] = len(expired)
+        
+        if not expired:
+            await session.commit()
+            return stats
+        
+        # Expired without landing: send again with a new blockhash
+        logger.warning(f"{len(expired)} withdrawal transactions expired, resubmitting")
+        withdrawals = await self._load(
+            session,
+            Transaction.status == 'submitted',
+            Transaction.tx_hash.in_(expired)
+        )
+        for tx in withdrawals:
+            tx.status = 'pending'
+            tx.tx_hash = None
+        await session.flush()
+        stats['resubmitted'] = (await self._submit(session, withdrawals))['sent']
+        return stats
+
+
+# Global withdrawal service instance
+withdrawal_service = WithdrawalService()
@@ -65,12 +65,32 @@ async def main():
     # Initialize database with default data
     await initialize_database()
     
+    # Keep pre-generated wallets ready for new users
+    from services.wallet_pool_service import wallet_pool_service
+    wallet_pool_service.start()
+    
+    # Keep the SOL/EUR rate warm for balance and deposit screens
+    from services.price_service import price_service
+    price_service.start()
+    
+    # Send queued notifications and broadcasts
+    from services.notification_dispatcher import notification_dispatcher
+    notification_dispatcher.start(bot)
+    
+    # Keep leaderboard snapshots fresh
+    from services.leaderboard_service import leaderboard_service
+    leaderboard_service.start()
+    
     # Start polling
     logger.info("Starting bot...")
     try:
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
+        await notification_dispatcher.stop()
+        await leaderboard_service.stop()
         await bot.session.close()
+        await wallet_pool_service.stop()
+        await price_service.stop()
         from services.wallet_service import wallet_service
         await wallet_service.close()
 
@@ -1,11 +1,12 @@
 """Helper functions."""
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timezone
+from utils.money import format_sol
 
 
-def format_sol_amount(amount: float) -> str:
-    """Format SOL amount for display."""
-    return f"{amount:.4f} SOL"
+def format_sol_amount(lamports: int) -> str:
+    """Format lamports amount for display."""
+    return format_sol(lamports)
 
 
 def format_datetime(dt: datetime) -> str:
@@ -13,6 +14,11 @@ def format_datetime(dt: datetime) -> str:
     return dt.strftime("%d.%m.%Y %H:%M")
 
 
+def as_utc(value: datetime) -> datetime:
+    """Stored datetimes come back naive (UTC) from SQLite."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
 def truncate_address(address: str, start: int = 6, end: int = 4) -> str:
     """Truncate wallet address for display."""
     if len(address) <= start + end:
@@ -20,6 +26,15 @@ def truncate_address(address: str, start: int = 6, end: int = 4) -> str:
     return f"{address[:start]}...{address[-end:]}"
 
 
+def plural_ru(count: int, one: str, few: str, many: str) -> str:
+    """Russian plural form for count: plural_ru(n, 'товар', 'товара', 'товаров')."""
+    if count % 10 == 1 and count % 100 != 11:
+        return one
+    if 2 <= count % 10 <= 4 and not 12 <= count % 100 <= 14:
+        return few
+    return many
+
+
 def is_admin(user_id: int, admin_ids: list[int]) -> bool:
     """Check if user is admin."""
     return user_id in admin_ids
@@ -7,7 +7,9 @@ from aiogram.types import (
 )
 from aiogram.utils.keyboard import ReplyKeyboardBuilder, InlineKeyboardBuilder
 from typing import List, Optional
-from database.models import Region, City, Image
+from database.models import Region, City, Image, User
+from utils.money import format_eur
+from utils.pricing import quote_prices
 
 
 def main_menu_keyboard(language: str = 'ru', user_role: str = 'user') -> ReplyKeyboardMarkup:
@@ -61,8 +63,31 @@ def profile_menu_keyboard() -> InlineKeyboardMarkup:
     builder.button(text="💰 Мой баланс", callback_data="my_balance")
     builder.button(text="🎫 Мои промокоды", callback_data="my_promocodes_menu")
     builder.button(text="🏆 Достижения", callback_data="achievements_menu")
+    builder.button(text="🏅 Лидерборды", callback_data="leaderboard_menu")
     builder.button(text="📜 История покупок", callback_data="purchase_history_menu")
     builder.button(text="🌐 Язык", callback_data="language_menu")
+    builder.button(text="🔔 Уведомления", callback_data="notifications_menu")
+    
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+NOTIFICATION_DIGEST_LABELS = {
+    'instant': "⚡️ Сразу",
+    'hourly': "🕐 Раз в час",
+    'daily': "📅 Раз в день",
+}
+
+
+def notification_settings_keyboard(user: User) -> InlineKeyboardMarkup:
+    """Notification settings keyboard (current choice marked)."""
+    builder = InlineKeyboardBuilder()
+    
+    for frequency, label in NOTIFICATION_DIGEST_LABELS.items():
+        mark = "✅ " if user.notifications_enabled and user.notification_digest == frequency else ""
+        builder.button(text=f"{mark}{label}", callback_data=f"notify_digest_{frequency}")
+    mark = "✅ " if not user.notifications_enabled else ""
+    builder.button(text=f"{mark}🔕 Выключить", callback_data="notify_digest_off")
     
     builder.adjust(1)
     return builder.as_markup()
@@ -90,13 +115,14 @@ def admin_menu_keyboard() -> ReplyKeyboardMarkup:
     # Row 5: Quests & Challenges
     builder.button(text="🎯 Квесты и челленджи")
     
-    # Row 6: Support
+    # Row 6: Support & Broadcasts
     builder.button(text="🎫 Поддержка")
+    builder.button(text="📢 Рассылка")
     
     # Row 7: Back
     builder.button(text="🔙 Главное меню")
     
-    builder.adjust(2, 2, 1, 2, 1, 1, 1)
+    builder.adjust(2, 2, 1, 2, 1, 2, 1)
     return builder.as_markup(resize_keyboard=True)
 
 
@@ -223,14 +249,16 @@ def districts_keyboard(districts: List, back_callback: str = "back_to_cities") -
 def catalog_keyboard(
     images: List[Image],
     page: int = 0,
-    total_pages: int = 1
+    total_pages: int = 1,
+    seasonal: Optional[dict] = None
 ) -> InlineKeyboardMarkup:
-    """Inline keyboard for catalog."""
+    """Inline keyboard for catalog (prices after the seasonal discount)."""
     builder = InlineKeyboardBuilder()
     
     for image in images:
+        price_cents = quote_prices([image.price_cents], seasonal)['total_cents']
         builder.button(
-            text=f"🖼 Товар #{image.id} - €{image.price_sol:.2f}",
+            text=f"🖼 Товар #{image.id} - {format_eur(price_cents)}",
             callback_data=f"view_image_{image.id}"
         )
     
@@ -262,11 +290,11 @@ def catalog_keyboard(
     return builder.as_markup()
 
 
-def image_view_keyboard(image_id: int, price: float) -> InlineKeyboardMarkup:
+def image_view_keyboard(image_id: int, price_cents: int) -> InlineKeyboardMarkup:
     """Inline keyboard for viewing image."""
     builder = InlineKeyboardBuilder()
     builder.button(
-        text=f"💳 Купить за €{price:.2f}",
+        text=f"💳 Купить за {format_eur(price_cents)}",
         callback_data=f"buy_image_{image_id}"
     )
     builder.button(
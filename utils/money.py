@@ -0,0 +1,74 @@
+"""Integer money helpers (EUR cents, SOL lamports)."""
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+from typing import Optional
+
+
+CENTS_PER_EUR = 100
+LAMPORTS_PER_SOL = 1_000_000_000
+
+
+def eur_to_cents(amount: float | str | Decimal) -> int:
+    """Convert EUR amount (UI input, config) to integer cents."""
+    return int((Decimal(str(amount)) * CENTS_PER_EUR).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def cents_to_eur(cents: int) -> float:
+    """Convert cents to EUR for display or external APIs."""
+    return cents / CENTS_PER_EUR
+
+
+def sol_to_lamports(amount: float | str | Decimal) -> int:
+    """Convert SOL amount to integer lamports."""
+    return int((Decimal(str(amount)) * LAMPORTS_PER_SOL).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def lamports_to_sol(lamports: int) -> float:
+    """Convert lamports to SOL for display or external APIs."""
+    return lamports / LAMPORTS_PER_SOL
+
+
+def lamports_to_cents(lamports: int, rate_cents: int) -> int:
+    """Convert lamports to cents at rate (cents per 1 SOL), rounding half up."""
+    return (lamports * rate_cents + LAMPORTS_PER_SOL // 2) // LAMPORTS_PER_SOL
+
+
+def cents_to_lamports(cents: int, rate_cents: int, step: int = 1) -> int:
+    """
+    Convert cents to lamports at rate (cents per 1 SOL).
+    
+    Args:
+        cents: Amount in cents
+        rate_cents: Cents per 1 SOL
+        step: Round up to a multiple of this many lamports (e.g. 1000 for 6 decimals)
+    """
+    lamports = -(-cents * LAMPORTS_PER_SOL // rate_cents)  # ceil
+    return -(-lamports // step) * step
+
+
+def percent_of(cents: int, percent: float) -> int:
+    """Get percent of a cents amount, rounding half up."""
+    basis_points = eur_to_cents(percent)  # 2.5% -> 250 bp
+    return (cents * basis_points + 5_000) // 10_000
+
+
+def parse_eur(text: str) -> Optional[int]:
+    """Parse positive EUR amount from user input into cents."""
+    try:
+        cents = eur_to_cents(text.strip().replace(',', '.'))
+    except (InvalidOperation, ValueError):
+        return None
+    if cents <= 0:
+        return None
+    return cents
+
+
+def format_eur(cents: int) -> str:
+    """Format cents for display."""
+    sign = '-' if cents < 0 else ''
+    cents = abs(cents)
+    return f"{sign}€{cents // CENTS_PER_EUR}.{cents % CENTS_PER_EUR:02d}"
+
+
+def format_sol(lamports: int, decimals: int = 4) -> str:
+    """Format lamports for display."""
+    return f"{lamports / LAMPORTS_PER_SOL:.{decimals}f} SOL"
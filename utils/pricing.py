@@ -0,0 +1,96 @@
+"""Price pipeline: seasonal discount, promocode, roulette coupon, display."""
+from typing import Optional
+from utils.money import eur_to_cents, percent_of, format_eur
+
+
+def _spend_budget(items: list[int], budget: int) -> int:
+    """Take up to `budget` cents off the items in order. Returns cents taken."""
+    taken = 0
+    for i, price in enumerate(items):
+        if taken >= budget:
+            break
+        cut = min(price, budget - taken)
+        items[i] -= cut
+        taken += cut
+    return taken
+
+
+def quote_prices(
+    prices_cents: list[int],
+    seasonal: Optional[dict] = None,
+    promocode=None,
+    coupon=None
+) -> dict:
+    """
+    Price items through the discount pipeline; pure, no queries.
+    
+    Steps, each applied to what the previous left:
+    1. Seasonal sale: seasonal['discount_percent'] off every item
+       (parameters from SeasonalService.get_pricing)
+    2. Promocode: percent off every item, fixed EUR off the items in
+       order, or free_item makes the first item free
+    3. Roulette coupon: up to coupon.max_discount_cents off the items
+       in order
+    
+    Returns:
+        dict with per-item final prices ('items'), 'subtotal_cents',
+        'total_cents', the cents each step took off and the event,
+        promocode and coupon that actually applied (None otherwise)
+    """
+    items = list(prices_cents)
+    
+    seasonal_cents = 0
+    event = None
+    percent = seasonal['discount_percent'] if seasonal else 0
+    if percent:
+        for i, price in enumerate(items):
+            cut = min(percent_of(price, percent), price)
+            items[i] -= cut
+            seasonal_cents += cut
+        event = seasonal['sale_event']
+    
+    promocode_cents = 0
+    if promocode is not None and items:
+        if promocode.discount_type == 'percent':
+            for i, price in enumerate(items):
+                cut = min(percent_of(price, promocode.discount_value), price)
+                items[i] -= cut
+                promocode_cents += cut
+        elif promocode.discount_type == 'fixed':
+            promocode_cents = _spend_budget(items, eur_to_cents(promocode.discount_value))
+        elif promocode.discount_type == 'free_item':
+            promocode_cents, items[0] = items[0], 0
+    
+    coupon_cents = _spend_budget(items, coupon.max_discount_cents) if coupon is not None else 0
+    
+    return {
+        'prices': list(prices_cents),
+        'items': items,
+        'subtotal_cents': sum(prices_cents),
+        'total_cents': sum(items),
+        'seasonal_cents': seasonal_cents,
+        'promocode_cents': promocode_cents,
+        'coupon_cents': coupon_cents,
+        'event': event if seasonal_cents else None,
+        'promocode': promocode if promocode_cents else None,
+        'coupon': coupon if coupon_cents else None,
+    }
+
+
+def format_price(quote: dict) -> str:
+    """Final price, with the price before discounts when there were any."""
+    if quote['total_cents'] == quote['subtotal_cents']:
+        return format_eur(quote['total_cents'])
+    return f"{format_eur(quote['total_cents'])} (вместо {format_eur(quote['subtotal_cents'])})"
+
+
+def format_discounts(quote: dict) -> str:
+    """One line per applied discount, empty if none."""
+    lines = []
+    if quote['seasonal_cents']:
+        lines.append(f"🎉 {quote['event'].name_ru}: -{format_eur(quote['seasonal_cents'])}")
+    if quote['promocode_cents']:
+        lines.append(f"🎫 Промокод {quote['promocode'].code}: -{format_eur(quote['promocode_cents'])}")
+    if quote['coupon_cents']:
+        lines.append(f"🎰 Купон рулетки: -{format_eur(quote['coupon_cents'])}")
+    return "\n".join(lines)